@@ -0,0 +1,193 @@
+from interpreter import OPCODES
+
+
+# Instructions whose argument is mandatory for the execution (the interpreter fails if it is missing)
+INSTRUCTIONS_WITH_ARGUMENT: set[str] = {name for name, need_number, _ in OPCODES.values() if need_number}
+JUMP_INSTRUCTIONS: set[str] = {'jmpz', 'jmpnz'}
+BINARY_INSTRUCTIONS: set[str] = {'add', 'sub', 'mul', 'div', 'mod', 'pow', 'cmp'}
+OPCODES_NAMES: set[str] = {name for name, _, _ in OPCODES.values()}
+
+
+def jump_target(index: int, argument: int) -> int:
+    """Return the index of the instruction reached when the jump at the given index is taken."""
+    # jmpz 0 and jmpnz 0 go to the next instruction
+    return index + (argument if argument != 0 else 1)
+
+def has_negative_jumps(instructions: list[tuple[str, int]]) -> bool:
+    """Return True if a jump can move the instruction pointer before the start of the program.
+    In this case the interpreter indexes the instructions from the end, which the analyses do not model."""
+
+    return any(
+        instruction in JUMP_INSTRUCTIONS and argument is not None and jump_target(index, argument) < 0
+        for index, (instruction, argument) in enumerate(instructions)
+    )
+
+def successors(instructions: list[tuple[str, int]], index: int) -> list[int]:
+    """Return the indices of the instructions which can be executed after the one at the given index.
+    An index equal to or greater than the length of the program means the end of the execution."""
+
+    instruction, argument = instructions[index]
+
+    if instruction in JUMP_INSTRUCTIONS:
+        target = jump_target(index, argument)
+        return [index + 1] if target == index + 1 else [index + 1, target]
+    if instruction not in OPCODES_NAMES:
+        # Unknown instructions stop the execution with an error
+        return []
+    return [index + 1]
+
+
+def is_analysable(instructions: list[tuple[str, int]]) -> bool:
+    """Return True if the static analyses can be applied to the program: every jump stays inside (or after the end of) the program,
+    and every instruction needing an argument has one."""
+
+    if has_negative_jumps(instructions):
+        return False
+    return all(argument is not None for instruction, argument in instructions if instruction in INSTRUCTIONS_WITH_ARGUMENT)
+
+
+def depth_after(instruction: str, argument: int, depth: int) -> int:
+    """Return the minimum stack length after the execution of the instruction, knowing the stack had at least 'depth' elements before."""
+
+    if instruction == 'print':
+        return max(depth - max(argument, 0), 0)
+    elif instruction == 'read':
+        return depth + max(argument, 0)
+    elif instruction == 'copy':
+        # An empty stack is replaced by 'argument' zeros
+        if depth == 0:
+            return max(argument, 0)
+        return depth - 1 + max(argument, 0)
+    elif instruction in ('place', 'pick', 'abs', 'inc'):
+        # An empty stack gets a 0
+        return max(depth, 1)
+    elif instruction in ('push', 'dup'):
+        return depth + 1
+    elif instruction == 'dupn':
+        # Copies the whole stack if it has less than 'argument' elements
+        return depth + min(depth, max(argument, 0))
+    elif instruction == 'swap':
+        # Missing elements are replaced by 0
+        return max(depth, 2)
+    elif instruction == 'pop':
+        return max(depth - max(argument, 0), 0)
+    elif instruction in BINARY_INSTRUCTIONS:
+        # Missing operands are replaced by default values, and the result is always pushed
+        return max(depth - 1, 1)
+    # Jumps and unknown instructions
+    return depth
+
+
+def stack_depths(instructions: list[tuple[str, int]], initial_depth: int = 0) -> list[int]:
+    """Compute, with an abstract interpretation of the program, the minimum length of the stack before each instruction.
+    The value is None for unreachable instructions. If the program cannot be analysed (see 'is_analysable'), every depth is 0."""
+
+    if not is_analysable(instructions):
+        return [0] * len(instructions)
+
+    depths: list[int] = [None] * len(instructions)
+    if len(instructions) == 0:
+        return depths
+
+    depths[0] = initial_depth
+    pending = [0]
+
+    # Depths only decrease at each update and are bounded by 0, so this always terminates
+    while pending:
+        index = pending.pop()
+        instruction, argument = instructions[index]
+        depth = depth_after(instruction, argument, depths[index])
+
+        for successor in successors(instructions, index):
+            if successor >= len(instructions):
+                continue
+            if depths[successor] is None or depth < depths[successor]:
+                depths[successor] = depth
+                pending.append(successor)
+
+    return depths
+
+
+def needed_depth(instruction: str, argument: int) -> int:
+    """Return the stack length from which the instruction can never underflow, so it can be executed without checks."""
+
+    if instruction == 'print':
+        return max(argument, 0)
+    elif instruction in ('copy', 'abs', 'place', 'inc'):
+        return 1
+    elif instruction in ('pick', 'dup'):
+        # The picked element needs to exist, otherwise the index is clamped
+        return argument + 1 if argument >= 0 else -argument
+    elif instruction == 'dupn':
+        # All the copied elements need to exist, otherwise fewer are copied
+        return max(argument, 0)
+    elif instruction == 'swap':
+        return 2
+    elif instruction == 'pop':
+        # The zero flag is set from the last removed element, which needs to exist
+        return argument + 1 if argument > 0 else 0
+    elif instruction in BINARY_INSTRUCTIONS:
+        return 2
+    return 0
+
+def stack_reach(instruction: str, argument: int) -> int:
+    """Return how many elements from the top of the stack the instruction can read, move or remove, or None if it indexes the stack
+    from its bottom. Unlike 'needed_depth', the elements only needed when the stack is long enough are counted, e.g. 'place'
+    inserts its element below the 'argument' following ones."""
+
+    if instruction in ('place', 'pick', 'dup'):
+        return argument + 1 if argument >= 0 else None
+    elif instruction == 'pop':
+        # A stack shorter than the argument is cleared, so the element past the removed ones tells if it was
+        return argument + 1 if argument > 0 else 0
+    return needed_depth(instruction, argument)
+
+def is_underflow_free(instruction: str, argument: int, depth: int) -> bool:
+    """Return True if the instruction cannot underflow when the stack has at least 'depth' elements."""
+    return depth is not None and depth >= needed_depth(instruction, argument)
+
+
+def writes_zero_flag(instruction: str, argument: int) -> bool:
+    """Return True if the instruction always assigns the zero flag, whatever the state of the stack."""
+
+    if instruction in ('read', 'copy'):
+        return argument >= 1
+    elif instruction == 'pop':
+        return argument > 0
+    # 'print', 'place', 'pick' and 'dupn' do not assign it when the stack is empty
+    return instruction in BINARY_INSTRUCTIONS or instruction in ('push', 'abs', 'dup', 'inc', 'swap')
+
+def zero_flag_liveness(instructions: list[tuple[str, int]]) -> list[bool]:
+    """Compute, with a backward analysis of the control flow, whether the zero flag can be read after each instruction:
+    by a jump, or at the end of the program where it is returned. A zero flag assigned by an instruction whose value is False is never observed.
+    If the program cannot be analysed (see 'is_analysable'), every value is True."""
+
+    if not is_analysable(instructions):
+        return [True] * len(instructions)
+
+    predecessors: list[list[int]] = [[] for _ in instructions]
+    live_out: list[bool] = [False] * len(instructions)
+    for index in range(len(instructions)):
+        for successor in successors(instructions, index):
+            if successor >= len(instructions):
+                live_out[index] = True
+            else:
+                predecessors[successor].append(index)
+
+    def live_in(index: int) -> bool:
+        instruction, argument = instructions[index]
+        if instruction in JUMP_INSTRUCTIONS:
+            return True
+        return live_out[index] and not writes_zero_flag(instruction, argument)
+
+    # Liveness only goes from False to True, so this always terminates
+    pending = [index for index in range(len(instructions)) if live_in(index)]
+    while pending:
+        index = pending.pop()
+        for predecessor in predecessors[index]:
+            if not live_out[predecessor]:
+                live_out[predecessor] = True
+                if live_in(predecessor):
+                    pending.append(predecessor)
+
+    return live_out
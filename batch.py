@@ -0,0 +1,462 @@
+import io
+import time
+
+from analysis import is_analysable
+from interpreter import FythonAssemblyError, FythonDivisionByZero, FythonLimitExceeded, Interpreter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Lanes whose stack would be longer than this are executed by the interpreter, so the stacks of all the lanes stay small
+MAX_BATCH_STACK = 4096
+# Values are stored as int64. Operations whose result could be larger than this in absolute value are executed by the interpreter
+# (this is checked with floats, so the bound is below 2**63 to stay safe from rounding errors)
+SAFE_BOUND = 2.0 ** 62
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+INITIAL_CAPACITY = 16
+
+
+class LaneResult:
+    """Result of the execution of a program for one input. If it failed, 'error' is the exception and the stack is None."""
+
+    def __init__(self, stack: list[int], zero_flag: bool, output: list[int] = None, error: Exception = None) -> None:
+        self.stack = stack
+        self.zero_flag = zero_flag
+        self.output = output if output is not None else []
+        self.error = error
+
+
+def _run_scalar(instructions: list[tuple[str, int]], inputs: list[int], max_instructions: int = None,
+                initial_state: tuple[list[int], bool, int, int] = None, **limits) -> LaneResult:
+    """Execute the program with the interpreter, reading the given values and returning the printed ones.
+    'limits' are the other limits of the interpreter ('max_time', 'max_stack' and 'max_int_bits')."""
+
+    writer = io.StringIO()
+    reader = io.StringIO(''.join(f'{value}\n' for value in inputs))
+    interpreter = Interpreter(writer, reader, output_format='number', max_instructions=max_instructions, **limits)
+
+    try:
+        stack, zero_flag = interpreter.execute_instructions(instructions, initial_state)
+        result = LaneResult(stack, zero_flag)
+    except (FythonDivisionByZero, FythonAssemblyError, FythonLimitExceeded) as e:
+        result = LaneResult(None, None, error=e)
+
+    result.output = [int(line) for line in writer.getvalue().splitlines()]
+    return result
+
+
+class _Batch:
+    """State of the lanes of a lockstep execution. The stacks are the rows of a 2D int64 array, with their lengths in another array.
+    The lanes waiting at the same instruction are kept together, and the instruction with the smallest index is always executed first,
+    so lanes which took different branches wait for each other where the branches join, and lanes leaving a loop wait for the others."""
+
+    def __init__(self, instructions: list[tuple[str, int]], inputs: list[list[int]], max_instructions: int, max_time: float = None,
+                 max_stack: int = None, max_int_bits: int = None) -> None:
+        self.instructions = instructions
+        self.inputs = inputs
+        self.max_instructions = max_instructions
+        # The time is the one of the whole batch, as its executions run together. The lanes going on with the interpreter get what remains.
+        self.max_time = max_time
+        self.start_time = time.monotonic()
+        # The lanes whose stack would go over the limit go on with the interpreter, which checks it
+        self.max_stack = max_stack
+        self.stack_bound = min(MAX_BATCH_STACK, max_stack) if max_stack is not None else MAX_BATCH_STACK
+        # The values of the lanes have at most 64 bits, so only the interpreter can go over it (see 'execute_batch')
+        self.max_int_bits = max_int_bits
+        self.results: list[LaneResult] = [None] * len(inputs)
+
+        count = len(inputs)
+        self.values = np.zeros((count, INITIAL_CAPACITY), dtype=np.int64)
+        self.lengths = np.zeros(count, dtype=np.int64)
+        self.flags = np.ones(count, dtype=bool)
+        self.steps = np.zeros(count, dtype=np.int64)
+
+        longest_input = max(map(len, inputs), default=0)
+        self.input_values = np.zeros((count, max(longest_input, 1)), dtype=np.int64)
+        self.input_lengths = np.array([len(values) for values in inputs], dtype=np.int64)
+        self.input_positions = np.zeros(count, dtype=np.int64)
+
+        # Printed values, as (lanes, values) arrays in the order of the execution
+        self.printed: list[tuple[np.ndarray, np.ndarray]] = []
+        # Values printed by the lanes after they went on with the interpreter
+        self.scalar_outputs: dict[int, list[int]] = {}
+
+        lanes = []
+        for lane, values in enumerate(inputs):
+            if all(INT64_MIN <= value <= INT64_MAX for value in values):
+                self.input_values[lane, :len(values)] = values
+                lanes.append(lane)
+            else:
+                self._to_scalar(np.array([lane]), 0)
+        self.waiting: dict[int, np.ndarray] = {0: np.array(lanes, dtype=np.int64)} if lanes else {}
+
+
+    ### LANES MANAGEMENT
+    def _move(self, lanes: np.ndarray, instruction_pointer: int) -> None:
+        if lanes.size == 0:
+            return
+        if instruction_pointer >= len(self.instructions):
+            for lane in lanes.tolist():
+                self.results[lane] = LaneResult(self.values[lane, :self.lengths[lane]].tolist(), bool(self.flags[lane]))
+        elif instruction_pointer in self.waiting:
+            self.waiting[instruction_pointer] = np.concatenate((self.waiting[instruction_pointer], lanes))
+        else:
+            self.waiting[instruction_pointer] = lanes
+
+    def _fail(self, lanes: np.ndarray, error: Exception) -> None:
+        for lane in lanes.tolist():
+            self.results[lane] = LaneResult(None, None, error=error)
+
+    def _to_scalar(self, lanes: np.ndarray, instruction_pointer: int) -> None:
+        """Go on with the execution of the lanes with the interpreter, from their current state."""
+
+        for lane in lanes.tolist():
+            state = (self.values[lane, :self.lengths[lane]].tolist(), bool(self.flags[lane]), instruction_pointer, int(self.steps[lane]))
+            remaining_inputs = self.inputs[lane][self.input_positions[lane]:]
+            result = _run_scalar(self.instructions, remaining_inputs, self.max_instructions, state, max_stack=self.max_stack,
+                                 max_time=self._remaining_time(), max_int_bits=self.max_int_bits)
+            self.scalar_outputs[lane] = result.output
+            result.output = None
+            self.results[lane] = result
+
+    def _remaining_time(self) -> float:
+        if self.max_time is None:
+            return None
+        return max(self.max_time - (time.monotonic() - self.start_time), 0)
+
+    def _split(self, lanes: np.ndarray, mask: np.ndarray, instruction_pointer: int) -> np.ndarray:
+        """Send the lanes of the mask to the interpreter, and return the other ones."""
+        if mask.any():
+            self._to_scalar(lanes[mask], instruction_pointer)
+            return lanes[~mask]
+        return lanes
+
+    def _reserve(self, lanes: np.ndarray, lengths: np.ndarray, instruction_pointer: int) -> np.ndarray:
+        """Make sure the stacks of the lanes can reach the given lengths. Return the lanes which can stay in the batch."""
+
+        too_long = lengths > self.stack_bound
+        needed = int(lengths[~too_long].max(initial=0))
+        if needed > self.values.shape[1]:
+            capacity = max(needed, 2 * self.values.shape[1])
+            values = np.zeros((self.values.shape[0], capacity), dtype=np.int64)
+            values[:, :self.values.shape[1]] = self.values
+            self.values = values
+        return self._split(lanes, too_long, instruction_pointer)
+
+
+    ### EXECUTION
+    def run(self) -> None:
+        while self.waiting:
+            instruction_pointer = min(self.waiting)
+            lanes = self.waiting.pop(instruction_pointer)
+
+            if self.max_instructions is not None:
+                self.steps[lanes] += 1
+
+            instruction, argument = self.instructions[instruction_pointer]
+            next_lanes = self._execute(instruction, argument, lanes, instruction_pointer)
+            if next_lanes is not None:
+                self._move(next_lanes, instruction_pointer + 1)
+
+    def _execute(self, instruction: str, argument: int, lanes: np.ndarray, instruction_pointer: int) -> np.ndarray:
+        """Execute the instruction on the lanes. Return the lanes going to the next instruction (None if the instruction moved them)."""
+
+        # The values are read from 'self' each time, since '_reserve' can replace the array
+        lengths, flags = self.lengths, self.flags
+        length = lengths[lanes]
+
+        if instruction == 'print':
+            for _ in range(argument):
+                current = lanes[lengths[lanes] > 0]
+                if current.size == 0:
+                    break
+                lengths[current] -= 1
+                element = self.values[current, lengths[current]]
+                self.printed.append((current, element))
+                flags[current] = (element == 0)
+
+        elif instruction == 'read':
+            if argument >= 1:
+                lanes = self._reserve(lanes, length + argument, instruction_pointer)
+                length = lengths[lanes]
+                positions = self.input_positions[lanes][:, None] + np.arange(argument)
+                available = positions < self.input_lengths[lanes][:, None]
+                read = np.where(available, self.input_values[lanes[:, None], np.minimum(positions, self.input_values.shape[1] - 1)], 0)
+                self.values[lanes[:, None], length[:, None] + np.arange(argument)] = read
+                lengths[lanes] += argument
+                self.input_positions[lanes] += argument
+                flags[lanes] = (read[:, -1] == 0)
+
+        elif instruction == 'copy':
+            if argument <= 0:
+                lengths[lanes] = np.maximum(length - 1, 0)
+            else:
+                lanes = self._reserve(lanes, np.where(length > 0, length - 1 + argument, argument), instruction_pointer)
+                length = lengths[lanes]
+                # If the stack is empty, copy 0
+                start = np.maximum(length - 1, 0)
+                element = np.where(length > 0, self.values[lanes, start], 0)
+                self.values[lanes[:, None], start[:, None] + np.arange(argument)] = element[:, None]
+                lengths[lanes] = start + argument
+                flags[lanes] = (element == 0)
+
+        elif instruction in ('jmpz', 'jmpnz'):
+            taken = flags[lanes] if instruction == 'jmpz' else ~flags[lanes]
+            target = instruction_pointer + (argument if argument != 0 else 1)
+            jumping = lanes[taken]
+            # Like the interpreter, the number of executed instructions is only checked when a jump is taken
+            if self.max_instructions is not None:
+                exceeded = self.steps[jumping] > self.max_instructions
+                for lane in jumping[exceeded].tolist():
+                    self.results[lane] = LaneResult(None, None, error=FythonLimitExceeded(
+                        f"more than {self.max_instructions} instructions executed.", 'instructions',
+                        self.values[lane, :self.lengths[lane]].tolist(), bool(self.flags[lane]), target, int(self.steps[lane])))
+                jumping = jumping[~exceeded]
+            # Likewise for the time, which is the same for all the lanes
+            if self.max_time is not None and jumping.size > 0 and self._remaining_time() == 0:
+                for lane in jumping.tolist():
+                    self.results[lane] = LaneResult(None, None, error=FythonLimitExceeded(
+                        f"execution longer than {self.max_time} seconds.", 'time',
+                        self.values[lane, :self.lengths[lane]].tolist(), bool(self.flags[lane]), target, int(self.steps[lane])))
+                jumping = jumping[:0]
+            self._move(jumping, target)
+            self._move(lanes[~taken], instruction_pointer + 1)
+            return None
+
+        elif instruction in ('place', 'pick'):
+            self._push_zero_if_empty(lanes)
+            if (length > 0).any():
+                self._move_element(instruction, argument, lanes[length > 0])
+
+        elif instruction == 'push':
+            if not INT64_MIN <= argument <= INT64_MAX:
+                self._to_scalar(lanes, instruction_pointer)
+                return None
+            lanes = self._reserve(lanes, length + 1, instruction_pointer)
+            self.values[lanes, lengths[lanes]] = argument
+            lengths[lanes] += 1
+            flags[lanes] = (argument == 0)
+
+        elif instruction == 'pop':
+            if argument > 0:
+                emptied = length <= argument
+                lengths[lanes[emptied]] = 0
+                flags[lanes[emptied]] = True
+                rest = lanes[~emptied]
+                flags[rest] = (self.values[rest, lengths[rest] - argument] == 0)
+                lengths[rest] -= argument
+
+        elif instruction in ('add', 'sub', 'mul', 'div', 'mod', 'pow', 'cmp'):
+            lanes = self._binary(instruction, lanes, instruction_pointer)
+
+        elif instruction == 'abs':
+            top = self.values[lanes, np.maximum(length - 1, 0)]
+            lanes = self._split(lanes, (length > 0) & (top == INT64_MIN), instruction_pointer)
+            self._push_zero_if_empty(lanes)
+            self.values[lanes, lengths[lanes] - 1] = np.abs(self.values[lanes, lengths[lanes] - 1])
+            flags[lanes] = (self.values[lanes, lengths[lanes] - 1] == 0)
+
+        elif instruction == 'dup':
+            lanes = self._reserve(lanes, length + 1, instruction_pointer)
+            length = lengths[lanes]
+            # Same index as 'pick', and 0 if the stack is empty
+            if argument >= 0:
+                index = np.maximum(length - argument - 1, 0)
+            else:
+                index = np.maximum(np.minimum(np.full(lanes.size, -argument - 1), length - 1), 0)
+            element = np.where(length > 0, self.values[lanes, index], 0)
+            self.values[lanes, length] = element
+            lengths[lanes] = np.maximum(length + 1, 1)
+            flags[lanes] = (element == 0)
+
+        elif instruction == 'dupn':
+            if argument > 0:
+                copied = np.minimum(length, argument)
+                lanes = self._reserve(lanes, length + copied, instruction_pointer)
+                length, copied = lengths[lanes], np.minimum(lengths[lanes], argument)
+                # Columns of the copies, and of the copied elements (clamped for the lanes copying less than 'argument' elements)
+                offsets = np.arange(argument)[None, :]
+                sources = np.maximum(length - copied, 0)[:, None] + np.minimum(offsets, np.maximum(copied - 1, 0)[:, None])
+                columns = np.where(offsets < copied[:, None], length[:, None] + offsets, sources)
+                self.values[lanes[:, None], columns] = self.values[lanes[:, None], sources]
+                lengths[lanes] = length + copied
+                copying = lanes[copied > 0]
+                flags[copying] = (self.values[copying, lengths[copying] - 1] == 0)
+
+        elif instruction == 'inc':
+            if not INT64_MIN <= argument <= INT64_MAX:
+                self._to_scalar(lanes, instruction_pointer)
+                return None
+            top = self.values[lanes, np.maximum(length - 1, 0)]
+            lanes = self._split(lanes, (length > 0) & (np.abs(top.astype(np.float64)) + abs(argument) >= SAFE_BOUND), instruction_pointer)
+            self._push_zero_if_empty(lanes)
+            self.values[lanes, lengths[lanes] - 1] += argument
+            flags[lanes] = (self.values[lanes, lengths[lanes] - 1] == 0)
+
+        elif instruction == 'swap':
+            lanes = self._reserve(lanes, np.maximum(length, 2), instruction_pointer)
+            length = lengths[lanes]
+            # The missing elements are 0, and the missing one below the top becomes the new top
+            short = lanes[length < 2]
+            self.values[lanes[length == 0], 0] = 0
+            self.values[short, 1] = 0
+            lengths[short] = 2
+            flags[short] = True
+            full, length = lanes[length >= 2], length[length >= 2]
+            top, below = self.values[full, length - 1], self.values[full, length - 2]
+            self.values[full, length - 1], self.values[full, length - 2] = below, top
+            flags[full] = (below == 0)
+
+        else:
+            self._fail(lanes, FythonAssemblyError(f"unknown instruction '{instruction}'."))
+            return None
+
+        return lanes
+
+    def _push_zero_if_empty(self, lanes: np.ndarray) -> None:
+        # If the stack is empty, it becomes a single 0 (capacity is always at least 1)
+        empty = lanes[self.lengths[lanes] == 0]
+        self.values[empty, 0] = 0
+        self.lengths[empty] = 1
+
+    def _move_element(self, instruction: str, argument: int, lanes: np.ndarray) -> None:
+        """Execute 'place' or 'pick' on lanes with non empty stacks. Only the columns between the lowest moved position and the top
+        of the stacks are rebuilt, so a small positive argument stays cheap however long the stacks are."""
+
+        length = self.lengths[lanes]
+        if instruction == 'place':
+            # Same index as the 'insert' of the interpreter, on the stack without its top element
+            size = length - 1
+            index = size - argument if argument >= 0 else np.full(lanes.size, -argument - 1)
+            index = np.where(index < 0, index + size, index)
+            index = np.clip(index, 0, size)
+        elif argument >= 0:
+            index = np.maximum(length - argument - 1, 0)
+        else:
+            index = np.minimum(np.full(lanes.size, -argument - 1), length - 1)
+
+        low, high = int(index.min()), int(length.max())
+        rows = self.values[lanes, low:high]
+        columns = np.arange(low, high)[None, :]
+        index = index[:, None]
+        top = (length - 1)[:, None]
+
+        if instruction == 'place':
+            element = self.values[lanes, length - 1]
+            shifted_up = np.concatenate((rows[:, :1], rows[:, :-1]), axis=1)
+            rows = np.where(columns < index, rows, np.where(columns == index, element[:, None], shifted_up))
+        else:
+            element = self.values[lanes, index[:, 0]]
+            shifted_down = np.concatenate((rows[:, 1:], rows[:, -1:]), axis=1)
+            rows = np.where(columns < index, rows, np.where(columns < top, shifted_down, element[:, None]))
+
+        self.values[lanes, low:high] = rows
+        self.flags[lanes] = (element == 0)
+
+    def _binary(self, instruction: str, lanes: np.ndarray, instruction_pointer: int) -> np.ndarray:
+        values, lengths = self.values, self.lengths
+        length = lengths[lanes]
+
+        # Default values when the stack does not have enough elements, as in the interpreter
+        default_top, default_below = {'add': (0, 0), 'sub': (0, 0), 'mul': (0, 0), 'div': (1, 0), 'mod': (1, 0), 'pow': (1, 1), 'cmp': (0, 0)}[instruction]
+        top = np.where(length >= 1, values[lanes, np.maximum(length - 1, 0)], default_top)
+        below = np.where(length >= 2, values[lanes, np.maximum(length - 2, 0)], default_below)
+
+        # Lanes whose result could overflow go on with the interpreter, before anything is modified
+        absolute_top, absolute_below = np.abs(top.astype(np.float64)), np.abs(below.astype(np.float64))
+        if instruction in ('add', 'sub'):
+            risky = absolute_top + absolute_below >= SAFE_BOUND
+        elif instruction == 'mul':
+            risky = absolute_top * absolute_below >= SAFE_BOUND
+        elif instruction in ('div', 'mod'):
+            risky = (below == INT64_MIN) & (top == -1)
+        elif instruction == 'cmp':
+            risky = np.zeros(lanes.size, dtype=bool)
+        else:
+            with np.errstate(divide='ignore'):
+                risky = (top > 0) & (absolute_below > 1) & (top * np.log2(np.maximum(absolute_below, 1)) >= 62)
+
+        # Division by zero stops the lanes with an error
+        errors = {
+            'div': "division by zero during execution.",
+            'mod': "modulo by zero during execution",
+            'pow': "zero to a negative power during execution."
+        }
+        failed = np.zeros(lanes.size, dtype=bool)
+        if instruction in ('div', 'mod'):
+            failed = (top == 0)
+        elif instruction == 'pow':
+            failed = (top < 0) & (below == 0)
+        if failed.any():
+            self._fail(lanes[failed], FythonDivisionByZero(errors[instruction]))
+
+        if risky.any():
+            self._to_scalar(lanes[risky & ~failed], instruction_pointer)
+        kept = ~(risky | failed)
+        lanes, top, below, length = lanes[kept], top[kept], below[kept], length[kept]
+
+        if instruction == 'add':
+            result = below + top
+        elif instruction == 'sub':
+            result = below - top
+        elif instruction == 'mul':
+            result = below * top
+        elif instruction == 'div':
+            result = np.floor_divide(below, top)
+        elif instruction == 'mod':
+            result = np.mod(below, top)
+        elif instruction == 'cmp':
+            result = (below > top).astype(np.int64) - (below < top)
+        else:
+            # Negative powers are 0, 1 or -1
+            negative = np.where(below > 1, 0, np.where(below == 1, 1, -1))
+            result = np.where(top >= 0, np.power(below, np.maximum(top, 0)), negative)
+
+        position = np.maximum(length - 2, 0)
+        values[lanes, position] = result
+        lengths[lanes] = position + 1
+        self.flags[lanes] = (result == 0)
+        return lanes
+
+
+    def collect(self) -> list[LaneResult]:
+        """Gather the printed values of each lane into its result, and return the results."""
+
+        outputs: list[list[int]] = [[] for _ in self.results]
+        if self.printed:
+            lanes = np.concatenate([lanes for lanes, _ in self.printed])
+            printed = np.concatenate([values for _, values in self.printed])
+            # The sort is stable, so the values of each lane stay in the order they were printed
+            order = np.argsort(lanes, kind='stable')
+            counts = np.bincount(lanes, minlength=len(self.results))
+            for lane, values in enumerate(np.split(printed[order], np.cumsum(counts)[:-1])):
+                outputs[lane] = values.tolist()
+
+        for lane, result in enumerate(self.results):
+            result.output = outputs[lane] + self.scalar_outputs.get(lane, [])
+        return self.results
+
+
+def execute_batch(instructions: list[tuple[str, int]], inputs: list[list[int]], max_instructions: int = None, max_time: float = None,
+                  max_stack: int = None, max_int_bits: int = None) -> list[LaneResult]:
+    """Execute the program once for each list of input values (read in the 'number' format), and return the result of each execution.
+    The executions run in lockstep on NumPy arrays, and each one goes on with the interpreter when its values could overflow int64.
+    Without NumPy, or for programs the analyses do not support (see 'analysis.is_analysable'), the interpreter executes each of them.
+
+    The limits are the ones of the interpreter, checked for each execution, except 'max_time' which bounds the lockstep execution of
+    all of them (and each execution by the interpreter). As the values in lockstep have at most 64 bits, a smaller 'max_int_bits' makes
+    the interpreter execute each of them."""
+
+    if np is None or not is_analysable(instructions) or (max_int_bits is not None and max_int_bits < 64):
+        return [_run_scalar(instructions, values, max_instructions, max_time=max_time, max_stack=max_stack, max_int_bits=max_int_bits)
+                for values in inputs]
+
+    batch = _Batch(instructions, inputs, max_instructions, max_time, max_stack, max_int_bits)
+    batch.run()
+    return batch.collect()
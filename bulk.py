@@ -0,0 +1,132 @@
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import os
+import re
+import time
+
+from interpreter import Interpreter
+from interpreter_manager import InputType, InterpreterManager, InterpreterManagerError, OutputType
+
+
+# Names of the files searched in an input directory, and suffix of the output files, for each type (as in 'examples/')
+INPUT_PATTERNS = {
+    InputType.PYTHON: '*.py',
+    InputType.DELTAS: '*_delta*.txt',
+    InputType.ASSEMBLY: '*_assembly.txt',
+}
+OUTPUT_SUFFIXES = {
+    OutputType.PYTHON: '.py',
+    OutputType.DELTAS: '_deltas.txt',
+    OutputType.ASSEMBLY: '_assembly.txt',
+}
+# Suffixes removed from the name of an input file before adding the one of the output type
+TYPE_SUFFIXES = ('_deltas', '_delta', '_assembly')
+
+# Number of files sent at once to a worker process, so small files do not spend most of their time in the communication
+CHUNK_SIZE = 8
+
+
+class BulkResult:
+    """Statistics of a bulk conversion."""
+
+    def __init__(self) -> None:
+        self.converted = 0
+        self.skipped = 0
+        # (input path, error message) of each file which could not be converted
+        self.failed: list[tuple[str, str]] = []
+        self.input_bytes = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> str:
+        rate = self.converted / self.elapsed if self.elapsed > 0 else 0
+        throughput = self.input_bytes / self.elapsed / 1e6 if self.elapsed > 0 else 0
+        return '\n'.join([
+            f'{self.converted} files converted, {self.skipped} up to date, {len(self.failed)} failed in {self.elapsed:.2f} s',
+            f'Throughput : {rate:.1f} files/s, {throughput:.2f} MB/s'
+        ] + [f'{path} : {message}' for path, message in self.failed])
+
+
+def is_bulk_input(input_path: str) -> bool:
+    """Return True if the input path is a directory or a glob pattern, and not a single file."""
+    return os.path.isdir(input_path) or (not os.path.exists(input_path) and re.search(r'[*?[]', input_path) is not None)
+
+def find_inputs(input_path: str, input_type: InputType) -> list[tuple[str, str]]:
+    """Return the input files, with their path relative to the root of the input (so subdirectories are kept in the output directory)."""
+
+    if os.path.isdir(input_path):
+        root = input_path
+        paths = glob.glob(os.path.join(glob.escape(input_path), '**', INPUT_PATTERNS[input_type]), recursive=True)
+    else:
+        # The root of a glob pattern is the directory before its first wildcard
+        root = os.path.dirname(re.split(r'[*?[]', input_path)[0])
+        paths = glob.glob(input_path, recursive=True)
+
+    return sorted((path, os.path.relpath(path, root)) for path in paths if os.path.isfile(path))
+
+def output_file_path(relative_path: str, output_directory: str, output_type: OutputType) -> str:
+    name, _ = os.path.splitext(relative_path)
+    for suffix in TYPE_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return os.path.join(output_directory, name + OUTPUT_SUFFIXES[output_type])
+
+def is_up_to_date(input_path: str, output_path: str) -> bool:
+    try:
+        return os.stat(output_path).st_mtime_ns >= os.stat(input_path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def _convert_files(input_type: str, output_type: str, paths: list[tuple[str, str]]) -> list[str]:
+    """Convert the files in a worker process. Return the error message of each file (None if it was converted)."""
+
+    manager = InterpreterManager(Interpreter(), input_type, output_type)
+    function = manager.conversion_function()
+
+    errors = []
+    for input_path, output_path in paths:
+        try:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            function(input_path, output_path)
+            errors.append(None)
+        # Any error only stops the conversion of its file
+        except Exception as e:
+            errors.append(str(e) or type(e).__name__)
+    return errors
+
+def convert_many(input_path: str, output_directory: str, input_type: str, output_type: str, jobs: int = None, force: bool = False) -> BulkResult:
+    """Convert every file of a directory (recursively) or matching a glob pattern into the output directory, with a pool of processes.
+    Files whose output is newer than their input are skipped, unless 'force' is True."""
+
+    input_type, output_type = InputType(input_type), OutputType(output_type)
+    if output_type == OutputType.EXECUTE:
+        raise InterpreterManagerError("the bulk conversion can not execute the programs.")
+    if output_directory is None:
+        raise InterpreterManagerError("no output directory provided.")
+
+    result = BulkResult()
+    start = time.perf_counter()
+
+    paths = []
+    for path, relative_path in find_inputs(input_path, input_type):
+        output_path = output_file_path(relative_path, output_directory, output_type)
+        if not force and is_up_to_date(path, output_path):
+            result.skipped += 1
+        else:
+            paths.append((path, output_path))
+            result.input_bytes += os.path.getsize(path)
+
+    chunks = [paths[index:index + CHUNK_SIZE] for index in range(0, len(paths), CHUNK_SIZE)]
+    if chunks:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(_convert_files, input_type.value, output_type.value, chunk) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                for (path, _), error in zip(chunk, future.result()):
+                    if error is None:
+                        result.converted += 1
+                    else:
+                        result.failed.append((path, error))
+
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import struct
+import tempfile
+import time
+from typing import IO
+
+from snapshot import SnapshotError, decode_stack, encode_stack
+
+
+# Binary layout of a cache entry (every field is little-endian):
+#   - header: magic, format version, flags, executed steps (-1 if unknown), stack length, stack size in bytes, output size in bytes
+#   - stack: same layout as in the snapshots (see 'snapshot.encode_stack')
+#   - output: the bytes written by the program (UTF-8 for the text formats)
+CACHE_MAGIC = b'FYRC'
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct('<4sHHqQQQ')
+CACHE_SUFFIX = '.fyrc'
+TEMPORARY_PREFIX = '.tmp-'
+
+FLAG_ZERO_FLAG = 1
+FLAG_BIG_INTS = 2
+
+# A temporary file older than this (in seconds) was left by a process which stopped while writing it
+STALE_TEMPORARY_AGE = 3600
+
+
+class CacheError(Exception):
+    pass
+
+
+class CachedResult:
+    def __init__(self, output: bytes, stack: list[int], zero_flag: bool, steps: int = None) -> None:
+        self.output = output
+        self.stack = stack
+        self.zero_flag = zero_flag
+        # Number of executed instructions, None if unknown (compiled engine)
+        self.steps = steps
+
+
+class OutputRecorder:
+    """Stream writing to another stream, and keeping a copy of what was successfully written to it."""
+
+    def __init__(self, stream: IO) -> None:
+        self.stream = stream
+        self.chunks: list = []
+
+    def write(self, data) -> int:
+        written = self.stream.write(data) if self.stream is not None else len(data)
+        self.chunks.append(data)
+        return written
+
+    def flush(self) -> None:
+        if self.stream is not None:
+            self.stream.flush()
+
+    def getvalue(self) -> bytes:
+        if not self.chunks:
+            return b''
+        if isinstance(self.chunks[0], str):
+            return encode_text(''.join(self.chunks))
+        return b''.join(self.chunks)
+
+
+def encode_text(text: str) -> bytes:
+    # The surrogates read from an undecodable input are kept, so the hash and the replayed output are exact
+    return text.encode('utf-8', 'surrogatepass')
+
+def decode_text(data: bytes) -> str:
+    return data.decode('utf-8', 'surrogatepass')
+
+
+def encode_result(result: CachedResult) -> bytes:
+    stack_bytes, big_ints = encode_stack(result.stack)
+    flags = (FLAG_ZERO_FLAG if result.zero_flag else 0) | (FLAG_BIG_INTS if big_ints else 0)
+    steps = result.steps if result.steps is not None else -1
+    header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, flags, steps, len(result.stack), len(stack_bytes), len(result.output))
+    return header + stack_bytes + result.output
+
+def decode_result(data: bytes) -> CachedResult:
+    """Rebuild a result from its binary representation. Return None if it is not a complete entry of this version."""
+
+    if len(data) < CACHE_HEADER.size:
+        return None
+    magic, version, flags, steps, stack_length, stack_size, output_size = CACHE_HEADER.unpack_from(data)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or len(data) != CACHE_HEADER.size + stack_size + output_size:
+        return None
+
+    view = memoryview(data)
+    try:
+        stack = decode_stack(view[CACHE_HEADER.size:CACHE_HEADER.size + stack_size], stack_length, bool(flags & FLAG_BIG_INTS))
+    except SnapshotError:
+        return None
+    output = bytes(view[CACHE_HEADER.size + stack_size:])
+    return CachedResult(output, stack, bool(flags & FLAG_ZERO_FLAG), steps if steps >= 0 else None)
+
+
+class ResultCache:
+    """Results of executions stored in a directory, one file per entry named after its key, and shared by every process using it.
+
+    An entry is written to a temporary file renamed over its final name, so the other processes only see complete entries. Reading an
+    entry updates its modification time, and once the entries take more than 'max_bytes', the least recently used ones are removed.
+    An entry removed by another process, or which can not be read, is a miss: the cache never makes an execution fail."""
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Number of lookups which found their entry or not, in this process
+        self.hits = 0
+        self.misses = 0
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError:
+            raise CacheError(f"can't create cache directory '{directory}'.")
+
+    @staticmethod
+    def key(program_hash: bytes, input_data: bytes, output_format: str, version: int) -> str:
+        """Return the key of an execution: the hash of the decoded program (see 'interpreter.program_hash'), of its whole input, of the
+        format of its input and output, and of the version of the interpreter."""
+
+        digest = hashlib.sha256()
+        digest.update(program_hash)
+        digest.update(hashlib.sha256(input_data).digest())
+        digest.update(f'{output_format}\n{version}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key: str) -> CachedResult:
+        """Return the result stored under the key, or None if there is none."""
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fi:
+                data = fi.read()
+        except OSError:
+            self.misses += 1
+            return None
+
+        result = decode_result(data)
+        if result is None:
+            self.misses += 1
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: CachedResult) -> None:
+        """Store the result under the key, then remove the least recently used entries until the cache fits in its size."""
+
+        data = encode_result(result)
+        if len(data) > self.max_bytes:
+            return
+        try:
+            descriptor, temporary_path = tempfile.mkstemp(prefix=TEMPORARY_PREFIX, dir=self.directory)
+        except OSError:
+            return
+        try:
+            with os.fdopen(descriptor, 'wb') as fo:
+                fo.write(data)
+            os.replace(temporary_path, self._path(key))
+        except OSError:
+            self._remove(temporary_path)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the size of the remaining ones is at most 'max_bytes'."""
+
+        entries = []
+        now = time.time()
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                # Removed by another process
+                continue
+            if name.startswith(TEMPORARY_PREFIX):
+                if now - status.st_mtime > STALE_TEMPORARY_AGE:
+                    self._remove(path)
+            elif name.endswith(CACHE_SUFFIX):
+                entries.append((status.st_mtime_ns, status.st_size, path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            self._remove(path)
+            size -= entry_size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
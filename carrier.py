@@ -0,0 +1,117 @@
+from interpreter import OPCODES, Interpreter
+
+
+# Number of spaces of each indentation level of the generated code
+INDENTATION = '    '
+# Maximum distances of the depth and of the whitespace count from the ones of the first line before they are brought back
+# (Python does not allow more than 100 indentation levels)
+MAX_DEPTH_DRIFT = 45
+MAX_COUNT_DRIFT = 40
+
+
+class CarrierError(Exception):
+    pass
+
+
+def _expression(tokens: int) -> str:
+    """Return a valid Python expression made of the given number (at least 1) of whitespace separated tokens.
+    The expression is a flat tuple, so even very long ones do not nest in the parser."""
+
+    if tokens % 2 == 0:
+        return f'- {_expression(tokens - 1)}'
+    return ' , '.join(['1'] * ((tokens + 1) // 2))
+
+def _line(depth: int, whitespace_count: int, opens_block: bool) -> str:
+    """Return a line of code with the given indentation depth and whitespace count. A line opening a block needs a whitespace count of at least 1."""
+
+    if opens_block:
+        return f'{INDENTATION * depth}if ({_expression(whitespace_count)}):'
+    return f'{INDENTATION * depth}{_expression(whitespace_count + 1)}'
+
+
+def _choose_dw(dw: int, kind: str, whitespace_count: int) -> int:
+    """Return the variant of dw bringing the whitespace count the closest to 0. The dw of an instruction is taken modulo 10
+    (so 10 can be added to it away from zero), and a negative digit is complemented to 10 (so 10 can be subtracted from a positive one,
+    or added to a negative one). Other deltas are kept as they are."""
+
+    if not -9 <= dw <= 9:
+        return dw
+    if kind == 'opcode':
+        # Add tens in the direction of dw, as long as it goes back towards 0
+        if dw * whitespace_count < 0:
+            return dw + (1 if dw > 0 else -1) * 10 * max((abs(whitespace_count) - abs(dw) + 5) // 10, 0)
+    elif kind == 'digit' and dw != 0:
+        other = dw - 10 if dw > 0 else dw + 10
+        if abs(whitespace_count + other) < abs(whitespace_count + dw):
+            return other
+    return dw
+
+def _rebalance(depth: int, whitespace_count: int, target_depth: int) -> list[tuple[int, int]]:
+    """Return deltas which do not make any instruction, going to the target depth and bringing the whitespace count back to 0.
+    A delta with Delta_I < -1 is never an instruction whatever its Delta_w, and neither is (1, 0)."""
+
+    # The indentation can only increase one level per line, so it goes up enough to come back down at least two levels at once
+    ups = max(2 - (depth - target_depth), 0)
+    return [(1, 0)] * ups + [(target_depth - depth - ups, -whitespace_count)]
+
+
+def deltas_to_python_code(deltas: list[tuple[int, int]], interpreter: Interpreter = None) -> str:
+    """Generate a valid Python code whose deltas decode to the same program as the given ones (see 'Interpreter.python_code_to_deltas').
+    The whitespace counts and the indentation are kept small, by choosing among the deltas which decode to the same instruction or digit,
+    and by going back to the first depth and whitespace count between two instructions when they drift too far."""
+
+    interpreter = interpreter if interpreter is not None else Interpreter()
+
+    for di, dw in deltas:
+        if not isinstance(di, int) or not isinstance(dw, int):
+            raise CarrierError(f"invalid delta ({di}, {dw}).")
+        if di > 1:
+            raise CarrierError(f"the indentation can only increase one level at a time, got a delta of {di}.")
+
+    # Whitespace counts and depths of the lines, relative to the first one
+    counts = [0]
+    depths = [0]
+    index = 0
+    while index < len(deltas):
+        # Nothing can be inserted inside an instruction and its parameter, or inside a comment
+        if abs(depths[-1]) > MAX_DEPTH_DRIFT or abs(counts[-1]) > MAX_COUNT_DRIFT:
+            target_depth = 0 if abs(depths[-1]) > MAX_DEPTH_DRIFT else depths[-1]
+            for di, dw in _rebalance(depths[-1], counts[-1], target_depth):
+                counts.append(counts[-1] + dw)
+                depths.append(depths[-1] + di)
+
+        line, next_index = interpreter._decode_delta(deltas, index)
+        for position in range(index, min(next_index, len(deltas))):
+            di, dw = deltas[position]
+            kind = None
+            if line is not None:
+                kind = 'opcode' if position == index else 'digit'
+            counts.append(counts[-1] + _choose_dw(dw, kind, counts[-1]))
+            depths.append(depths[-1] + di)
+        index = next_index
+
+    # A line followed by a deeper one opens a block, so it needs at least two tokens
+    opens_block = [next_depth > depth for depth, next_depth in zip(depths, depths[1:])] + [False]
+    base_count = max(int(opens) - count for count, opens in zip(counts, opens_block))
+    base_depth = -min(depths)
+
+    lines: list[str] = []
+    # The first line of a Python code is not indented, so when the program goes below its first depth, the first line is nested in
+    # blocks opened inside a block comment (a delta (0, dw < 0) starts it, and the next one ends it), which the decoding skips
+    if base_depth > 0:
+        lines.append(_line(0, 2, False))
+        for depth in range(base_depth):
+            lines.append(_line(depth, 1, True))
+        lines.append(_line(base_depth, base_count + 1, False))
+
+    for count, depth, opens in zip(counts, depths, opens_block):
+        lines.append(_line(base_depth + depth, base_count + count, opens))
+
+    return '\n'.join(lines) + '\n'
+
+
+def assembly_to_python_code(lines: list[str], interpreter: Interpreter = None) -> str:
+    """Generate a valid Python code executing the given assembly, with as few lines as possible."""
+
+    interpreter = interpreter if interpreter is not None else Interpreter()
+    return deltas_to_python_code(interpreter.assembly_to_deltas(lines, omit_defaults=True), interpreter)
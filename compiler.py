@@ -0,0 +1,359 @@
+from analysis import BINARY_INSTRUCTIONS, JUMP_INSTRUCTIONS, OPCODES_NAMES, is_analysable, is_underflow_free, jump_target, stack_depths, zero_flag_liveness
+from interpreter import FythonAssemblyError, FythonDivisionByZero, Interpreter
+from loops import InductionLoop, find_induction_loops
+
+
+# Values used by the mathematical instructions when the stack does not have enough elements, as (top, below)
+BINARY_DEFAULTS: dict[str, tuple[int, int]] = {
+    'add': (0, 0),
+    'sub': (0, 0),
+    'mul': (0, 0),
+    'div': (1, 0),
+    'mod': (1, 0),
+    'pow': (1, 1),
+    'cmp': (0, 0)
+}
+
+BINARY_EXPRESSIONS: dict[str, str] = {
+    'add': 'below + top',
+    'sub': 'below - top',
+    'mul': 'below * top',
+    'div': 'below // top',
+    'mod': 'below % top',
+    'pow': '_fython_pow(below, top)',
+    'cmp': '(below > top) - (below < top)'
+}
+
+DIVISION_ERRORS: dict[str, str] = {
+    'div': "division by zero during execution.",
+    'mod': "modulo by zero during execution"
+}
+
+
+def _fython_pow(below: int, top: int) -> int:
+    """Same semantics as the 'pow' instruction of the interpreter."""
+    if top >= 0:
+        return below ** top
+    if below > 1:
+        return 0
+    elif below == 1:
+        return 1
+    elif below == 0:
+        raise FythonDivisionByZero("zero to a negative power during execution.")
+    return -1
+
+
+def _indent(lines: list[str], level: int = 1) -> list[str]:
+    return [f'{"    " * level}{line}' for line in lines]
+
+
+def _binary_source(instruction: str, unchecked: bool, write_flag: bool) -> list[str]:
+    default_top, default_below = BINARY_DEFAULTS[instruction]
+    lines: list[str] = []
+
+    if unchecked:
+        lines.extend(['top = stack.pop()', 'below = stack[-1]'])
+    else:
+        lines.extend([
+            'if len(stack) >= 2:',
+            '    top = stack.pop()',
+            '    below = stack.pop()',
+            'elif stack:',
+            '    top = stack.pop()',
+            f'    below = {default_below}',
+            'else:',
+            f'    top, below = {default_top}, {default_below}'
+        ])
+
+    if instruction in DIVISION_ERRORS:
+        lines.extend(['if top == 0:', f'    raise FythonDivisionByZero({DIVISION_ERRORS[instruction]!r})'])
+
+    lines.append(f'value = {BINARY_EXPRESSIONS[instruction]}')
+    lines.append('stack[-1] = value' if unchecked else 'stack.append(value)')
+    if write_flag:
+        lines.append('zero_flag = (value == 0)')
+    return lines
+
+
+def instruction_source(instruction: str, argument: int, unchecked: bool = False, write_flag: bool = True) -> list[str]:
+    """Return the Python lines executing the instruction (which is not a jump) on the local variables 'stack' and 'zero_flag'.
+    If 'unchecked' is True, the stack is assumed to be deep enough for the instruction to never underflow (see 'analysis.is_underflow_free').
+    If 'write_flag' is False, the zero flag is not assigned, as its value is never observed (see 'analysis.zero_flag_liveness')."""
+
+    if instruction == 'print':
+        if argument <= 0:
+            return []
+        body = ['element = stack.pop()', 'vm._print(element)']
+        if write_flag:
+            body.append('zero_flag = (element == 0)')
+        if unchecked:
+            return body if argument == 1 else [f'for _ in range({argument}):'] + _indent(body)
+        if argument == 1:
+            return ['if stack:'] + _indent(body)
+        # Printing stops with the stack, however large the argument is
+        return [f'for _ in range(min({argument}, len(stack))):'] + _indent(body)
+
+    elif instruction == 'read':
+        if argument <= 0:
+            return []
+        if argument == 1:
+            lines = ['stack.append(vm._input())']
+        else:
+            lines = [f'for _ in range({argument}):', '    stack.append(vm._input())']
+        if write_flag:
+            lines.append('zero_flag = (stack[-1] == 0)')
+        return lines
+
+    elif instruction == 'copy':
+        if unchecked:
+            if argument <= 0:
+                return ['stack.pop()']
+            lines = []
+            if argument == 2:
+                lines.append('stack.append(stack[-1])')
+            elif argument > 2:
+                lines.append(f'stack.extend([stack[-1]] * {argument - 1})')
+        else:
+            lines = [
+                'if stack:',
+                f'    stack.extend([stack.pop()] * {argument})',
+                'else:',
+                f'    stack.extend([0] * {argument})'
+            ]
+        if argument >= 1 and write_flag:
+            lines.append('zero_flag = (stack[-1] == 0)')
+        return lines
+
+    elif instruction == 'place':
+        index = f'len(stack) - {argument}' if argument >= 0 else f'{-argument - 1}'
+        body = ['element = stack.pop()', f'stack.insert({index}, element)']
+        if write_flag:
+            body.insert(1, 'zero_flag = (element == 0)')
+        if unchecked:
+            return body
+        return ['if stack:'] + _indent(body) + ['else:', '    stack.append(0)']
+
+    elif instruction == 'pick':
+        flag = ['zero_flag = (stack[-1] == 0)'] if write_flag else []
+        if unchecked:
+            # Indexing from the top with a negative Python index, or from the bottom with a positive one
+            index = -argument - 1
+            return [f'stack.append(stack.pop({index}))'] + flag
+        if argument >= 0:
+            index = f'max(len(stack) - {argument + 1}, 0)'
+        else:
+            index = f'min({-argument - 1}, len(stack) - 1)'
+        return [
+            'if stack:',
+            f'    stack.append(stack.pop({index}))'
+        ] + _indent(flag) + [
+            'else:',
+            '    stack.append(0)'
+        ]
+
+    elif instruction == 'push':
+        lines = [f'stack.append({argument})']
+        if write_flag:
+            lines.append(f'zero_flag = {argument == 0}')
+        return lines
+
+    elif instruction == 'pop':
+        if argument <= 0:
+            return []
+        if not write_flag:
+            # Deleting more elements than the stack has just empties it
+            return ['stack.pop()'] if unchecked and argument == 1 else [f'del stack[-{argument}:]']
+        if unchecked:
+            if argument == 1:
+                return ['zero_flag = (stack.pop() == 0)']
+            return [f'zero_flag = (stack[-{argument}] == 0)', f'del stack[-{argument}:]']
+        return [
+            f'if len(stack) <= {argument}:',
+            '    stack.clear()',
+            '    zero_flag = True',
+            'else:',
+            f'    zero_flag = (stack[-{argument}] == 0)',
+            f'    del stack[-{argument}:]'
+        ]
+
+    elif instruction in BINARY_INSTRUCTIONS:
+        return _binary_source(instruction, unchecked, write_flag)
+
+    elif instruction == 'abs':
+        flag = ['zero_flag = (stack[-1] == 0)'] if write_flag else []
+        if unchecked:
+            return ['stack[-1] = abs(stack[-1])'] + flag
+        return [
+            'if stack:',
+            '    stack[-1] = abs(stack[-1])',
+            'else:',
+            '    stack.append(0)'
+        ] + flag
+
+    elif instruction == 'dup':
+        flag = ['zero_flag = (stack[-1] == 0)'] if write_flag else []
+        if unchecked:
+            index = -argument - 1
+            return [f'stack.append(stack[{index}])'] + flag
+        if argument >= 0:
+            index = f'max(len(stack) - {argument + 1}, 0)'
+        else:
+            index = f'min({-argument - 1}, len(stack) - 1)'
+        return [
+            'if stack:',
+            f'    stack.append(stack[{index}])',
+            'else:',
+            '    stack.append(0)'
+        ] + flag
+
+    elif instruction == 'dupn':
+        if argument <= 0:
+            return []
+        flag = ['zero_flag = (stack[-1] == 0)'] if write_flag else []
+        if unchecked:
+            return [f'stack.extend(stack[-{argument}:])'] + flag
+        return ['if stack:', f'    stack.extend(stack[-{argument}:])'] + _indent(flag)
+
+    elif instruction == 'inc':
+        flag = ['zero_flag = (stack[-1] == 0)'] if write_flag else []
+        if unchecked:
+            return [f'stack[-1] += {argument}'] + flag
+        return [
+            'if stack:',
+            f'    stack[-1] += {argument}',
+            'else:',
+            f'    stack.append({argument})'
+        ] + flag
+
+    elif instruction == 'swap':
+        flag = ['zero_flag = (stack[-1] == 0)'] if write_flag else []
+        if unchecked:
+            return ['stack[-1], stack[-2] = stack[-2], stack[-1]'] + flag
+        return [
+            'if len(stack) >= 2:',
+            '    stack[-1], stack[-2] = stack[-2], stack[-1]',
+            'elif stack:',
+            '    stack.append(0)',
+            'else:',
+            '    stack.extend((0, 0))'
+        ] + flag
+
+    message = f"unknown instruction '{instruction}'."
+    return [f'raise FythonAssemblyError({message!r})']
+
+
+def _block_leaders(instructions: list[tuple[str, int]]) -> list[int]:
+    """Return the sorted indices of the first instruction of every basic block."""
+
+    leaders = {0}
+    for index, (instruction, argument) in enumerate(instructions):
+        if instruction in JUMP_INSTRUCTIONS:
+            leaders.add(index + 1)
+            target = jump_target(index, argument)
+            if target < len(instructions):
+                leaders.add(target)
+        elif instruction not in OPCODES_NAMES:
+            leaders.add(index + 1)
+    return sorted(leader for leader in leaders if leader < len(instructions))
+
+
+def _block_source(instructions: list[tuple[str, int]], depths: list[int], liveness: list[bool], loop: InductionLoop, start: int, end: int) -> list[str]:
+    """Return the source of the function executing the instructions from 'start' to 'end' (excluded).
+    The function returns the index of the next instruction to execute and the zero flag."""
+
+    body: list[str] = []
+    last_instruction, last_argument = instructions[end - 1]
+    is_jump = last_instruction in JUMP_INSTRUCTIONS
+    target = jump_target(end - 1, last_argument) if is_jump else None
+
+    for index in range(start, end - 1 if is_jump else end):
+        instruction, argument = instructions[index]
+        body.append(f'# {index}: {instruction}{"" if argument is None else f" {argument}"}')
+        body.extend(instruction_source(instruction, argument, is_underflow_free(instruction, argument, depths[index]), liveness[index]))
+
+    if is_jump:
+        condition = 'zero_flag' if last_instruction == 'jmpz' else 'not zero_flag'
+        body.append(f'# {end - 1}: {last_instruction} {last_argument}')
+        # A block jumping to its own start is executed in a loop without going back to the dispatcher
+        if target == start:
+            body = ['while True:'] + _indent(body) + _indent([f'if not ({condition}):', '    break'])
+        elif target != end:
+            body.extend([f'if {condition}:', f'    return {target}, zero_flag'])
+
+    body.append(f'return {end}, zero_flag')
+
+    # Induction loops starting at this block are executed at once when they end
+    if loop is not None:
+        body = [
+            f'# loop {loop.head}-{loop.end} computed in closed form',
+            f'if loop_{start}.apply(stack):',
+            f'    return {loop.end + 1}, True'
+        ] + body
+
+    return [f'def block_{start}(stack, zero_flag, vm):'] + _indent(body)
+
+
+class CompiledProgram:
+    """A program translated into Python functions, one per basic block. Instructions whose stack cannot underflow
+    (according to 'analysis.stack_depths') are executed without any check, and zero flag assignments which are never
+    observed (according to 'analysis.zero_flag_liveness') are skipped. Counting loops (see 'loops.InductionLoop') are
+    replaced by the computation of their final state."""
+
+    def __init__(self, instructions: list[tuple[str, int]]) -> None:
+        self.instructions = instructions
+        self.source: str = None
+        self.blocks: list = None
+
+        # Programs jumping before their start, or with missing arguments, are executed by the interpreter
+        if is_analysable(instructions):
+            self._compile()
+
+    def _compile(self) -> None:
+        depths = stack_depths(self.instructions)
+        liveness = zero_flag_liveness(self.instructions)
+        loops = find_induction_loops(self.instructions, depths)
+        leaders = _block_leaders(self.instructions)
+
+        lines: list[str] = []
+        for start, end in zip(leaders, leaders[1:] + [len(self.instructions)]):
+            lines.extend(_block_source(self.instructions, depths, liveness, loops.get(start), start, end))
+            lines.append('')
+
+        self.source = '\n'.join(lines)
+        namespace = {
+            'FythonAssemblyError': FythonAssemblyError,
+            'FythonDivisionByZero': FythonDivisionByZero,
+            '_fython_pow': _fython_pow
+        }
+        for head, loop in loops.items():
+            namespace[f'loop_{head}'] = loop
+        exec(compile(self.source, '<fython>', 'exec'), namespace)
+
+        self.blocks = [None] * len(self.instructions)
+        for leader in leaders:
+            self.blocks[leader] = namespace[f'block_{leader}']
+
+    def run(self, interpreter: Interpreter) -> tuple[list[int], bool]:
+        """Execute the program with the I/O of the interpreter, and return the final stack and zero flag.
+        Executions needing the checkpoints of the interpreter (snapshots and limits) are delegated to it."""
+
+        if self.blocks is None or interpreter.resume or interpreter._needs_checkpoints():
+            return interpreter.execute_instructions(self.instructions)
+
+        interpreter.output_count = 0
+        interpreter.input_count = 0
+
+        stack: list[int] = list()
+        zero_flag = True
+        instruction_pointer = 0
+        blocks = self.blocks
+        length = len(blocks)
+
+        while instruction_pointer < length:
+            instruction_pointer, zero_flag = blocks[instruction_pointer](stack, zero_flag, interpreter)
+
+        return (stack, zero_flag)
+
+
+def compile_program(instructions: list[tuple[str, int]]) -> CompiledProgram:
+    return CompiledProgram(instructions)
@@ -0,0 +1,276 @@
+import argparse
+import io
+import random
+import threading
+import time
+
+from batch import execute_batch
+from compiler import compile_program
+from generator import ProgramGenerator
+from interpreter import FythonAssemblyError, FythonDivisionByZero, FythonLimitExceeded, Interpreter
+
+
+# Maximum number of attempts of the shrinking of a divergent program
+MAX_SHRINK_STEPS = 2000
+
+RANDOM_TEMPLATES = ('print {}', 'read {}', 'copy {}', 'dup {}', 'dupn {}', 'place {}', 'pick {}', 'push {}', 'pop {}', 'inc {}', 'add', 'sub', 'mul', 'div', 'mod', 'pow', 'abs', 'swap', 'cmp',
+                    'jmpz {}', 'jmpnz {}')
+
+
+class Outcome:
+    """Observable result of one execution: the printed text, the final stack and zero flag, or the error which stopped it."""
+
+    def __init__(self, output: str, stack: list[int] = None, zero_flag: bool = None, error: Exception = None) -> None:
+        self.output = output
+        self.stack = stack
+        self.zero_flag = zero_flag
+        self.error = (type(error).__name__, str(error)) if error is not None else None
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Outcome) and (self.output, self.stack, self.zero_flag, self.error) == (other.output, other.stack, other.zero_flag, other.error)
+
+    def __repr__(self) -> str:
+        if self.error is not None:
+            return f'Outcome(output={self.output!r}, error={self.error})'
+        return f'Outcome(output={self.output!r}, stack={self.stack}, zero_flag={self.zero_flag})'
+
+
+### ENGINES
+# An engine executes a program once for each list of input numbers, and returns an outcome for each of them.
+# The numbers are read and printed in the 'number' format.
+
+def _execute_each(run: callable, instructions: list[tuple[str, int]], inputs: list[list[int]], max_instructions: int = None, **options) -> list[Outcome]:
+    outcomes = []
+    for values in inputs:
+        writer = io.StringIO()
+        interpreter = Interpreter(writer, io.StringIO(''.join(f'{value}\n' for value in values)), output_format='number', max_instructions=max_instructions,
+                                  **options)
+        try:
+            stack, zero_flag = run(interpreter, instructions)
+            outcomes.append(Outcome(writer.getvalue(), stack, zero_flag))
+        except (FythonDivisionByZero, FythonAssemblyError) as e:
+            outcomes.append(Outcome(writer.getvalue(), error=e))
+    return outcomes
+
+def interpreter_engine(instructions: list[tuple[str, int]], inputs: list[list[int]]) -> list[Outcome]:
+    return _execute_each(lambda interpreter, instructions: interpreter.execute_instructions(instructions), instructions, inputs)
+
+def compiled_engine(instructions: list[tuple[str, int]], inputs: list[list[int]]) -> list[Outcome]:
+    program = compile_program(instructions)
+    return _execute_each(lambda interpreter, _: program.run(interpreter), instructions, inputs)
+
+def tracing_engine(instructions: list[tuple[str, int]], inputs: list[list[int]]) -> list[Outcome]:
+    # A low threshold, so the traces are used even by short executions
+    return _execute_each(lambda interpreter, instructions: interpreter.execute_instructions(instructions), instructions, inputs, jit=True, jit_threshold=2)
+
+def spill_engine(instructions: list[tuple[str, int]], inputs: list[list[int]]) -> list[Outcome]:
+    # One element kept in memory and segments of one element, so the deeper instructions always load elements back from the file
+    return _execute_each(lambda interpreter, instructions: interpreter.execute_instructions(instructions), instructions, inputs,
+                         spill_stack=1, spill_segment=1)
+
+def batch_engine(instructions: list[tuple[str, int]], inputs: list[list[int]]) -> list[Outcome]:
+    return [
+        Outcome(''.join(f'{value}\n' for value in result.output), result.stack, result.zero_flag, result.error)
+        for result in execute_batch(instructions, inputs)
+    ]
+
+# The first engine is the reference the other ones are compared to
+ENGINES: dict[str, callable] = {
+    'interpreter': interpreter_engine,
+    'compiled': compiled_engine,
+    'tracing': tracing_engine,
+    'batch': batch_engine,
+    'spill': spill_engine,
+}
+
+def register_engine(name: str, engine: callable) -> None:
+    """Add an engine to the ones compared by 'run_conformance'. It is called as engine(instructions, inputs) -> list[Outcome]."""
+    ENGINES[name] = engine
+
+
+### COMPARISON
+def _reference_outcomes(instructions: list[tuple[str, int]], inputs: list[list[int]], max_instructions: int) -> list[Outcome]:
+    """Return the outcomes of the reference interpreter, or None if one of the executions does not end within 'max_instructions'."""
+    try:
+        return _execute_each(lambda interpreter, instructions: interpreter.execute_instructions(instructions), instructions, inputs, max_instructions)
+    except FythonLimitExceeded:
+        return None
+
+def _run_with_timeout(engine: callable, instructions: list[tuple[str, int]], inputs: list[list[int]], timeout: float) -> list[Outcome]:
+    """Run the engine in a thread, so an engine looping forever is reported instead of blocking the harness.
+    Return None if it did not end in time."""
+
+    results = []
+    def run() -> None:
+        try:
+            results.append(engine(instructions, inputs))
+        except Exception as e:
+            results.append([Outcome('', error=e)] * len(inputs))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return results[0] if results else None
+
+def _diverges(engine: callable, instructions: list[tuple[str, int]], values: list[int], max_instructions: int, timeout: float) -> bool:
+    expected = _reference_outcomes(instructions, [values], max_instructions)
+    if expected is None:
+        return False
+    return _run_with_timeout(engine, instructions, [values], timeout) != expected
+
+def shrink(engine: callable, instructions: list[tuple[str, int]], values: list[int], max_instructions: int = 100_000, timeout: float = 5) -> tuple[list[tuple[str, int]], list[int]]:
+    """Return a smaller program and input on which the engine still diverges from the reference interpreter.
+    Chunks of instructions are removed (halving their size down to single instructions), then the arguments and the input values
+    are brought towards 0, as long as the divergence remains."""
+
+    attempts = 0
+    def still_diverges(candidate: list[tuple[str, int]], candidate_values: list[int]) -> bool:
+        nonlocal attempts
+        attempts += 1
+        return _diverges(engine, candidate, candidate_values, max_instructions, timeout)
+
+    instructions = list(instructions)
+    chunk = max(len(instructions) // 2, 1)
+    while chunk >= 1 and attempts < MAX_SHRINK_STEPS:
+        index = 0
+        while index < len(instructions) and attempts < MAX_SHRINK_STEPS:
+            candidate = instructions[:index] + instructions[index + chunk:]
+            if candidate and still_diverges(candidate, values):
+                instructions = candidate
+            else:
+                index += chunk
+        chunk //= 2
+
+    for index, (instruction, argument) in enumerate(instructions):
+        if argument is None:
+            continue
+        for smaller in (0, 1, -1, argument // 2):
+            if abs(smaller) >= abs(argument) or attempts >= MAX_SHRINK_STEPS:
+                continue
+            candidate = instructions[:index] + [(instruction, smaller)] + instructions[index + 1:]
+            if still_diverges(candidate, values):
+                instructions = candidate
+                break
+
+    while values and attempts < MAX_SHRINK_STEPS and still_diverges(instructions, values[:-1]):
+        values = values[:-1]
+    for index, value in enumerate(values):
+        if value != 0 and attempts < MAX_SHRINK_STEPS and still_diverges(instructions, values[:index] + [0] + values[index + 1:]):
+            values = values[:index] + [0] + values[index + 1:]
+
+    return (instructions, values)
+
+
+class Divergence:
+    def __init__(self, engine: str, instructions: list[tuple[str, int]], values: list[int], expected: Outcome, got: Outcome) -> None:
+        self.engine = engine
+        self.instructions = instructions
+        self.values = values
+        self.expected = expected
+        self.got = got
+        # Smallest program and input found with the same divergence
+        self.reproducer: tuple[list[tuple[str, int]], list[int]] = None
+
+    def __str__(self) -> str:
+        text = f'{self.engine} diverges on input {self.values}: expected {self.expected}, got {self.got}'
+        if self.reproducer is not None:
+            instructions, values = self.reproducer
+            assembly = '; '.join(instruction if argument is None else f'{instruction} {argument}' for instruction, argument in instructions)
+            text += f'\n  reproducer: [{assembly}] with input {values}'
+        return text
+
+
+class ConformanceReport:
+    def __init__(self, engines: list[str]) -> None:
+        self.engines = engines
+        self.programs = 0
+        # Programs not ending within the maximum number of instructions with the reference, which are not compared
+        self.skipped = 0
+        self.times: dict[str, float] = {engine: 0.0 for engine in engines}
+        self.divergences: list[Divergence] = []
+
+    def speedup(self, engine: str) -> float:
+        reference = self.times[self.engines[0]]
+        return reference / self.times[engine] if self.times[engine] > 0 else float('inf')
+
+    def summary(self) -> str:
+        lines = [f'{self.programs} programs compared, {self.skipped} skipped (not ending), {len(self.divergences)} divergences']
+        for engine in self.engines:
+            lines.append(f'{engine} : {self.times[engine]:.3f} s, speedup {self.speedup(engine):.2f}x')
+        lines.extend(map(str, self.divergences))
+        return '\n'.join(lines)
+
+
+def run_conformance(programs: list[list[tuple[str, int]]], inputs: list[list[int]], engines: list[str] = None, max_instructions: int = 100_000,
+                    timeout: float = 5, shrink_divergences: bool = True) -> ConformanceReport:
+    """Execute every program on every input with each engine, and compare their outcomes with the ones of the first engine
+    (the interpreter by default). The time of each engine is measured on the programs which end with the reference."""
+
+    engines = engines if engines is not None else list(ENGINES)
+    report = ConformanceReport(engines)
+    reference, others = engines[0], engines[1:]
+
+    for instructions in programs:
+        start = time.perf_counter()
+        expected = _reference_outcomes(instructions, inputs, max_instructions)
+        if expected is None:
+            report.skipped += 1
+            continue
+        report.times[reference] += time.perf_counter() - start
+        report.programs += 1
+
+        for engine in others:
+            start = time.perf_counter()
+            outcomes = _run_with_timeout(ENGINES[engine], instructions, inputs, timeout)
+            report.times[engine] += time.perf_counter() - start
+            if outcomes is None:
+                outcomes = [Outcome('', error=TimeoutError(f'did not end within {timeout} seconds'))] * len(inputs)
+
+            for values, expected_outcome, outcome in zip(inputs, expected, outcomes):
+                if outcome != expected_outcome:
+                    divergence = Divergence(engine, instructions, values, expected_outcome, outcome)
+                    if shrink_divergences:
+                        divergence.reproducer = shrink(ENGINES[engine], instructions, values, max_instructions, timeout)
+                    report.divergences.append(divergence)
+                    # One divergence per program and engine is enough
+                    break
+
+    return report
+
+
+def random_program(generator: random.Random, length: int) -> list[tuple[str, int]]:
+    """Return a small random program, with every instruction and small arguments, so the errors and corner cases are exercised."""
+
+    lines = []
+    for _ in range(length):
+        template = generator.choice(RANDOM_TEMPLATES)
+        if template.startswith('jmp'):
+            # Backward jumps stay inside the program
+            lines.append(template.format(generator.randint(-len(lines), 4)))
+        else:
+            lines.append(template.format(generator.randint(-3, 4)))
+    return Interpreter()._parse_lines_to_instructions(lines)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the execution engines with the interpreter on random programs.")
+
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES), help="Engines compared, the first one is the reference. Default all.")
+    parser.add_argument('--random-programs', type=int, default=200, help="Number of small random programs. Default 200.")
+    parser.add_argument('--generated-programs', type=int, default=20, help="Number of programs made by the generator (see 'generator.py'). Default 20.")
+    parser.add_argument('--size', type=int, default=500, help="Approximate number of instructions of the generated programs. Default 500.")
+    parser.add_argument('--inputs', type=int, default=5, help="Number of input lists each program is executed with. Default 5.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the random programs and inputs. Default 0.")
+    parser.add_argument('--max-instructions', type=int, default=100_000, help="Programs not ending within this number of instructions are skipped. Default 100000.")
+
+    arguments = parser.parse_args()
+    generator = random.Random(arguments.seed)
+    programs = [random_program(generator, generator.randint(1, 25)) for _ in range(arguments.random_programs)]
+    programs += [
+        Interpreter()._parse_lines_to_instructions(ProgramGenerator(arguments.seed + index, mix={'read': 1}).instructions(arguments.size))
+        for index in range(arguments.generated_programs)
+    ]
+    inputs = [[generator.randint(-5, 5) for _ in range(generator.randint(0, 10))] for _ in range(arguments.inputs)]
+
+    print(run_conformance(programs, inputs, arguments.engines, arguments.max_instructions).summary())
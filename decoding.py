@@ -0,0 +1,233 @@
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+import os
+from typing import Iterable, Iterator
+
+from deltas import Deltas
+from interpreter import OPCODES, Interpreter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Below this number of deltas, starting the processes takes longer than decoding sequentially
+MIN_PARALLEL_DELTAS = 500_000
+# Deltas sent to a worker after the end of its chunk, so the instructions and comments starting near the end can be completed
+OVERLAP = 1024
+MIN_CHUNK_SIZE = 50_000
+# Number of deltas requested at once by the streaming decoder, and number of decoded deltas from which they are dropped
+STREAM_BATCH_SIZE = 4096
+STREAM_TRIM_SIZE = 65_536
+# Below this number of deltas, the sequential decoder is faster than building the NumPy arrays
+MIN_VECTORIZED_DELTAS = 512
+# Numbers with more digits than this may not fit in an int64, so they are built by the sequential decoder
+MAX_VECTORIZED_DIGITS = 18
+
+# Name of the instruction of each opcode, whether it needs a number, and its default number, in the order of 'OPCODES'
+OPCODE_NAMES = [name for name, _, _ in OPCODES.values()]
+OPCODE_NUMBERS = [need_number for _, need_number, _ in OPCODES.values()]
+if np is not None:
+    # Index of the opcode of each Delta_I (-1 or 1) and Delta_w modulo 10, at (Delta_I == 1) * 19 + Delta_w + 9 (-1 if there is none)
+    OPCODE_TABLE = np.full(2 * 19, -1, dtype=np.int64)
+    OPCODE_TABLE[[(opcode_di == 1) * 19 + opcode_dw + 9 for opcode_di, opcode_dw in OPCODES]] = np.arange(len(OPCODES))
+    NEEDS_NUMBER = np.array(OPCODE_NUMBERS)
+    DEFAULT_NUMBERS = np.array([default_number or 0 for _, _, default_number in OPCODES.values()], dtype=np.int64)
+
+
+def _decode_chunk(deltas: list[tuple[int, int]], start: int, end: int, is_last: bool) -> tuple[list[int], list[str], int]:
+    """Decode the deltas of a chunk as if a decoding step started at its first one. 'deltas' holds the deltas from the index 'start'
+    of the stream up to the chunk end 'end' plus the overlap, and 'is_last' is True if they go up to the end of the stream.
+    Return the index of each step starting before 'end', the assembly line of each of them (None if there is none), and the index of the
+    step following the last one. A step which could read deltas after the ones sent is not decoded, so its index is returned instead."""
+
+    interpreter = Interpreter()
+    positions: list[int] = []
+    lines: list[str] = []
+    index = 0
+    while start + index < end:
+        try:
+            line, next_index = interpreter._decode_delta(deltas, index)
+        except Exception:
+            # The deltas may be inside a comment of a previous chunk, so the error is left to the stitching, which decodes them sequentially
+            break
+        # The number or the comment may continue in the deltas which were not sent
+        if next_index >= len(deltas) and not is_last:
+            break
+        positions.append(start + index)
+        lines.append(line)
+        index = next_index
+    return (positions, lines, start + index)
+
+
+def _delta_columns(deltas: list[tuple[int, int]]) -> tuple['np.ndarray', 'np.ndarray']:
+    """Return the Delta_I and the Delta_w of the deltas as two int64 arrays, or None if they are not all pairs of integers of 64 bits."""
+
+    if isinstance(deltas, Deltas):
+        return (np.asarray(deltas.di, dtype=np.int64), np.asarray(deltas.dw, dtype=np.int64))
+    try:
+        values = np.fromiter(chain.from_iterable(deltas), dtype=np.int64, count=2 * len(deltas))
+    except (ValueError, TypeError, OverflowError):
+        # Comments of 'Interpreter.assembly_to_deltas', or integers too large
+        return None
+    return (values[0::2], values[1::2])
+
+def deltas_to_assembly_vectorized(deltas: list[tuple[int, int]]) -> list[str]:
+    """Same as 'Interpreter.deltas_to_assembly', with the deltas classified by NumPy operations on all of them at once : the opcode of
+    each delta, the length of the run of deltas with a Delta_I of 0 following it (its argument), the end of the comment it would open,
+    and so the index of the decoding step following the one which would start at it. The steps actually decoded are then found by
+    following these indices from the first delta, which is the only sequential part. The arguments of up to 18 digits are computed from
+    their digits arithmetically, the longer ones (and the digits outside of -10 to 9, which are not single digits) by the sequential decoder.
+    The deltas are decoded sequentially when they are short, not all integers, or when NumPy is not installed."""
+
+    interpreter = Interpreter()
+    if np is None or len(deltas) < MIN_VECTORIZED_DELTAS or (columns := _delta_columns(deltas)) is None:
+        return interpreter.deltas_to_assembly(deltas)
+    di, dw = columns
+    length = len(di)
+    positions = np.arange(length)
+
+    # Opcode of each delta, as its index in 'OPCODES' (-1 if it is not an instruction)
+    opcodes = np.where((di == -1) | (di == 1), OPCODE_TABLE[(di == 1) * 19 + np.fmod(dw, 10) + 9], -1)
+    is_opcode = opcodes >= 0
+    has_argument = np.zeros(length, dtype=bool)
+    has_argument[is_opcode] = NEEDS_NUMBER[opcodes[is_opcode]]
+
+    # Length of the run of deltas with a Delta_I of 0 starting at each index (and after the last one)
+    run_ends = np.append(np.where(di != 0, positions, length), length)
+    run_lengths = np.minimum.accumulate(run_ends[::-1])[::-1] - np.arange(length + 1)
+    argument_lengths = np.where(has_argument, run_lengths[1:], 0)
+
+    # Index of the step following the one which would start at each delta : after the argument of an instruction, after the lines
+    # skipped by a line comment, or after the end of a block comment (the next delta opening one, or the end of the deltas)
+    next_positions = positions + 1 + argument_lengths
+    line_comments = (di == 0) & (dw > 0)
+    next_positions[line_comments] += np.minimum(dw[line_comments], length)
+    blocks = np.flatnonzero((di == 0) & (dw < 0))
+    next_positions[blocks] = np.append(blocks, length - 1)[np.searchsorted(blocks, blocks, side='right')] + 1
+
+    # The steps actually decoded are found by following the indices from the first delta
+    steps = []
+    step = 0
+    next_list = next_positions.tolist()
+    while step < length:
+        steps.append(step)
+        step = next_list[step]
+    steps = np.array(steps, dtype=np.int64)
+    starts = steps[is_opcode[steps]]
+
+    codes = opcodes[starts]
+
+    # Arguments computed from their digits (a negative digit d stands for 10 + d) when every digit is a single one : arithmetically when they
+    # fit in an int64, with the digits aligned on the right so every argument takes the same number of multiplications by 10, and by
+    # parsing their digits otherwise. The other arguments are left to the sequential decoder, which raises the same errors.
+    arguments = DEFAULT_NUMBERS[codes]
+    digit_steps = np.flatnonzero(argument_lengths[starts] > 0)
+    first_digits = starts[digit_steps] + 1
+    digit_counts = argument_lengths[first_digits - 1]
+    digits = np.where(dw < 0, dw + 10, dw)
+    not_single = np.concatenate(([0], np.cumsum((dw < -10) | (dw > 9))))
+    single = not_single[first_digits + digit_counts] == not_single[first_digits]
+    arithmetic = single & (digit_counts <= MAX_VECTORIZED_DIGITS)
+    width = int(digit_counts[arithmetic].max(initial=0))
+    values = np.zeros(len(first_digits), dtype=np.int64)
+    for digit in range(width):
+        indices = first_digits + digit_counts - width + digit
+        values = values * 10 + np.where(indices >= first_digits, digits[np.clip(indices, 0, length - 1)], 0)
+    # A first digit of 0 makes the number negative
+    negative = dw[first_digits] == 0
+    arguments[digit_steps] = np.where(negative, -values, values)
+
+    arguments = arguments.tolist()
+    long = single & ~arithmetic
+    if long.any():
+        text = np.where((digits >= 0) & (digits <= 9), digits + ord('0'), 0).astype(np.uint8).tobytes()
+        for step, first_digit, count, sign in zip(digit_steps[long].tolist(), first_digits[long].tolist(), digit_counts[long].tolist(),
+                                                  np.where(negative[long], -1, 1).tolist()):
+            arguments[step] = sign * int(text[first_digit:first_digit + count])
+    for step, first_digit in zip(digit_steps[~single].tolist(), first_digits[~single].tolist()):
+        arguments[step], _ = interpreter._construct_number_from_deltas(deltas, 0, first_digit)
+
+    return [f'{OPCODE_NAMES[code]} {argument}' if OPCODE_NUMBERS[code] else OPCODE_NAMES[code] for code, argument in zip(codes.tolist(), arguments)]
+
+
+def deltas_to_assembly_parallel(deltas: list[tuple[int, int]], jobs: int = None, chunk_size: int = None) -> list[str]:
+    """Same as 'Interpreter.deltas_to_assembly', with the deltas decoded by chunks in a pool of 'jobs' processes (default the number
+    of processors). Each chunk is decoded speculatively, as if no instruction, number or comment started before it. The chunks are then
+    stitched in order : the deltas from where the previous chunk stopped are decoded sequentially until a step starts at the same index
+    as one of the chunk, after which both decodings are identical. Numbers and comments only span a few deltas, so this usually
+    happens at once or after a few steps. Streams shorter than 'MIN_PARALLEL_DELTAS' are decoded in this process (see
+    'deltas_to_assembly_vectorized')."""
+
+    interpreter = Interpreter()
+    jobs = jobs if jobs is not None else os.cpu_count() or 1
+    if jobs <= 1 or (chunk_size is None and len(deltas) < MIN_PARALLEL_DELTAS):
+        return deltas_to_assembly_vectorized(deltas)
+
+    chunk_size = chunk_size if chunk_size is not None else max(len(deltas) // (jobs * 4) + 1, MIN_CHUNK_SIZE)
+    bounds = [(start, min(start + chunk_size, len(deltas))) for start in range(0, len(deltas), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(_decode_chunk, deltas[start:end + OVERLAP], start, end, end + OVERLAP >= len(deltas))
+            for start, end in bounds
+        ]
+
+        lines: list[str] = []
+        index = 0
+        for (start, end), future in zip(bounds, futures):
+            positions, chunk_lines, stop = future.result()
+            # A comment of the previous chunks may end after this one
+            if index >= end:
+                continue
+
+            step = bisect_left(positions, index)
+            while index < end and (step == len(positions) or positions[step] != index):
+                line, index = interpreter._decode_delta(deltas, index)
+                if line is not None:
+                    lines.append(line)
+                step = bisect_left(positions, index)
+
+            if index < end:
+                lines.extend(line for line in chunk_lines[step:] if line is not None)
+                index = stop
+                # The last steps of the chunk which needed more deltas than the ones sent
+                while index < end:
+                    line, index = interpreter._decode_delta(deltas, index)
+                    if line is not None:
+                        lines.append(line)
+
+    return lines
+
+
+def iter_assembly(deltas: Iterable[tuple[int, int]]) -> Iterator[str]:
+    """Yield the assembly lines of the deltas as soon as they are decoded (see 'Interpreter.deltas_to_assembly'), requesting the deltas
+    by batches from the iterable. Like the chunks of the parallel decoding, a step which could read deltas after the ones received is
+    decoded again once more deltas are received, so the lines are the same as with the sequential decoder."""
+
+    interpreter = Interpreter()
+    deltas = iter(deltas)
+    # Received deltas which are not decoded yet, from the index 'index'
+    buffer: list[tuple[int, int]] = []
+    index = 0
+    exhausted = False
+
+    while True:
+        if index >= len(buffer) and exhausted:
+            return
+        if index < len(buffer):
+            line, next_index = interpreter._decode_delta(buffer, index)
+            if next_index < len(buffer) or exhausted:
+                if line is not None:
+                    yield line
+                index = next_index
+                if index >= STREAM_TRIM_SIZE:
+                    del buffer[:index]
+                    index = 0
+                continue
+
+        batch = list(islice(deltas, STREAM_BATCH_SIZE))
+        exhausted = len(batch) < STREAM_BATCH_SIZE
+        buffer.extend(batch)
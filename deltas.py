@@ -0,0 +1,90 @@
+from array import array
+from typing import Iterable, Iterator, Sequence
+
+
+# Type codes tried in order for each column, when a value does not fit in the current one
+DI_TYPECODES = ('b', 'i', 'q')
+DW_TYPECODES = ('i', 'q')
+
+
+class Deltas(Sequence):
+    """Compact list of deltas, with the Delta_I and the Delta_w stored in two typed arrays instead of a list of tuples.
+    A delta takes 5 bytes instead of about 64 (a tuple and its pointer), and it behaves like a list of (di, dw) tuples: indexing, iteration, slicing, 'append',
+    'extend' and the comparison with a list. A column is widened when a value does not fit in it (up to 64 bits integers)."""
+
+    __slots__ = ('di', 'dw')
+
+    def __init__(self, deltas: Iterable[tuple[int, int]] = ()) -> None:
+        self.di = array(DI_TYPECODES[0])
+        self.dw = array(DW_TYPECODES[0])
+        self.extend(deltas)
+
+    def _widen(self, di: int, dw: int) -> None:
+        """Convert the columns in which the delta does not fit to the next type code, or raise OverflowError if there is none."""
+        for name, typecode, value in (('di', DI_TYPECODES, di), ('dw', DW_TYPECODES, dw)):
+            column = getattr(self, name)
+            try:
+                array(column.typecode, [value])
+            except OverflowError:
+                position = typecode.index(column.typecode)
+                if position + 1 == len(typecode):
+                    raise OverflowError(f'delta ({di}, {dw}) does not fit in 64 bits integers')
+                setattr(self, name, array(typecode[position + 1], column))
+
+    def append(self, delta: tuple[int, int]) -> None:
+        self.extend((delta,))
+
+    def extend(self, deltas: Iterable[tuple[int, int]]) -> None:
+        append_di, append_dw = self.di.append, self.dw.append
+        for di, dw in deltas:
+            try:
+                append_di(di)
+                append_dw(dw)
+            except OverflowError:
+                # The delta is added again once the columns are widened, without the part which fitted
+                if len(self.di) > len(self.dw):
+                    self.di.pop()
+                self._widen(di, dw)
+                append_di, append_dw = self.di.append, self.dw.append
+                append_di(di)
+                append_dw(dw)
+
+    def __len__(self) -> int:
+        return len(self.di)
+
+    def __getitem__(self, index: int | slice) -> 'tuple[int, int] | Deltas':
+        di, dw = self.di[index], self.dw[index]
+        if isinstance(index, slice):
+            deltas = Deltas()
+            deltas.di, deltas.dw = di, dw
+            return deltas
+        return (di, dw)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return zip(self.di, self.dw)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Deltas):
+            return self.di == other.di and self.dw == other.dw
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(delta == other_delta for delta, other_delta in zip(self, other))
+        return NotImplemented
+
+    def __add__(self, other: Iterable[tuple[int, int]]) -> 'Deltas':
+        deltas = self[:]
+        deltas.extend(other)
+        return deltas
+
+    def __repr__(self) -> str:
+        return f'Deltas({list(self)})'
+
+    def __getstate__(self) -> tuple[array, array]:
+        return (self.di, self.dw)
+
+    def __setstate__(self, state: tuple[array, array]) -> None:
+        self.di, self.dw = state
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the values in bytes, without the fixed size of the arrays."""
+        return len(self.di) * self.di.itemsize + len(self.dw) * self.dw.itemsize
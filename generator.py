@@ -0,0 +1,193 @@
+import argparse
+import os
+import random
+
+from carrier import assembly_to_python_code
+from interpreter import Interpreter
+
+
+# Relative weights of the kinds of code generated. 'read' is 0 by default, so the programs can be executed without input
+DEFAULT_MIX = {
+    'push': 4,
+    'arithmetic': 4,
+    'move': 2,
+    'print': 1,
+    'branch': 1,
+    'loop': 1,
+    'read': 0,
+}
+
+# Modulus applied after each power, so the integers stay small however long the program is
+POW_MODULUS = 1_000_003
+
+WORDS = ('stack', 'loop', 'value', 'counter', 'delta', 'push', 'the', 'next', 'top', 'result')
+
+
+class ProgramGenerator:
+    """Generator of random valid Fython programs, to measure how the conversions and the execution scale with the size of the inputs.
+    The programs always end: every loop counts down from 'loop_iterations', and the code inside a loop or between two loops never
+    touches the elements of the stack below it, so the counters are never modified.
+     - loop_depth : maximum number of nested loops ;
+     - stack_pressure : maximum number of elements pushed by each straight-line part of the code ;
+     - argument_digits : number of digits of the pushed numbers ;
+     - comment_density : probability of a comment line before each line of the assembly and of the Fython code ;
+     - line_length : minimum length of the lines of the Fython code, reached with a comment full of string literals ;
+     - mix : relative weights of the kinds of code (see 'DEFAULT_MIX')."""
+
+    def __init__(self, seed: int = None, loop_depth: int = 2, loop_iterations: int = 10, stack_pressure: int = 8, argument_digits: int = 2,
+                 comment_density: float = 0.0, line_length: int = 0, mix: dict[str, int] = None) -> None:
+        self.random = random.Random(seed)
+        self.loop_depth = loop_depth
+        self.loop_iterations = loop_iterations
+        self.stack_pressure = max(stack_pressure, 2)
+        self.argument_digits = max(argument_digits, 1)
+        self.comment_density = comment_density
+        self.line_length = line_length
+        self.mix = {**DEFAULT_MIX, **(mix or {})}
+
+    def _number(self) -> int:
+        number = self.random.randint(10 ** (self.argument_digits - 1), 10 ** self.argument_digits - 1)
+        return number if self.random.random() < 0.8 else -number
+
+    def _comment(self) -> str:
+        return '# ' + ' '.join(self.random.choice(WORDS) for _ in range(self.random.randint(1, 6)))
+
+    def _segment(self, size: int, depth: int) -> list[str]:
+        """Return about 'size' instructions which leave the stack as they found it, without touching the elements already on it."""
+
+        kinds = [kind for kind in self.mix if self.mix[kind] > 0 and (kind != 'loop' or depth < self.loop_depth)]
+        weights = [self.mix[kind] for kind in kinds]
+
+        lines: list[str] = []
+        # Number of elements pushed by the segment and still on the stack
+        height = 0
+        while len(lines) < size:
+            kind = self.random.choices(kinds, weights)[0] if kinds else 'push'
+
+            if kind == 'loop' and size - len(lines) >= 6:
+                lines.extend(self._loop(self.random.randint(1, max((size - len(lines)) // 2, 1)), depth + 1))
+            elif kind in ('push', 'read') and height < self.stack_pressure:
+                lines.append(f'push {self._number()}' if kind == 'push' else 'read 1')
+                height += 1
+            elif kind == 'arithmetic' and height >= 2:
+                lines.append(self.random.choice(('add', 'sub')))
+                height -= 1
+            elif kind == 'arithmetic' and height == 1:
+                # The other operand is a literal, so the integers grow slowly and are never divided by 0
+                operation = self.random.choice(('mul', 'div', 'mod', 'pow', 'abs'))
+                if operation == 'pow':
+                    lines.extend(['push 2', 'pow', f'push {POW_MODULUS}', 'mod'])
+                elif operation == 'abs':
+                    lines.append('abs')
+                else:
+                    lines.extend([f'push {abs(self._number())}', operation])
+            elif kind == 'move' and height >= 2:
+                operation = self.random.choice(('place', 'pick', 'copy'))
+                if operation == 'copy' and height < self.stack_pressure:
+                    lines.append('copy 2')
+                    height += 1
+                else:
+                    lines.append(f'{"pick" if operation == "copy" else operation} {self.random.randint(1, height - 1)}')
+            elif kind == 'print' and height >= 1:
+                lines.append('print 1')
+                height -= 1
+            elif kind == 'branch':
+                # A forward jump over code which does not change the stack
+                skipped = [f'push {self._number()}', self.random.choice(('print 1', 'pop 1'))]
+                lines.extend([f'{self.random.choice(("jmpz", "jmpnz"))} {len(skipped) + 1}'] + skipped)
+            elif height >= 1:
+                # The chosen kind can not be generated with this height (e.g. a push on a full segment)
+                lines.append('pop 1')
+                height -= 1
+            else:
+                lines.append(f'push {self._number()}')
+                height += 1
+
+        if height > 0:
+            lines.append(f'pop {height}')
+        return lines
+
+    def _loop(self, size: int, depth: int) -> list[str]:
+        """Return a loop executing its body 'loop_iterations' times. Its counter stays on top of the stack below the body."""
+
+        body = self._segment(max(size - 5, 1), depth)
+        return [f'push {max(self.loop_iterations, 1)}'] + body + ['push 1', 'sub', f'jmpnz -{len(body) + 2}', 'pop 1']
+
+
+    def instructions(self, size: int) -> list[str]:
+        """Return the assembly of a program of about 'size' instructions, without comments."""
+        return self._segment(size, 0)
+
+    def assembly(self, instructions: list[str]) -> list[str]:
+        lines: list[str] = []
+        for line in instructions:
+            if self.random.random() < self.comment_density:
+                lines.append(f'    {self._comment()}')
+            lines.append(line)
+        return lines
+
+    def python_code(self, instructions: list[str]) -> str:
+        lines: list[str] = []
+        for line in assembly_to_python_code(instructions).splitlines():
+            indentation = line[:len(line) - len(line.lstrip())]
+            if self.random.random() < self.comment_density:
+                lines.append(f'{indentation}{self._comment()}')
+            if len(line) < self.line_length:
+                # String literals and '#' inside the comment are what makes the whitespace count of a line slower
+                padding = '  #'
+                while len(line) + len(padding) < self.line_length:
+                    padding += self.random.choice((" 'a b'", ' "#"', ' word'))
+                line += padding
+            lines.append(line)
+        return '\n'.join(lines) + '\n'
+
+
+def write_program(generator: ProgramGenerator, path: str, size: int, formats: str = 'pda') -> None:
+    """Write one program, as Fython code ('p'), deltas ('d') and assembly ('a'), named like in the 'examples' folder."""
+
+    instructions = generator.instructions(size)
+    if 'p' in formats:
+        with open(f'{path}.py', 'w', encoding='utf-8') as fo:
+            fo.write(generator.python_code(instructions))
+    if 'd' in formats:
+        with open(f'{path}_deltas.txt', 'w') as fo:
+            fo.write("di\tdw\n")
+            fo.write("\n".join(f'{di}\t{dw}' for di, dw in Interpreter().assembly_to_deltas(instructions)))
+    if 'a' in formats:
+        with open(f'{path}_assembly.txt', 'w') as fo:
+            fo.write("\n".join(generator.assembly(instructions)))
+
+def generate_corpus(directory: str, count: int, size: int, formats: str = 'pda', seed: int = 0, **options) -> list[str]:
+    """Write 'count' programs of about 'size' instructions in the directory. The options are the ones of 'ProgramGenerator'.
+    Return the paths of the programs, without their suffix."""
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f'program_{index:04d}')
+        write_program(ProgramGenerator(seed + index, **options), path, size, formats)
+        paths.append(path)
+    return paths
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generator of random Fython programs, to test how the interpreter scales.")
+
+    parser.add_argument('directory', help="Directory where the programs are written.")
+    parser.add_argument('--count', '-n', type=int, default=1, help="Number of programs. Default 1.")
+    parser.add_argument('--size', type=int, default=1000, help="Approximate number of instructions of each program. Default 1000.")
+    parser.add_argument('--formats', default='pda', help="Formats written: 'p' for Fython code, 'd' for deltas, 'a' for assembly. Default 'pda'.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the first program, the next ones use the following seeds. Default 0.")
+    parser.add_argument('--loop-depth', type=int, default=2, help="Maximum number of nested loops. Default 2.")
+    parser.add_argument('--loop-iterations', type=int, default=10, help="Number of iterations of each loop. Default 10.")
+    parser.add_argument('--stack-pressure', type=int, default=8, help="Maximum number of elements pushed by each straight-line part of the code. Default 8.")
+    parser.add_argument('--argument-digits', type=int, default=2, help="Number of digits of the pushed numbers. Default 2.")
+    parser.add_argument('--comment-density', type=float, default=0.0, help="Probability of a comment line before each line. Default 0.")
+    parser.add_argument('--line-length', type=int, default=0, help="Minimum length of the lines of the Fython code. Default 0.")
+
+    arguments = parser.parse_args()
+    paths = generate_corpus(arguments.directory, arguments.count, arguments.size, arguments.formats, arguments.seed,
+                            loop_depth=arguments.loop_depth, loop_iterations=arguments.loop_iterations, stack_pressure=arguments.stack_pressure,
+                            argument_digits=arguments.argument_digits, comment_density=arguments.comment_density, line_length=arguments.line_length)
+    print(f"{len(paths)} programs written to '{arguments.directory}'.")
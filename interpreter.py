@@ -1,6 +1,16 @@
 import ast
+import hashlib
+import math
+import os
 import re
-from typing import IO
+import struct
+import time
+from itertools import islice
+from typing import IO, Iterable, Iterator
+
+from deltas import Deltas
+from memory import MemoryProfile
+from snapshot import Snapshot, SnapshotError, read_snapshot, write_snapshot
 
 
 
@@ -13,11 +23,13 @@ OPCODES: dict[tuple[int, int], tuple[str, bool, int]] = {
     (-1, 1): ('print', True, 1),
     (-1, -1): ('read', True, 1),
     (-1, 2): ('copy', True, 2),
-  # (-1, -2): # Unused for now
+    (-1, -2): ('dup', True, 0),
     (-1, 3): ('jmpz', True, 1),
     (-1, -3): ('jmpnz', True, 1),
     (-1, 4): ('place', True, 1),
     (-1, -4): ('pick', True, 1),
+    (-1, 5): ('dupn', True, 2),
+    (-1, -5): ('inc', True, 1),
 
     (1, 1): ('push', True, 0),
     (1, -1): ('pop', True, 1),
@@ -27,7 +39,9 @@ OPCODES: dict[tuple[int, int], tuple[str, bool, int]] = {
     (1, -3): ('div', False, None),
     (1, 4): ('mod', False, None),
     (1, -4): ('pow', False, None),
-    (1, 5): ('abs', False, None)
+    (1, 5): ('abs', False, None),
+    (1, -5): ('swap', False, None),
+    (1, 6): ('cmp', False, None)
 }
 
 # Build the inverse dictionary : the string instruction is the key, the tuple opcode is the value
@@ -44,14 +58,56 @@ REGEX_LITERAL_STR_SINGLE_QUOTES = re.compile(r"'(?:[^'\\\\]|\\\\[\\s\\S])*'")
 REGEX_COMMENT = re.compile(r'#[\s\S]*$')
 
 
+# Returned by 'Interpreter._next_checkpoint' when the execution does not need any checkpoint
+NO_CHECKPOINT = math.inf
+# Number of executed instructions between two checks of the execution time
+TIME_CHECK_INTERVAL = 100_000
+
+# Binary I/O formats with a fixed size: little-endian two's complement integers. The streams must be opened in binary mode.
+FIXED_SIZE_FORMATS: dict[str, struct.Struct] = {
+    'int32': struct.Struct('<i'),
+    'int64': struct.Struct('<q'),
+}
+# The 'bigint' format writes the number of bytes of the integer (little-endian unsigned 32 bits), then its little-endian two's complement bytes
+BIGINT_LENGTH = struct.Struct('<I')
+BINARY_FORMATS = tuple(FIXED_SIZE_FORMATS) + ('bigint',)
+
+# Version of the results of the executions, part of the keys of the result cache (see 'cache.ResultCache'):
+# it must be increased whenever a change makes a program print or leave something else
+INTERPRETER_VERSION = 1
+
+
 class PythonCodeError(Exception):
     pass
 
 class FythonDivisionByZero(Exception):
-    pass
+    def __init__(self, message: str, instruction_pointer: int = None) -> None:
+        super().__init__(message)
+        # Index of the instruction which raised the error (see 'sourcemap.SourceMap'), None if unknown, e.g. in compiled code
+        self.instruction_pointer = instruction_pointer
 
 class FythonAssemblyError(Exception):
-    pass
+    def __init__(self, message: str, instruction_pointer: int = None) -> None:
+        super().__init__(message)
+        # Index of the instruction which raised the error, None if it was not raised by an execution or unknown
+        self.instruction_pointer = instruction_pointer
+
+class FythonLimitExceeded(Exception):
+    """Raised when the execution goes over one of the limits of the interpreter. The state of the program at this moment is kept."""
+
+    def __init__(self, message: str, limit: str, stack: list[int], zero_flag: bool, instruction_pointer: int, steps: int) -> None:
+        super().__init__(message)
+        # One of 'instructions', 'time', 'stack' or 'int_bits'
+        self.limit = limit
+        self.stack = stack
+        self.zero_flag = zero_flag
+        self.instruction_pointer = instruction_pointer
+        self.steps = steps
+
+
+def program_hash(instructions: list[tuple[str, int]]) -> bytes:
+    """Return a digest identifying the decoded program (32 bytes)."""
+    return hashlib.sha256('\n'.join(f'{instruction} {argument}' for instruction, argument in instructions).encode('utf-8')).digest()
 
 
 class Interpreter:
@@ -61,14 +117,65 @@ class Interpreter:
 
         self.output_format = kwargs.get('output_format', 'char')
 
+        # If True, the deltas are stored in a 'Deltas' (two typed arrays) instead of a list of tuples, which takes much less memory
+        self.compact_deltas: bool = kwargs.get('compact_deltas', False)
+
+        # Snapshots of the VM state are written every 'snapshot_interval' executed instructions
+        self.snapshot_path: str = kwargs.get('snapshot_path', None)
+        self.snapshot_interval: int = kwargs.get('snapshot_interval', 10_000_000)
+        # If True, the execution restarts from the snapshot file (if it exists)
+        self.resume: bool = kwargs.get('resume', False)
+
+        # Limits of the execution (None for no limit): number of executed instructions, time in seconds, length of the stack,
+        # and number of bits of the integers. They are checked at the jumps (except for the instructions which can go over them at once),
+        # so they can be exceeded by the instructions executed since the last jump.
+        self.max_instructions: int = kwargs.get('max_instructions', None)
+        self.max_time: float = kwargs.get('max_time', None)
+        self.max_stack: int = kwargs.get('max_stack', None)
+        self.max_int_bits: int = kwargs.get('max_int_bits', None)
+
+        # If provided, the memory used by the executions is recorded in it
+        self.memory: MemoryProfile = kwargs.get('memory', None)
+
+        # If True, the hot loops are compiled into Python functions once they were executed 'jit_threshold' times (see 'tracing.TraceJIT').
+        # Like the compiled engine, it is not used when the execution needs snapshots, limits or the memory recording.
+        self.jit: bool = kwargs.get('jit', False)
+        self.jit_threshold: int = kwargs.get('jit_threshold', 100)
+
+        # If provided, the stack keeps about this number of elements in memory, and the deeper ones are written by segments of 'spill_segment'
+        # elements to a temporary file in 'spill_directory' (see 'spill.StackSpill'). The final stack is loaded back completely.
+        self.spill_stack: int = kwargs.get('spill_stack', None)
+        self.spill_segment: int = kwargs.get('spill_segment', 65_536)
+        self.spill_directory: str = kwargs.get('spill_directory', None)
+        self._spill = None
+
+        # If provided, the printed values are put in 'channel_out' and the read values taken from 'channel_in' as integers, instead of
+        # being written to file_out and read from file_in (see 'pipeline.ValueChannel')
+        self.channel_out = kwargs.get('channel_out', None)
+        self.channel_in = kwargs.get('channel_in', None)
+
+        # Number of values printed and read, used to restore the I/O streams when resuming
+        self.output_count = 0
+        self.input_count = 0
+
+        # Number of instructions executed by the last execution
+        self.executed_steps = 0
+        # Index of the instruction where the last execution stopped: the length of the program, or more after a jump past its end
+        self.last_instruction_pointer = 0
 
 
     def _print(self, value: int) -> None:
-        """Print the provided character to the file_out stream, formatted according to the 'output_format' parameter. If any error occurs during the writing, nothing will happen."""
+        """Print the provided character to the file_out stream, formatted according to the 'output_format' parameter ('char', 'number', or one of
+        the binary formats 'int32', 'int64' and 'bigint'). If any error occurs during the writing, nothing will happen."""
 
+        if self.channel_out is not None:
+            self.output_count += 1
+            self.channel_out.put(value)
+            return
         if self.file_out is None:
             return
 
+        self.output_count += 1
         try:
             if self.output_format == 'char':
                 # The value is inside the correct range of the chr function
@@ -79,22 +186,67 @@ class Interpreter:
 
             elif self.output_format == 'number':
                 self.file_out.write(f'{value}\n')
+
+            elif self.output_format == 'bigint':
+                data = value.to_bytes(value.bit_length() // 8 + 1, 'little', signed=True)
+                self.file_out.write(BIGINT_LENGTH.pack(len(data)) + data)
+
+            else:
+                # Values out of the range of the format keep only their lowest bits, as a cast in C
+                packer = FIXED_SIZE_FORMATS[self.output_format]
+                bits = packer.size * 8
+                if not -(1 << (bits - 1)) <= value < (1 << (bits - 1)):
+                    value = ((value + (1 << (bits - 1))) & ((1 << bits) - 1)) - (1 << (bits - 1))
+                self.file_out.write(packer.pack(value))
         except Exception:
             pass
 
     def _input(self) -> int:
         """Read one character from the file_in stream, formatted according to the 'output_format' parameter. If any error occurs, will return 0."""
 
+        if self.channel_in is not None:
+            self.input_count += 1
+            return self.channel_in.get()
         if self.file_in is None:
             return 0
 
+        self.input_count += 1
+        value = self._read_value()
+        return value if value is not None else 0
+
+    def _read_value(self) -> int:
+        """Read one value from the file_in stream, formatted according to the 'output_format' parameter. Return None at the end of the
+        stream (or if it can't be read anymore), and 0 for a value which is not valid in the format."""
+
         try:
             if self.output_format == 'char':
-                return ord(self.file_in.read(1))
+                char = self.file_in.read(1)
+                return ord(char) if char else None
             elif self.output_format == 'number':
-                return int(self.file_in.readline().strip())
-        except Exception:
+                line = self.file_in.readline()
+                return int(line.strip()) if line else None
+            elif self.output_format == 'bigint':
+                header = self.file_in.read(BIGINT_LENGTH.size)
+                if len(header) < BIGINT_LENGTH.size:
+                    return None
+                length, = BIGINT_LENGTH.unpack(header)
+                data = self.file_in.read(length)
+                if len(data) < length:
+                    return None
+                return int.from_bytes(data, 'little', signed=True)
+            else:
+                packer = FIXED_SIZE_FORMATS[self.output_format]
+                data = self.file_in.read(packer.size)
+                if len(data) < packer.size:
+                    return None
+                return packer.unpack(data)[0]
+        except UnicodeDecodeError:
+            return None
+        except ValueError:
+            # A line which is not a number
             return 0
+        except Exception:
+            return None
 
 
     def _get_line_indentation_depth(self, line: str, last_length: int, current_depth: int, previous_lengths: list[int]) -> int:
@@ -148,19 +300,43 @@ class Interpreter:
 
 
     def python_code_to_deltas(self, code: str) -> list[tuple[int, int]]:
+        deltas = self.new_deltas()
+        deltas.extend(self.iter_python_code_deltas(code))
+        return deltas
+
+    def iter_python_code_deltas(self, code: str) -> Iterator[tuple[int, int]]:
+        """Yield the deltas of the code one by one, as they are computed (see 'python_code_to_deltas').
+        The code is checked when the first delta is requested."""
+
         try:
             ast.parse(code)
         except Exception:
             raise PythonCodeError("Invalid Python code")
 
+        # Value of the previous line, None before the first one
+        previous: tuple[int, int] = None
+
+        for _, indentation_depth, whitespace_count in self._iter_python_code_values(code):
+            # The deltas are the successive differences of each element of the values of the lines
+            if previous is not None:
+                yield (indentation_depth - previous[0], whitespace_count - previous[1])
+            previous = (indentation_depth, whitespace_count)
+
+    def python_code_delta_lines(self, code: str) -> list[int]:
+        """Return the number of the line (starting at 1) which made each delta of the code: the second of the two lines whose values
+        are subtracted. The empty and comment lines do not make any delta."""
+        return [line_number for line_number, _, _ in islice(self._iter_python_code_values(code), 1, None)]
+
+    def _iter_python_code_values(self, code: str) -> Iterator[tuple[int, int, int]]:
+        """Yield the number (starting at 1), indentation depth and whitespace count of each line of the code which is not empty or a comment."""
+
         lines = code.splitlines()
-        values: list[tuple[int, int]] = list()
 
         indentation_length = 0
         indentation_depth = 0
         previous_lengths: list[int] = [0]
 
-        for line in lines:
+        for line_number, line in enumerate(lines, 1):
             # Remove empty lines and line starting with a comment
             if line.strip() == '' or line.strip().startswith('#'):
                 continue
@@ -172,10 +348,11 @@ class Interpreter:
             if whitespace_count is None:
                 continue
 
-            values.append((indentation_depth, whitespace_count))
+            yield (line_number, indentation_depth, whitespace_count)
 
-        # This will take successive differences of each element in the tuples
-        return [(next_indent - indent, next_whitespace - whitespace) for (indent, whitespace), (next_indent, next_whitespace) in zip(values, values[1:])]
+    def new_deltas(self) -> list[tuple[int, int]]:
+        """Return an empty list of deltas, compact if 'compact_deltas' is True. Both are filled and read the same way."""
+        return Deltas() if self.compact_deltas else list()
 
 
 
@@ -190,65 +367,76 @@ class Interpreter:
         lines = []
         index = 0
 
-        # If any error occurs while reading a tuple, just go to the next one
         while index < len(deltas):
-            try:
-                di, dw = deltas[index]
-            except ValueError: # Not enough or too many elements to unpack
-                continue
-            try:
-                opcode = (di, self._delta_w_modulo_10(dw))
-            except TypeError: # dw is not an integer
-                continue
+            line, index = self._decode_delta(deltas, index)
+            if line is not None:
+                lines.append(line)
 
-            if opcode in OPCODES:
-                name, need_number, default_number = OPCODES[opcode]
+        return lines
 
-                if need_number:
-                    number, offset = self._construct_number_from_deltas(deltas[index+1:], default_number)
-                    lines.append(f'{name} {number}')
-                    index += offset
+    def _decode_delta(self, deltas: list[tuple[int, int]], index: int) -> tuple[str, int]:
+        """Decode the instruction (or comment) starting at the given index of the deltas.
+        Return the assembly line (None if there is none) and the index of the next delta to decode.
+        Only the deltas up to the returned index (included) are read."""
 
-                else:
-                    lines.append(name)
+        # If any error occurs while reading a tuple, just go to the next one
+        try:
+            di, dw = deltas[index]
+        except ValueError: # Not enough or too many elements to unpack
+            return (None, index + 1)
+        try:
+            opcode = (di, self._delta_w_modulo_10(dw))
+        except TypeError: # dw is not an integer
+            return (None, index + 1)
 
-            # Comments management
-            elif di == 0:
-                if dw > 0:
-                    index += dw
-                elif dw < 0:
-                    offset = self._find_block_comment_end(deltas[index+1:])
-                    index += offset
+        line = None
+        if opcode in OPCODES:
+            name, need_number, default_number = OPCODES[opcode]
 
-            index += 1
+            if need_number:
+                number, offset = self._construct_number_from_deltas(deltas, default_number, index + 1)
+                line = f'{name} {number}'
+                index += offset
 
-        return lines
+            else:
+                line = name
 
+        # Comments management
+        elif di == 0:
+            if dw > 0:
+                index += dw
+            elif dw < 0:
+                index += self._find_block_comment_end(deltas, index + 1)
 
-    def _find_block_comment_end(self, deltas: list[tuple[int, int]]) -> int:
-        """Return the offset to the end of the block comment (di == 0, dw < 0)."""
+        return (line, index + 1)
 
-        for offset, (di, dw) in enumerate(deltas):
+
+    def _find_block_comment_end(self, deltas: list[tuple[int, int]], start: int = 0) -> int:
+        """Return the offset from 'start' to the end of the block comment (di == 0, dw < 0)."""
+
+        for offset in range(len(deltas) - start):
+            di, dw = deltas[start + offset]
             if di == 0 and dw < 0:
                 return offset + 1
-        return len(deltas)
+        return len(deltas) - start
 
-    def _construct_number_from_deltas(self, deltas: list[tuple[int, int]], default_number: int) -> tuple[int, int]:
-        """Return the constructed number and how many lines it took."""
+    def _construct_number_from_deltas(self, deltas: list[tuple[int, int]], default_number: int, start: int = 0) -> tuple[int, int]:
+        """Return the constructed number starting at index 'start' of the deltas, and how many lines it took."""
 
         digits = []
         # The variable needs to be declared before hand
         # as if deltas is empty, it will not be declared by the for loop
         offset = 0
         # Loop while the first element of the tuple is 0
-        for offset, (di, dw) in enumerate(deltas):
+        for offset in range(len(deltas) - start):
+            di, dw = deltas[start + offset]
             if di != 0:
                 break
             digits.append(dw)
         # If deltas if empty after the loop (ie we did not break)
         # we need to add one to offset, as it could not go pass the last correct value
         else:
-            offset += 1
+            offset = len(deltas) - start
 
         # There is no number, so return the default
         if len(digits) == 0:
@@ -265,9 +453,14 @@ class Interpreter:
 
 
 
-    def assembly_to_deltas(self, lines: list[str], add_comment: bool = False) -> list[tuple[int, int]]:
+    def assembly_to_deltas(self, lines: list[str], add_comment: bool = False, omit_defaults: bool = False) -> list[tuple[int, int]]:
+        """Return the deltas of the assembly. If 'omit_defaults' is True, the arguments equal to the default value of their instruction,
+        or given to an instruction without parameter, are not written. The decoding stays the same, as the delta following an instruction
+        is always another instruction, whose Delta_I is never 0."""
+
         instructions = self._parse_lines_to_instructions(lines)
-        deltas: list[tuple[int, int]] = list()
+        # The comments are not integers, so they can only be stored in a list
+        deltas = list() if add_comment else self.new_deltas()
 
         for instruction, value in instructions:
             if instruction not in INVERSE_OPCODES:
@@ -275,7 +468,12 @@ class Interpreter:
 
             if add_comment:
                 deltas.append((f'\n# {instruction} {value if value is not None else ""}', ''))
-            deltas.append(INVERSE_OPCODES[instruction])
+            opcode = INVERSE_OPCODES[instruction]
+            deltas.append(opcode)
+            _, need_number, default_number = OPCODES[opcode]
+            # Arguments of instructions without parameter are ignored by the execution, but would be decoded as a comment
+            if omit_defaults and (not need_number or value == default_number):
+                continue
             if value is not None:
                 deltas.extend(self._number_to_deltas(value))
 
@@ -308,38 +506,278 @@ class Interpreter:
         return instructions
 
 
+    def _stream_position(self, stream: IO) -> int:
+        """Return the current position of the stream, or -1 if it cannot be known."""
+        try:
+            if stream is not None and stream.seekable():
+                return stream.tell()
+        except Exception:
+            pass
+        return -1
+
+    def _write_snapshot(self, instructions: list[tuple[str, int]], instruction_pointer: int, stack: list[int], zero_flag: bool, steps: int) -> None:
+        if self.file_out is not None:
+            try:
+                self.file_out.flush()
+            except Exception:
+                pass
+
+        snapshot = Snapshot(program_hash(instructions), instruction_pointer, stack, zero_flag, steps,
+                            self.input_count, self.output_count,
+                            self._stream_position(self.file_in), self._stream_position(self.file_out))
+        write_snapshot(self.snapshot_path, snapshot)
+
+    def _restore_snapshot(self, instructions: list[tuple[str, int]]) -> Snapshot:
+        """Read the snapshot file, check it belongs to the program, and restore the I/O streams to their state at the time of the snapshot."""
+
+        snapshot = read_snapshot(self.snapshot_path)
+        if snapshot.program_hash != program_hash(instructions):
+            raise SnapshotError(f"the snapshot '{self.snapshot_path}' was not created by this program.")
+
+        # Input: go back to the saved position, or skip the values already read
+        self.input_count = 0
+        try:
+            if snapshot.input_position >= 0 and self.file_in is not None and self.file_in.seekable():
+                self.file_in.seek(snapshot.input_position)
+                self.input_count = snapshot.input_count
+        except Exception:
+            pass
+        while self.input_count < snapshot.input_count:
+            self._input()
+
+        # Output: drop everything printed after the snapshot, so it is not printed twice
+        self.output_count = snapshot.output_count
+        try:
+            if snapshot.output_position >= 0 and self.file_out is not None and self.file_out.seekable():
+                self.file_out.seek(snapshot.output_position)
+                self.file_out.truncate()
+        except Exception:
+            pass
+
+        return snapshot
+
+    def _limit_exceeded(self, limit: str, stack: list[int], zero_flag: bool, instruction_pointer: int, steps: int) -> FythonLimitExceeded:
+        messages = {
+            'instructions': f"more than {self.max_instructions} instructions executed.",
+            'time': f"execution longer than {self.max_time} seconds.",
+            'stack': f"stack longer than {self.max_stack} elements.",
+            'int_bits': f"integer longer than {self.max_int_bits} bits."
+        }
+        if self._spill is not None:
+            self._spill.load_all(stack)
+        # The state which made the execution stop is the most useful to understand its memory usage
+        if self.memory is not None:
+            self.memory.sample(steps, instruction_pointer, stack)
+        return FythonLimitExceeded(messages[limit], limit, stack, zero_flag, instruction_pointer, steps)
+
+    def _max_int_bits(self, stack: list[int]) -> int:
+        return max(map(int.bit_length, stack), default=0)
+
+    def _needs_checkpoints(self) -> bool:
+        """Return True if the execution needs the checkpoints of the execution loop (snapshots, limits, memory recording or spilled stack)."""
+        return (self.snapshot_path is not None and self.snapshot_interval > 0) or self.max_instructions is not None or self.max_time is not None \
+            or self.max_stack is not None or self.max_int_bits is not None or self.memory is not None or self.spill_stack is not None
+
+    def _start_checkpoints(self, instructions: list[tuple[str, int]], stack: list[int], steps: int) -> int:
+        """Initialize the checkpoints of an execution. Return the step count of the first one."""
+
+        if self.snapshot_path is not None and self.snapshot_interval > 0:
+            self._next_snapshot = (steps // self.snapshot_interval + 1) * self.snapshot_interval
+        else:
+            self._next_snapshot = NO_CHECKPOINT
+
+        self._start_time = time.monotonic()
+        self._next_time_check = steps + TIME_CHECK_INTERVAL if self.max_time is not None else NO_CHECKPOINT
+
+        # The integers pushed by the program are not checked when executed, so they are taken into account for the next scan of the stack
+        self._literal_bits = max((abs(argument).bit_length() for instruction, argument in instructions if instruction == 'push' and argument is not None), default=0)
+        self._next_int_scan = steps if self.max_int_bits is not None else NO_CHECKPOINT
+        self._next_stack_check = steps if self.max_stack is not None else NO_CHECKPOINT
+
+        if self.memory is not None:
+            self.memory.next_sample = steps
+
+        self._spill = None
+        if self.spill_stack is not None:
+            # The snapshots hold the whole stack, which may not fit in memory
+            if self._next_snapshot != NO_CHECKPOINT:
+                raise SnapshotError("the snapshots can not be used with a spilled stack.")
+            # Imported here, as the analyses depend on this module
+            from spill import StackSpill
+            self._spill = StackSpill(instructions, self.spill_stack, self.spill_segment, self.spill_directory)
+
+        return self._next_checkpoint()
+
+    def _next_checkpoint(self) -> int:
+        # The length of the stack is recorded, and the spilled stack balanced, at every jump
+        if self.memory is not None or self._spill is not None:
+            return 0
+        return min(self._next_snapshot, self._next_time_check, self._next_int_scan, self._next_stack_check,
+                   self.max_instructions if self.max_instructions is not None else NO_CHECKPOINT)
+
+    def _checkpoint(self, instructions: list[tuple[str, int]], instruction_pointer: int, stack: list[int], zero_flag: bool, steps: int) -> int:
+        """Called by the execution loop at the first taken jump after the number of executed instructions reached the one returned by '_next_checkpoint'.
+        Return the step count of the next checkpoint (NO_CHECKPOINT for none)."""
+
+        if self.max_instructions is not None and steps > self.max_instructions:
+            raise self._limit_exceeded('instructions', stack, zero_flag, instruction_pointer, steps)
+
+        if steps >= self._next_time_check:
+            if time.monotonic() - self._start_time > self.max_time:
+                raise self._limit_exceeded('time', stack, zero_flag, instruction_pointer, steps)
+            self._next_time_check = steps + TIME_CHECK_INTERVAL
+
+        # Except for 'copy' and 'read' which are checked when executed, each instruction adds at most one element to the stack,
+        # so the stack cannot go over the limit before as many instructions as the remaining room are executed
+        if steps >= self._next_stack_check:
+            length = len(stack) + (len(self._spill) if self._spill is not None else 0)
+            if length > self.max_stack:
+                raise self._limit_exceeded('stack', stack, zero_flag, instruction_pointer, steps)
+            self._next_stack_check = steps + max(self.max_stack - length, 1)
+
+        # Likewise, except for 'mul', 'pow' and 'read' which are checked when executed, each instruction adds at most one bit to the integers
+        if steps >= self._next_int_scan:
+            int_bits = self._max_int_bits(stack)
+            if int_bits > self.max_int_bits:
+                raise self._limit_exceeded('int_bits', stack, zero_flag, instruction_pointer, steps)
+            self._next_int_scan = steps + max(self.max_int_bits - max(int_bits, self._literal_bits), 1)
+
+        if self.memory is not None:
+            if steps >= self.memory.next_sample:
+                self.memory.sample(steps, instruction_pointer, stack)
+            else:
+                self.memory.record_length(instruction_pointer, stack)
+
+        if steps >= self._next_snapshot:
+            self._write_snapshot(instructions, instruction_pointer, stack, zero_flag, steps)
+            self._next_snapshot = (steps // self.snapshot_interval + 1) * self.snapshot_interval
+
+        if self._spill is not None:
+            self._spill.balance(instruction_pointer, stack)
+
+        return self._next_checkpoint()
+
+
     def execute_assembly(self, lines: list[str]) -> tuple[list[int], bool]:
+        instructions = self._parse_lines_to_instructions(lines)
+        return self.execute_instructions(instructions)
+
+    def execute_lazily(self, lines: Iterable[str], batch_size: int = 1024) -> tuple[list[int], bool]:
+        """Execute assembly lines while they are produced, e.g. by a streaming decoder (see 'decoding.iter_assembly'), so the first
+        instructions run before the end of the program is decoded. The lines are parsed by batches (doubling in size), and a batch is only
+        requested when the instruction pointer, or a jump, goes past the instructions already parsed. The result is the same as with
+        'execute_assembly'. As the snapshots refer to the whole program, executions needing checkpoints parse every line first."""
+
+        lines = iter(lines)
+        if self.resume or self._needs_checkpoints():
+            return self.execute_assembly(list(lines))
+
+        instructions: list[tuple[str, int]] = []
+        exhausted = False
+        def parse_more(count: int) -> None:
+            nonlocal exhausted
+            batch = list(islice(lines, count))
+            exhausted = len(batch) < count
+            start = len(instructions)
+            instructions.extend(self._parse_lines_to_instructions(batch))
+            # A jump before the start of the program indexes the instructions from their end, so it needs all of them
+            if not exhausted and any(instruction in ('jmpz', 'jmpnz') and argument is not None and index + argument < 0
+                                     for index, (instruction, argument) in enumerate(instructions[start:], start)):
+                instructions.extend(self._parse_lines_to_instructions(list(lines)))
+                exhausted = True
+
+        parse_more(batch_size)
+        state = (list(), True, 0, 0)
+        while True:
+            stack, zero_flag = self.execute_instructions(instructions, state)
+            instruction_pointer = self.last_instruction_pointer
+            while instruction_pointer >= len(instructions) and not exhausted:
+                batch_size *= 2
+                parse_more(batch_size)
+            if instruction_pointer >= len(instructions):
+                return (stack, zero_flag)
+            state = (stack, zero_flag, instruction_pointer, self.executed_steps)
+
+    def execute_instructions(self, instructions: list[tuple[str, int]], initial_state: tuple[list[int], bool, int, int] = None) -> tuple[list[int], bool]:
+        """Execute a list of already parsed instructions (see '_parse_lines_to_instructions'), and return the final stack and zero flag.
+        The execution can start from a given state: (stack, zero flag, instruction pointer, number of executed instructions)."""
+
         stack: list[int] = list()
         zero_flag: bool = True
         instruction_pointer = 0
-
-        instructions = self._parse_lines_to_instructions(lines)
+        steps = 0
+
+        if initial_state is not None:
+            stack, zero_flag, instruction_pointer, steps = initial_state
+
+        self.output_count = 0
+        self.input_count = 0
+
+        if self.resume and self.snapshot_path is not None and os.path.exists(self.snapshot_path):
+            snapshot = self._restore_snapshot(instructions)
+            stack, zero_flag = snapshot.stack, snapshot.zero_flag
+            instruction_pointer, steps = snapshot.instruction_pointer, snapshot.steps
+
+        # Number of executed instructions from which the next checkpoint (snapshot or check of the limits) happens
+        next_checkpoint = self._start_checkpoints(instructions, stack, steps) if self._needs_checkpoints() else NO_CHECKPOINT
+        max_stack = self.max_stack
+        max_int_bits = self.max_int_bits
+        max_instructions = self.max_instructions
+        max_time = self.max_time
+        memory = self.memory
+
+        jit = None
+        if self.jit and next_checkpoint == NO_CHECKPOINT:
+            # Imported here, as the tracing JIT is built on the compiler, which depends on this module
+            from tracing import trace_jit
+            jit = trace_jit(instructions, self.jit_threshold)
+        # To keep the other instructions as fast as possible, the executed instructions are only counted when a jump is taken,
+        # as the length of the straight-line segment which ends with it. Programs running for a long time always take jumps.
+        segment_start = instruction_pointer
 
         # The incrementation of the instruction pointer is at the bottom of the loop
         while instruction_pointer < len(instructions):
             instruction, argument = instructions[instruction_pointer]
 
             if instruction == 'print':
-                for _ in range(argument):
-                    if stack: # Check the stack is not empty
-                        element = stack.pop()
-                        self._print(element)
-                        # Zero flag is assigned only if it printed something
-                        zero_flag = (element == 0)
+                # Printing stops with the stack, however large the argument is
+                for _ in range(min(argument, len(stack))):
+                    element = stack.pop()
+                    self._print(element)
+                    # Zero flag is assigned only if it printed something
+                    zero_flag = (element == 0)
 
             elif instruction == 'read':
-                for _ in range(argument):
+                for index in range(argument):
                     stack.append(self._input())
+                    # The values read are not bounded, so the limits are checked for each of them
+                    if (max_stack is not None and len(stack) > max_stack) or (max_int_bits is not None and stack[-1].bit_length() > max_int_bits):
+                        limit = 'stack' if max_stack is not None and len(stack) > max_stack else 'int_bits'
+                        raise self._limit_exceeded(limit, stack, zero_flag, instruction_pointer, steps + instruction_pointer - segment_start)
+                    # Neither is the number of values (zeros past the end of the input), so each one counts as an instruction for the limits
+                    if (max_instructions is not None and steps + instruction_pointer - segment_start + index > max_instructions) or \
+                            (max_time is not None and time.monotonic() - self._start_time > max_time):
+                        limit = 'time' if max_time is not None and time.monotonic() - self._start_time > max_time else 'instructions'
+                        raise self._limit_exceeded(limit, stack, zero_flag, instruction_pointer, steps + instruction_pointer - segment_start + index)
+                    if memory is not None:
+                        memory.record_int_bits(instruction_pointer, stack[-1].bit_length())
+                if memory is not None:
+                    memory.record_length(instruction_pointer, stack)
                 # Zero flag is assigned only if it read something
                 if argument >= 1:
                     zero_flag = (stack[-1] == 0)
 
             elif instruction == 'copy':
+                # A copy can add many elements at once, so the limit is checked before
+                if max_stack is not None and argument > 2 and len(stack) + argument - 1 > max_stack:
+                    raise self._limit_exceeded('stack', stack, zero_flag, instruction_pointer, steps + instruction_pointer - segment_start)
                 # If the stack is empty, copy 0
                 if stack:
                     stack.extend([stack.pop()] * argument)
                 else:
                     stack = [0] * argument
+                if memory is not None:
+                    memory.record_length(instruction_pointer, stack)
                 # Zero flag is assigned only if it copied something
                 if argument >= 1:
                     zero_flag = (stack[-1] == 0)
@@ -349,7 +787,16 @@ class Interpreter:
                     # jmpz 0 go to the next instruction to avoid infinite loop on itself
                     if argument == 0:
                         argument = 1
+                    steps += instruction_pointer - segment_start + 1
                     instruction_pointer += argument
+                    segment_start = instruction_pointer
+                    if steps >= next_checkpoint:
+                        next_checkpoint = self._checkpoint(instructions, instruction_pointer, stack, zero_flag, steps)
+                    # The target of a backward jump is the head of a loop, which may run in a trace
+                    if jit is not None and argument < 0:
+                        instruction_pointer, zero_flag, executed = jit.enter(instruction_pointer, stack, zero_flag, self)
+                        steps += executed
+                        segment_start = instruction_pointer
                     continue # Continue here so the instruction pointer is not incremented
 
             elif instruction == 'jmpnz':
@@ -357,7 +804,16 @@ class Interpreter:
                     # jmpnz 0 go to the next instruction to avoid infinite loop on itself
                     if argument == 0:
                         argument = 1
+                    steps += instruction_pointer - segment_start + 1
                     instruction_pointer += argument
+                    segment_start = instruction_pointer
+                    if steps >= next_checkpoint:
+                        next_checkpoint = self._checkpoint(instructions, instruction_pointer, stack, zero_flag, steps)
+                    # The target of a backward jump is the head of a loop, which may run in a trace
+                    if jit is not None and argument < 0:
+                        instruction_pointer, zero_flag, executed = jit.enter(instruction_pointer, stack, zero_flag, self)
+                        steps += executed
+                        segment_start = instruction_pointer
                     continue # Continue here so the instruction pointer is not incremented
 
             elif instruction == 'place':
@@ -454,6 +910,11 @@ class Interpreter:
                 else:
                     top, below = stack.pop(), stack.pop()
                 stack.append(below * top)
+                # A multiplication can double the number of bits of the integers
+                if max_int_bits is not None and stack[-1].bit_length() > max_int_bits:
+                    raise self._limit_exceeded('int_bits', stack, zero_flag, instruction_pointer, steps + instruction_pointer - segment_start)
+                if memory is not None:
+                    memory.record_int_bits(instruction_pointer, stack[-1].bit_length())
                 # For maths operation, zero flag is assigned according to the result
                 zero_flag = (stack[-1] == 0)
 
@@ -466,7 +927,7 @@ class Interpreter:
                 else:
                     top, below = stack.pop(), stack.pop()
                 if top == 0:
-                    raise FythonDivisionByZero("division by zero during execution.")
+                    raise FythonDivisionByZero("division by zero during execution.", instruction_pointer)
                 stack.append(below // top)
                 # For maths operation, zero flag is assigned according to the result
                 zero_flag = (stack[-1] == 0)
@@ -480,7 +941,7 @@ class Interpreter:
                 else:
                     top, below = stack.pop(), stack.pop()
                 if top == 0:
-                    raise FythonDivisionByZero("modulo by zero during execution")
+                    raise FythonDivisionByZero("modulo by zero during execution", instruction_pointer)
                 stack.append(below % top)
                 # For maths operation, zero flag is assigned according to the result
                 zero_flag = (stack[-1] == 0)
@@ -494,14 +955,21 @@ class Interpreter:
                 else:
                     top, below = stack.pop(), stack.pop()
                 if top >= 0:
+                    # The result has at least (bits of below - 1) * top + 1 bits, so too big powers are not computed at all
+                    if max_int_bits is not None and (abs(below).bit_length() - 1) * top + 1 > max_int_bits:
+                        raise self._limit_exceeded('int_bits', stack, zero_flag, instruction_pointer, steps + instruction_pointer - segment_start)
                     stack.append(below ** top)
+                    if max_int_bits is not None and stack[-1].bit_length() > max_int_bits:
+                        raise self._limit_exceeded('int_bits', stack, zero_flag, instruction_pointer, steps + instruction_pointer - segment_start)
+                    if memory is not None:
+                        memory.record_int_bits(instruction_pointer, stack[-1].bit_length())
                 else:
                     if below > 1:
                         stack.append(0)
                     elif below == 1:
                         stack.append(1)
                     elif below == 0:
-                        raise FythonDivisionByZero("zero to a negative power during execution.")
+                        raise FythonDivisionByZero("zero to a negative power during execution.", instruction_pointer)
                     else: # below < 0:
                         stack.append(-1)
                 # For maths operation, zero flag is assigned according to the result
@@ -515,9 +983,78 @@ class Interpreter:
                 # For maths operation, zero flag is assigned according to the result
                 zero_flag = (stack[-1] == 0)
 
+            elif instruction == 'dup':
+                if stack:
+                    # Same index as 'pick', but the element is not removed
+                    if argument >= 0:
+                        index = len(stack) - argument - 1
+                        if index < 0:
+                            index = 0
+                    else:
+                        index = - argument - 1
+                        if index >= len(stack):
+                            index = len(stack) - 1
+                    stack.append(stack[index])
+                else: # If the stack is empty, push a 0
+                    stack = [0]
+                # Zero flag is assigned by the copied element
+                zero_flag = (stack[-1] == 0)
+
+            elif instruction == 'dupn':
+                # The top 'argument' elements are copied in the same order, or the whole stack if it has less
+                if argument > 0 and stack:
+                    if max_stack is not None and len(stack) + min(argument, len(stack)) > max_stack:
+                        raise self._limit_exceeded('stack', stack, zero_flag, instruction_pointer, steps + instruction_pointer - segment_start)
+                    stack.extend(stack[-argument:])
+                    if memory is not None:
+                        memory.record_length(instruction_pointer, stack)
+                    # Zero flag is assigned only if it copied something
+                    zero_flag = (stack[-1] == 0)
+
+            elif instruction == 'inc':
+                if stack:
+                    stack[-1] += argument
+                else: # If the stack is empty, act as if it had a 0
+                    stack = [argument]
+                # For maths operation, zero flag is assigned according to the result
+                zero_flag = (stack[-1] == 0)
+
+            elif instruction == 'swap':
+                # Missing elements are 0, as for the maths operations
+                if len(stack) >= 2:
+                    stack[-1], stack[-2] = stack[-2], stack[-1]
+                elif stack:
+                    stack.append(0)
+                else:
+                    stack = [0, 0]
+                # Zero flag is assigned by the new top element
+                zero_flag = (stack[-1] == 0)
+
+            elif instruction == 'cmp':
+                # Default values are 0, 0 (picked in this order is the stack does not have enough elements)
+                if len(stack) == 0:
+                    top, below = 0, 0
+                elif len(stack) == 1:
+                    top, below = stack.pop(), 0
+                else:
+                    top, below = stack.pop(), stack.pop()
+                # -1, 0 or 1 whether below is smaller, equal or greater than top
+                stack.append((below > top) - (below < top))
+                # For maths operation, zero flag is assigned according to the result
+                zero_flag = (stack[-1] == 0)
+
             else:
-                raise FythonAssemblyError(f"unknown instruction '{instruction}'.")
+                raise FythonAssemblyError(f"unknown instruction '{instruction}'.", instruction_pointer)
 
             instruction_pointer += 1
 
+        self.executed_steps = steps + instruction_pointer - segment_start
+        self.last_instruction_pointer = instruction_pointer
+        if self.memory is not None:
+            self.memory.sample(self.executed_steps, instruction_pointer, stack)
+        if self.spill_stack is not None and self._spill is not None:
+            self._spill.load_all(stack)
+            self._spill.close()
+            self._spill = None
+
         return (stack, zero_flag)
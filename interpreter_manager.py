@@ -1,8 +1,22 @@
+from contextlib import nullcontext
 from enum import Enum
+import io
+import os
 import re
 import sys
+import time
+from typing import IO, ContextManager, Iterable, Iterator
 
-from interpreter import Interpreter
+from batch import execute_batch
+from cache import CachedResult, OutputRecorder, ResultCache, decode_text, encode_text
+from carrier import assembly_to_python_code
+from compiler import compile_program
+from decoding import deltas_to_assembly_parallel, deltas_to_assembly_vectorized, iter_assembly
+from interpreter import BINARY_FORMATS, INTERPRETER_VERSION, FythonAssemblyError, FythonDivisionByZero, FythonLimitExceeded, Interpreter, PythonCodeError, program_hash
+from pipeline import execute_pipeline, pipeline_options
+from sourcemap import SourceMap, assembly_source_map, deltas_source_map, python_source_map
+from timing import Instrumentation, StageRecord
+from watch import IncrementalEncoder
 
 
 class InputType(Enum):
@@ -11,24 +25,50 @@ class InputType(Enum):
     ASSEMBLY = 'a'
 
 class OutputType(Enum):
+    PYTHON = 'p'
     DELTAS = 'd'
     ASSEMBLY = 'a'
     EXECUTE = 'e'
 
 
+class Engine(Enum):
+    INTERPRETER = 'interpreter'
+    COMPILED = 'compiled'
+
+
 class InterpreterManagerError(Exception):
     pass
 
 
 class InterpreterManager():
-    def __init__(self, interpreter: Interpreter, input_type: str, output_type: str, print_stack: bool = False) -> None:
+    def __init__(self, interpreter: Interpreter, input_type: str, output_type: str, print_stack: bool = False, engine: str = 'interpreter',
+                 instrumentation: Instrumentation = None, jobs: int = 1, cache: ResultCache = None) -> None:
         self.interpreter = interpreter
         self.input_type = InputType(input_type)
         self.output_type = OutputType(output_type)
         self.print_stack = print_stack
+        self.engine = Engine(engine)
+        # If provided, the time and the number of items of each stage are recorded in it
+        self.instrumentation = instrumentation
+        # Number of processes decoding large deltas streams (see 'decoding.deltas_to_assembly_parallel'), None for the number of processors
+        self.jobs = jobs
+        # If provided, the results of the executions are stored in it, and replayed instead of executing the same program on the same input
+        self.cache = cache
+
+    def _stage(self, stage: str, unit: str) -> ContextManager[StageRecord]:
+        """Return a context measuring a stage (see 'timing.Instrumentation.stage'), which does nothing without instrumentation."""
+        if self.instrumentation is None:
+            return nullcontext(StageRecord(stage, unit))
+        return self.instrumentation.stage(stage, unit)
 
     ### INPUT READING
     def read_file(self, input_path: str) -> str:
+        with self._stage('read', 'lines') as stage:
+            content = self._read_text(input_path)
+            stage.items = content.count('\n') + 1
+        return content
+
+    def _read_text(self, input_path: str) -> str:
         try:
             with open(input_path, 'r', encoding='utf-8') as fi:
                 return fi.read()
@@ -39,65 +79,201 @@ class InterpreterManager():
         return self.read_file(input_path)
 
     def read_deltas(self, input_path: str) -> list[tuple[int, int]]:
-        lines = self.read_file(input_path).splitlines()
-
-        deltas: list[tuple[int, int]] = list()
+        deltas = self.interpreter.new_deltas()
         try:
-            for line in lines:
+            deltas.extend(self.iter_deltas(input_path))
+        except OverflowError:
+            raise InterpreterManagerError(f"can't read deltas file '{input_path}'.")
+        return deltas
+
+    def iter_deltas(self, input_path: str) -> Iterator[tuple[int, int]]:
+        """Yield the deltas of the file one by one, as they are parsed."""
+        return (delta for _, delta in self._iter_numbered_deltas(self.read_file(input_path), input_path))
+
+    def _iter_numbered_deltas(self, content: str, input_path: str) -> Iterator[tuple[int, tuple[int, int]]]:
+        """Yield the number of each line of the deltas file holding a delta (starting at 1), and its delta."""
+
+        for line_number, line in enumerate(content.splitlines(), 1):
+            try:
                 # This regex finds two numbers, possibly negative, separated by anything other that a dash
                 if (delta := re.findall(r'(-?[0-9]+)[^0-9-]+(-?[0-9]+)', line)):
                     di, dw = map(int, delta[0])
-                    deltas.append((di, dw))
-        except (ValueError, IndexError):
-            raise InterpreterManagerError(f"can't read deltas file '{input_path}'.")
-
-        return deltas
+            except (ValueError, IndexError):
+                raise InterpreterManagerError(f"can't read deltas file '{input_path}'.")
+            if delta:
+                yield (line_number, (di, dw))
 
     def read_assembly(self, input_path: str) -> list[str]:
         return self.read_file(input_path).splitlines()
 
     ### OUTPUT WRITNG
     def write_deltas(self, deltas: list[tuple[int, int]], output_path: str) -> None:
-        try:
-            with open(output_path, 'w') as fo:
-                fo.write("di\tdw\n")
-                fo.write("\n".join(f'{di}\t{dw}' for di, dw in deltas))
-        except IOError:
-            raise InterpreterManagerError(f"can't open output file '{output_path}'.")
+        with self._stage('write', 'deltas') as stage:
+            stage.items = len(deltas)
+            try:
+                with open(output_path, 'w') as fo:
+                    fo.write("di\tdw\n")
+                    fo.write("\n".join(f'{di}\t{dw}' for di, dw in deltas))
+            except IOError:
+                raise InterpreterManagerError(f"can't open output file '{output_path}'.")
 
     def write_assembly(self, assembly: list[str], output_path: str) -> None:
-        try:
-            with open(output_path, 'w') as fo:
-                fo.write("\n".join(assembly))
-        except IOError:
-            raise InterpreterManagerError(f"can't open output file '{output_path}'.")
-
-
+        with self._stage('write', 'instructions') as stage:
+            stage.items = len(assembly)
+            try:
+                with open(output_path, 'w') as fo:
+                    fo.write("\n".join(assembly))
+            except IOError:
+                raise InterpreterManagerError(f"can't open output file '{output_path}'.")
+
+    def write_python(self, assembly: list[str], output_path: str) -> None:
+        with self._stage('write', 'instructions') as stage:
+            stage.items = len(assembly)
+            # The default arguments are omitted, so the generated code has as few lines as possible
+            try:
+                with open(output_path, 'w', encoding='utf-8') as fo:
+                    fo.write(assembly_to_python_code(assembly, self.interpreter))
+            except IOError:
+                raise InterpreterManagerError(f"can't open output file '{output_path}'.")
+
+
+
+    @property
+    def messages(self) -> IO:
+        """Stream of the messages around the execution: stderr when the program writes binary data to stdout, so it is not mixed with them."""
+        # The standard output may have been replaced by a text stream (e.g. 'contextlib.redirect_stdout'), which has no buffer
+        return sys.stderr if self.interpreter.file_out is getattr(sys.stdout, 'buffer', None) else sys.stdout
 
     def print_stack_and_zero_flag(self, stack: list[int], zero_flag: bool):
-        print()
-        print('Stack (from bottom to top) :')
-        print(', '.join(map(str, stack)))
-        print(f'\nZero flag : {"not " if not zero_flag else ""}raised\n')
+        print(file=self.messages)
+        print('Stack (from bottom to top) :', file=self.messages)
+        print(', '.join(map(str, stack)), file=self.messages)
+        print(f'\nZero flag : {"not " if not zero_flag else ""}raised\n', file=self.messages)
 
 
     ### EXECUTION
+    def encode(self, python_code: str) -> list[tuple[int, int]]:
+        with self._stage('encode', 'deltas') as stage:
+            deltas = self.interpreter.python_code_to_deltas(python_code)
+            stage.items = len(deltas)
+        return deltas
+
+    def decode(self, deltas: list[tuple[int, int]]) -> list[str]:
+        with self._stage('decode', 'instructions') as stage:
+            if self.jobs == 1:
+                assembly = deltas_to_assembly_vectorized(deltas)
+            else:
+                assembly = deltas_to_assembly_parallel(deltas, self.jobs)
+            stage.items = len(assembly)
+        return assembly
+
+    def parse(self, assembly: list[str]) -> list[tuple[str, int]]:
+        with self._stage('parse', 'instructions') as stage:
+            instructions = self.interpreter._parse_lines_to_instructions(assembly)
+            stage.items = len(instructions)
+        return instructions
+
+    def execute_assembly(self, assembly: list[str]) -> tuple[list[int], bool]:
+        return self.execute_instructions(self.parse(assembly))
+
+    def execute_instructions(self, instructions: list[tuple[str, int]]) -> tuple[list[int], bool]:
+        if self.engine == Engine.COMPILED:
+            with self._stage('compile', 'instructions') as stage:
+                program = compile_program(instructions)
+                stage.items = len(instructions)
+
+        with self._stage('execute', 'steps') as stage:
+            # The compiled engine does not count the executed instructions, unless it falls back to the interpreter
+            self.interpreter.executed_steps = None
+            if self.engine == Engine.COMPILED:
+                result = program.run(self.interpreter)
+            else:
+                result = self.interpreter.execute_instructions(instructions)
+            stage.items = self.interpreter.executed_steps
+        return result
+
+    def can_use_cache(self) -> bool:
+        """Return True if the result of the execution can be taken from the cache (see 'execute_cached'). The executions resuming from a
+        snapshot, or needing its checkpoints (snapshots, limits, memory recording), are not replayed as their result depends on more."""
+        return self.cache is not None and not self.interpreter.resume and not self.interpreter._needs_checkpoints()
+
+    def execute_cached(self, input_path: str) -> tuple[list[int], bool]:
+        """Execute the program of the input file, or replay its result if the cache has one for the same decoded program, program input,
+        format and interpreter version. The program input is read completely before the execution, as it is part of the key, and only the
+        executions which end without error are stored."""
+
+        instructions = self.parse(self.read_program(input_path))
+        binary = self.interpreter.output_format in BINARY_FORMATS
+        file_in, file_out = self.interpreter.file_in, self.interpreter.file_out
+
+        with self._stage('input', 'bytes') as stage:
+            content = file_in.read() if file_in is not None else (b'' if binary else '')
+            input_data = content if binary else encode_text(content)
+            stage.items = len(input_data)
+        key = self.cache.key(program_hash(instructions), input_data, self.interpreter.output_format, INTERPRETER_VERSION)
+
+        if (cached := self.cache.get(key)) is not None:
+            with self._stage('replay', 'bytes') as stage:
+                if file_out is not None:
+                    file_out.write(cached.output if binary else decode_text(cached.output))
+                self.interpreter.executed_steps = cached.steps
+                stage.items = len(cached.output)
+            return (cached.stack, cached.zero_flag)
+
+        # The program reads the input already consumed from a copy of it, and its output is recorded while it is written
+        recorder = OutputRecorder(file_out)
+        self.interpreter.file_in = io.BytesIO(content) if binary else io.StringIO(content)
+        self.interpreter.file_out = recorder
+        try:
+            stack, zero_flag = self.execute_instructions(instructions)
+        finally:
+            self.interpreter.file_in, self.interpreter.file_out = file_in, file_out
+        self.cache.put(key, CachedResult(recorder.getvalue(), stack, zero_flag, self.interpreter.executed_steps))
+        return (stack, zero_flag)
+
+    def can_execute_lazily(self) -> bool:
+        """Return True if the program can be executed while it is decoded (see 'execute_lazily')."""
+        return self.engine == Engine.INTERPRETER and not self.interpreter.resume and not self.interpreter._needs_checkpoints()
+
+    def execute_lazily(self, assembly: Iterable[str]) -> tuple[list[int], bool]:
+        """Execute the assembly lines while they are produced by a streaming decoder, so the program starts before its end is decoded.
+        The decoding is then measured as part of the execution stage."""
+
+        with self._stage('execute', 'steps') as stage:
+            self.interpreter.executed_steps = None
+            result = self.interpreter.execute_lazily(assembly)
+            stage.items = self.interpreter.executed_steps
+        return result
+
+    def _python_to_python(self, input_path: str, output_path: str) -> None:
+        python_code = self.read_python(input_path)
+        deltas = self.encode(python_code)
+        assembly = self.decode(deltas)
+        self.write_python(assembly, output_path)
+
     def _python_to_deltas(self, input_path: str, output_path: str) -> None:
         python_code = self.read_python(input_path)
-        deltas = self.interpreter.python_code_to_deltas(python_code)
+        deltas = self.encode(python_code)
         self.write_deltas(deltas, output_path)
 
     def _python_to_assembly(self, input_path: str, output_path: str) -> None:
         python_code = self.read_python(input_path)
-        deltas = self.interpreter.python_code_to_deltas(python_code)
-        assembly = self.interpreter.deltas_to_assembly(deltas)
+        deltas = self.encode(python_code)
+        assembly = self.decode(deltas)
         self.write_assembly(assembly, output_path)
 
     def _python_to_execute(self, input_path: str) -> None:
         python_code = self.read_python(input_path)
-        deltas = self.interpreter.python_code_to_deltas(python_code)
-        assembly = self.interpreter.deltas_to_assembly(deltas)
-        return self.interpreter.execute_assembly(assembly)
+        if self.can_execute_lazily():
+            return self.execute_lazily(iter_assembly(self.interpreter.iter_python_code_deltas(python_code)))
+        deltas = self.encode(python_code)
+        assembly = self.decode(deltas)
+        return self.execute_assembly(assembly)
+
+    def _deltas_to_python(self, input_path: str, output_path: str) -> None:
+        deltas = self.read_deltas(input_path)
+        assembly = self.decode(deltas)
+        self.write_python(assembly, output_path)
 
     def _deltas_to_deltas(self, input_path: str, output_path: str) -> None:
         deltas = self.read_deltas(input_path)
@@ -105,13 +281,19 @@ class InterpreterManager():
 
     def _deltas_to_assembly(self, input_path: str, output_path: str) -> None:
         deltas = self.read_deltas(input_path)
-        assembly = self.interpreter.deltas_to_assembly(deltas)
+        assembly = self.decode(deltas)
         self.write_assembly(assembly, output_path)
 
     def _deltas_to_execute(self, input_path: str) -> None:
+        if self.can_execute_lazily():
+            return self.execute_lazily(iter_assembly(self.iter_deltas(input_path)))
         deltas = self.read_deltas(input_path)
-        assembly = self.interpreter.deltas_to_assembly(deltas)
-        return self.interpreter.execute_assembly(assembly)
+        assembly = self.decode(deltas)
+        return self.execute_assembly(assembly)
+
+    def _assembly_to_python(self, input_path: str, output_path: str) -> None:
+        assembly = self.read_assembly(input_path)
+        self.write_python(assembly, output_path)
 
     def _assembly_to_deltas(self, input_path: str, output_path: str) -> None:
         assembly = self.read_assembly(input_path)
@@ -124,34 +306,172 @@ class InterpreterManager():
 
     def _assembly_to_execute(self, input_path: str) -> None:
         assembly = self.read_assembly(input_path)
-        return self.interpreter.execute_assembly(assembly)
-
-
-    def execute(self, input_path: str, output_path: str = None):
+        return self.execute_assembly(assembly)
+
+
+    def read_program(self, input_path: str) -> list[str]:
+        """Read the input file as assembly, whatever its type."""
+        if self.input_type == InputType.PYTHON:
+            return self.decode(self.encode(self.read_python(input_path)))
+        elif self.input_type == InputType.DELTAS:
+            return self.decode(self.read_deltas(input_path))
+        return self.read_assembly(input_path)
+
+    def source_map(self, input_path: str) -> SourceMap:
+        """Return the source map of the program of the input file, to report an instruction against the line of the input which made it
+        (see 'sourcemap.SourceMap'). The file is read and decoded again, so the map only costs something when it is needed."""
+
+        content = self._read_text(input_path)
+        if self.input_type == InputType.PYTHON:
+            return python_source_map(content, self.interpreter)
+        elif self.input_type == InputType.DELTAS:
+            numbered = list(self._iter_numbered_deltas(content, input_path))
+            return deltas_source_map([delta for _, delta in numbered], [line_number for line_number, _ in numbered], self.interpreter)
+        return assembly_source_map(content.splitlines())
+
+    def read_batch_inputs(self, batch_path: str) -> list[list[int]]:
+        inputs: list[list[int]] = list()
+        for line in self.read_file(batch_path).splitlines():
+            try:
+                inputs.append([int(value) for value in re.findall(r'-?[0-9]+', line)])
+            except ValueError:
+                raise InterpreterManagerError(f"can't read batch inputs file '{batch_path}'.")
+        return inputs
+
+    def execute_batch(self, input_path: str, batch_path: str) -> None:
+        """Execute the program once for each line of numbers of the batch file, and write one line per execution to the program output:
+        the printed numbers, or the error which stopped it. The executions run together on NumPy arrays (see 'batch.execute_batch')."""
+
+        if self.output_type != OutputType.EXECUTE:
+            raise InterpreterManagerError("the batch mode needs the execute output type.")
+        if self.interpreter.output_format in BINARY_FORMATS:
+            raise InterpreterManagerError("the batch mode reads and writes numbers, not binary integers.")
+
+        instructions = self.interpreter._parse_lines_to_instructions(self.read_program(input_path))
+        inputs = self.read_batch_inputs(batch_path)
+        writer = self.interpreter.file_out
+
+        with self._stage('execute', 'runs') as stage:
+            results = execute_batch(instructions, inputs, self.interpreter.max_instructions, self.interpreter.max_time, self.interpreter.max_stack,
+                                    self.interpreter.max_int_bits)
+            stage.items = len(results)
+
+        for result in results:
+            line = ' '.join(map(str, result.output))
+            if result.error is not None:
+                line = f'{line} error: {result.error}'.lstrip()
+            elif self.print_stack:
+                line = f'{line} stack: {", ".join(map(str, result.stack))}'.lstrip()
+            writer.write(line + '\n')
+        print(f"Batch execution of {len(inputs)} inputs complete!")
+
+
+    def execute_pipeline(self, input_paths: list[str], processes: bool = False) -> None:
+        """Execute the programs of the input files together, each one reading the values printed by the previous one as integers: the first
+        reads the program input and the last writes the program output (see 'pipeline.execute_pipeline'). The stack printed is the one
+        of the last program."""
+
+        if self.output_type != OutputType.EXECUTE:
+            raise InterpreterManagerError("the pipeline mode needs the execute output type.")
+        if self.interpreter.snapshot_path is not None or self.interpreter.memory is not None:
+            raise InterpreterManagerError("the snapshots and the memory recording can not be used in a pipeline.")
+
+        programs = [self.parse(self.read_program(input_path)) for input_path in input_paths]
+        with self._stage('execute', 'programs') as stage:
+            results = execute_pipeline(programs, self.interpreter.file_out, self.interpreter.file_in, self.engine.value, processes,
+                                       **pipeline_options(self.interpreter))
+            stage.items = len(results)
+        print("\n==========\nPipeline execution complete!", file=self.messages)
+        if self.print_stack:
+            self.print_stack_and_zero_flag(*results[-1])
+
+    def watch(self, input_path: str, output_path: str = None, interval: float = 0.2) -> None:
+        """Convert or execute the Fython code each time the input file is modified, until interrupted.
+        Only the parts of the code which changed are encoded and decoded again (see 'watch.IncrementalEncoder')."""
+
+        if self.input_type != InputType.PYTHON:
+            raise InterpreterManagerError("the watch mode needs a Fython code as input.")
         if output_path is None and self.output_type != OutputType.EXECUTE:
             raise InterpreterManagerError(f"no output file provided.")
-        if output_path is not None and self.output_type == OutputType.EXECUTE:
-            print("main.py: warning: the provided output file is not used.")
+
+        encoder = IncrementalEncoder(self.interpreter)
+        modification_time = None
+
+        while True:
+            try:
+                current_time = os.stat(input_path).st_mtime_ns
+            except OSError:
+                raise InterpreterManagerError(f"can't open '{input_path}'.")
+
+            if current_time == modification_time:
+                time.sleep(interval)
+                continue
+            modification_time = current_time
+
+            start = time.perf_counter()
+            try:
+                deltas, assembly = encoder.update(self.read_python(input_path))
+            except PythonCodeError as e:
+                # The file is probably being edited, so wait for the next modification
+                print(f"main.py: error: {e}", file=self.messages)
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+
+            if self.output_type == OutputType.PYTHON:
+                self.write_python(assembly, output_path)
+            elif self.output_type == OutputType.DELTAS:
+                self.write_deltas(deltas, output_path)
+            elif self.output_type == OutputType.ASSEMBLY:
+                self.write_assembly(assembly, output_path)
+            else:
+                print("Program execution:\n==========", file=self.messages)
+                try:
+                    stack, zero_flag = self.execute_assembly(assembly)
+                except (FythonAssemblyError, FythonDivisionByZero, FythonLimitExceeded) as e:
+                    # A faulty program is the usual state while editing, so it is executed again at the next modification
+                    print(f"\nmain.py: error: {e}", file=self.messages)
+                    continue
+                print("\n==========\nExecution complete!", file=self.messages)
+                if self.print_stack:
+                    self.print_stack_and_zero_flag(stack, zero_flag)
+            print(f"Updated in {elapsed:.1f} ms ({encoder.encoded_lines} lines encoded, {encoder.decoded_steps} instructions decoded).", file=self.messages)
+
+
+    def conversion_function(self) -> callable:
+        """Return the method converting (or executing) an input file, for the input and output types."""
 
         FUNCTIONS_DICT: dict[callable] = {
+            (InputType.PYTHON, OutputType.PYTHON): self._python_to_python,
             (InputType.PYTHON, OutputType.DELTAS): self._python_to_deltas,
             (InputType.PYTHON, OutputType.ASSEMBLY): self._python_to_assembly,
             (InputType.PYTHON, OutputType.EXECUTE): self._python_to_execute,
+            (InputType.DELTAS, OutputType.PYTHON): self._deltas_to_python,
             (InputType.DELTAS, OutputType.DELTAS): self._deltas_to_deltas,
             (InputType.DELTAS, OutputType.ASSEMBLY): self._deltas_to_assembly,
             (InputType.DELTAS, OutputType.EXECUTE): self._deltas_to_execute,
+            (InputType.ASSEMBLY, OutputType.PYTHON): self._assembly_to_python,
             (InputType.ASSEMBLY, OutputType.DELTAS): self._assembly_to_deltas,
             (InputType.ASSEMBLY, OutputType.ASSEMBLY): self._assembly_to_assembly,
             (InputType.ASSEMBLY, OutputType.EXECUTE): self._assembly_to_execute,
         }
+        return FUNCTIONS_DICT[(self.input_type, self.output_type)]
+
+    def execute(self, input_path: str, output_path: str = None):
+        if output_path is None and self.output_type != OutputType.EXECUTE:
+            raise InterpreterManagerError(f"no output file provided.")
+        if output_path is not None and self.output_type == OutputType.EXECUTE:
+            print("main.py: warning: the provided output file is not used.", file=self.messages)
 
-        function = FUNCTIONS_DICT[(self.input_type, self.output_type)]
+        function = self.conversion_function()
 
         if self.output_type == OutputType.EXECUTE:
             if self.interpreter.file_out is sys.stdout:
                 print("Program execution:\n==========")
-            stack, zero_flag = function(input_path)
-            print("\n==========\nExecution complete!")
+            if self.can_use_cache():
+                stack, zero_flag = self.execute_cached(input_path)
+            else:
+                stack, zero_flag = function(input_path)
+            print("\n==========\nExecution complete!", file=self.messages)
             if self.print_stack:
                 self.print_stack_and_zero_flag(stack, zero_flag)
         else:
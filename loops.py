@@ -0,0 +1,231 @@
+from analysis import JUMP_INSTRUCTIONS, is_analysable, stack_depths
+
+
+# Affine expressions of the values of the stack at the start of a loop iteration are represented by dictionaries:
+# the keys are the depths of the values from the top of the stack (0 is the top), and CONSTANT is the key of the constant term
+CONSTANT = -1
+
+
+class UnsupportedLoop(Exception):
+    pass
+
+
+def _constant(value: int) -> dict[int, int]:
+    return {CONSTANT: value} if value != 0 else {}
+
+def _combine(first: dict[int, int], second: dict[int, int], sign: int) -> dict[int, int]:
+    result = dict(first)
+    for key, coefficient in second.items():
+        result[key] = result.get(key, 0) + sign * coefficient
+        if result[key] == 0:
+            del result[key]
+    return result
+
+def _scale(expression: dict[int, int], factor: int) -> dict[int, int]:
+    return {key: coefficient * factor for key, coefficient in expression.items() if factor != 0}
+
+
+class _SymbolicStack:
+    """Stack of affine expressions. Elements missing at the bottom are pulled as new variables, numbered by their depth at the start of the iteration."""
+
+    def __init__(self) -> None:
+        self.elements: list[dict[int, int]] = []
+        self.window = 0
+
+    def ensure(self, length: int) -> None:
+        while len(self.elements) < length:
+            self.elements.insert(0, {self.window: 1})
+            self.window += 1
+
+    def pop(self, index: int = -1) -> dict[int, int]:
+        self.ensure(1 if index == -1 else -index)
+        return self.elements.pop(index)
+
+
+def _execute_symbolically(body: list[tuple[str, int]]) -> tuple[_SymbolicStack, dict[int, int]]:
+    """Execute the instructions of a loop body on a symbolic stack. Return the stack and the expression assigned to the zero flag last (None if none).
+    The stack is assumed to have enough elements for every instruction (the caller checks it with the stack depth analysis)."""
+
+    stack = _SymbolicStack()
+    flag = None
+
+    for instruction, argument in body:
+        if instruction == 'push':
+            stack.elements.append(_constant(argument))
+            flag = stack.elements[-1]
+
+        elif instruction == 'pop':
+            if argument > 0:
+                stack.ensure(argument)
+                flag = stack.elements[-argument]
+                del stack.elements[-argument:]
+
+        elif instruction in ('add', 'sub'):
+            top, below = stack.pop(), stack.pop()
+            stack.elements.append(_combine(below, top, 1 if instruction == 'add' else -1))
+            flag = stack.elements[-1]
+
+        elif instruction == 'mul':
+            top, below = stack.pop(), stack.pop()
+            # Only multiplications by a constant stay affine
+            if set(top) <= {CONSTANT}:
+                stack.elements.append(_scale(below, top.get(CONSTANT, 0)))
+            elif set(below) <= {CONSTANT}:
+                stack.elements.append(_scale(top, below.get(CONSTANT, 0)))
+            else:
+                raise UnsupportedLoop
+            flag = stack.elements[-1]
+
+        elif instruction == 'copy':
+            element = stack.pop()
+            stack.elements.extend([element] * argument)
+            if argument >= 1:
+                flag = element
+
+        elif instruction == 'pick':
+            # Indices from the bottom depend on the length of the whole stack
+            if argument < 0:
+                raise UnsupportedLoop
+            element = stack.pop(-argument - 1)
+            stack.elements.append(element)
+            flag = element
+
+        elif instruction == 'place':
+            if argument < 0:
+                raise UnsupportedLoop
+            element = stack.pop()
+            stack.ensure(argument)
+            stack.elements.insert(len(stack.elements) - argument, element)
+            flag = element
+
+        elif instruction == 'dup':
+            if argument < 0:
+                raise UnsupportedLoop
+            stack.ensure(argument + 1)
+            stack.elements.append(stack.elements[-argument - 1])
+            flag = stack.elements[-1]
+
+        elif instruction == 'dupn':
+            if argument > 0:
+                stack.ensure(argument)
+                stack.elements.extend(stack.elements[-argument:])
+                flag = stack.elements[-1]
+
+        elif instruction == 'inc':
+            stack.elements.append(_combine(stack.pop(), _constant(argument), 1))
+            flag = stack.elements[-1]
+
+        elif instruction == 'swap':
+            top, below = stack.pop(), stack.pop()
+            stack.elements.extend([top, below])
+            flag = below
+
+        else:
+            # I/O, jumps, non-linear maths and unknown instructions
+            raise UnsupportedLoop
+
+    return (stack, flag)
+
+
+class InductionLoop:
+    """A loop 'head: body ; jmpnz head' whose body only does affine operations on a fixed window of the top of the stack,
+    and where one value of the window (the counter) is incremented by a constant step and decides the end of the loop.
+    Every other value of the window is either unchanged, or incremented by the same affine combination of the unchanged values
+    and of the counter at each iteration. The number of iterations and the final values can therefore be computed directly."""
+
+    def __init__(self, head: int, end: int, window: int, counter: int, step: int,
+                 increments: dict[int, tuple[dict[int, int], int]]) -> None:
+        self.head = head
+        # Index of the jmpnz closing the loop
+        self.end = end
+        # Number of values of the top of the stack used by the loop
+        self.window = window
+        # Depth of the counter from the top of the stack, and its increment at each iteration
+        self.counter = counter
+        self.step = step
+        # For each depth of an incremented value: (affine expression of the unchanged values, coefficient of the counter)
+        self.increments = increments
+
+    def iterations(self, counter_value: int) -> int:
+        """Return the number of iterations of the loop starting with the given counter value, or None if it never ends."""
+        if counter_value == 0 or (counter_value > 0) == (self.step > 0) or counter_value % self.step != 0:
+            return None
+        return -counter_value // self.step
+
+    def apply(self, stack: list[int]) -> bool:
+        """Execute the whole loop on the stack (which has at least 'window' elements) at once. Return False, without modifying
+        the stack, if the loop never ends. The zero flag is always raised after the loop."""
+
+        counter_value = stack[-1 - self.counter]
+        iterations = self.iterations(counter_value)
+        if iterations is None:
+            return False
+
+        # Sum of the values of the counter at the start of each iteration
+        counter_sum = iterations * counter_value + self.step * iterations * (iterations - 1) // 2
+        values = {depth: stack[-1 - depth] for depth in range(self.window)}
+
+        for depth, (expression, counter_coefficient) in self.increments.items():
+            increment = sum(coefficient * (1 if key == CONSTANT else values[key]) for key, coefficient in expression.items())
+            stack[-1 - depth] = values[depth] + iterations * increment + counter_coefficient * counter_sum
+
+        stack[-1 - self.counter] = 0
+        return True
+
+
+def _recognise_loop(instructions: list[tuple[str, int]], head: int, end: int, depth: int) -> InductionLoop:
+    body = instructions[head:end]
+    if any(instruction in JUMP_INSTRUCTIONS for instruction, _ in body):
+        raise UnsupportedLoop
+
+    stack, flag = _execute_symbolically(body)
+    window = stack.window
+    # The loop must keep the length of the stack, and never use more values than the stack is known to have
+    if len(stack.elements) != window or depth is None or depth < window or flag is None:
+        raise UnsupportedLoop
+
+    finals = {depth: stack.elements[-1 - depth] for depth in range(window)}
+    unchanged = {depth for depth, expression in finals.items() if expression == {depth: 1}}
+
+    # The counter is incremented by a constant, and is the value assigned to the zero flag
+    counters = [
+        depth for depth, expression in finals.items()
+        if expression == flag and expression.get(depth) == 1 and set(expression) <= {depth, CONSTANT} and expression.get(CONSTANT, 0) != 0
+    ]
+    if not counters:
+        raise UnsupportedLoop
+    counter = counters[0]
+    step = finals[counter][CONSTANT]
+
+    increments: dict[int, tuple[dict[int, int], int]] = {}
+    for depth, expression in finals.items():
+        if depth == counter or depth in unchanged:
+            continue
+        increment = _combine(expression, {depth: 1}, -1)
+        counter_coefficient = increment.pop(counter, 0)
+        if not set(increment) <= unchanged | {CONSTANT}:
+            raise UnsupportedLoop
+        increments[depth] = (increment, counter_coefficient)
+
+    return InductionLoop(head, end, window, counter, step, increments)
+
+
+def find_induction_loops(instructions: list[tuple[str, int]], depths: list[int] = None) -> dict[int, InductionLoop]:
+    """Return the induction loops of the program (see 'InductionLoop'), by the index of their first instruction."""
+
+    if not is_analysable(instructions):
+        return {}
+    if depths is None:
+        depths = stack_depths(instructions)
+
+    loops: dict[int, InductionLoop] = {}
+    for index, (instruction, argument) in enumerate(instructions):
+        if instruction != 'jmpnz' or argument >= 0:
+            continue
+        head = index + argument
+        try:
+            loops[head] = _recognise_loop(instructions, head, index, depths[head])
+        except UnsupportedLoop:
+            pass
+
+    return loops
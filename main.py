@@ -1,10 +1,19 @@
 import argparse
+import os
 import re
 import sys
 from typing import IO
 
-from interpreter import FythonAssemblyError, FythonDivisionByZero, Interpreter, PythonCodeError
+from interpreter import BINARY_FORMATS, FythonAssemblyError, FythonDivisionByZero, FythonLimitExceeded, Interpreter, PythonCodeError
+from bulk import convert_many, is_bulk_input
+from cache import CacheError, ResultCache
+from carrier import CarrierError
 from interpreter_manager import InterpreterManager, InterpreterManagerError
+from memory import MemoryProfile
+from pipeline import PipelineError
+from snapshot import SnapshotError
+from spill import StackSpillError
+from timing import Instrumentation, json_lines_callback
 
 
 
@@ -15,58 +24,172 @@ def read_arguments() -> argparse.Namespace:
     parser.add_argument('output_path', nargs='?', help="Path to the interpreter output if it was not executed. The file won't be used if it is.")
 
     parser.add_argument('--input-type', '-i', choices=['p', 'd', 'a'], default='p', help="Input type. 'p' for Fython code, 'd' for deltas list, 'a' for Fython assembly. Default 'p'.")
-    parser.add_argument('--output-type', '-o', choices=['d', 'a', 'e'], default='e', help="Input type. 'd' for deltas list, 'a' for Fython assembly, 'e' for code execution. Default 'e'.")
+    parser.add_argument('--output-type', '-o', choices=['p', 'd', 'a', 'e'], default='e', help="Input type. 'p' for Fython code, 'd' for deltas list, 'a' for Fython assembly, 'e' for code execution. Default 'e'.")
 
     parser.add_argument('--program-output', '-O', help="File to write the program output if it was executed. If not provided, will output to stdout.")
     parser.add_argument('--program-input', '-I', help="File to read the program input from if it was executed. If not provided, will use stdin.")
 
-    parser.add_argument('--format', '-f', choices=['char', 'number'], default='char', help="The format of the output and input of the program if it was executed. 'char' to write chars with corresponding Unicode code, 'number' to write the digits directly. Default 'char'.")
+    parser.add_argument('--format', '-f', choices=['char', 'number', 'int32', 'int64', 'bigint'], default='char', help="The format of the output and input of the program if it was executed. 'char' to write chars with corresponding Unicode code, 'number' to write the digits directly, 'int32' and 'int64' for little-endian binary integers, 'bigint' for binary integers of any size prefixed by their length. Default 'char'.")
     parser.add_argument('--stack', '-s', action='store_true', help='If in execute mode, print the stack at the end of the execution.')
 
+    parser.add_argument('--engine', '-e', choices=['interpreter', 'compiled'], default='interpreter', help="If in execute mode, how the program is executed. 'interpreter' to interpret the assembly, 'compiled' to translate it into Python functions first. Default 'interpreter'.")
+
+    parser.add_argument('--jit', action='store_true', help="If in execute mode, compile the loops executed many times into Python functions while interpreting the program.")
+    parser.add_argument('--jit-threshold', type=int, default=100, help="Number of times a loop is executed before it is compiled by '--jit'. Default 100.")
+
+    parser.add_argument('--compact-deltas', action='store_true', help="Store the deltas in two typed arrays instead of a list of tuples, which takes about 12 times less memory for large programs but decodes slower.")
+
+    parser.add_argument('--snapshot', help="If in execute mode, file where the state of the program is regularly saved.")
+    parser.add_argument('--snapshot-interval', type=int, default=10_000_000, help="Number of executed instructions between two snapshots. Default 10000000.")
+    parser.add_argument('--resume', action='store_true', help="If in execute mode, restart the execution from the snapshot file if it exists.")
+
+    parser.add_argument('--spill-stack', type=int, help="If in execute mode, number of elements of the stack kept in memory, the deeper ones being written to a temporary file.")
+    parser.add_argument('--spill-directory', help="Directory of the temporary file of '--spill-stack'. Default the system temporary directory.")
+
+    parser.add_argument('--watch', '-w', action='store_true', help="Convert or execute the Fython code again each time the input file is modified, until interrupted. Only for Fython code input.")
+
+    parser.add_argument('--jobs', '-j', type=int, help="If the input is a directory or a glob pattern, number of processes converting its files. Otherwise, number of processes decoding large deltas streams. Default the number of processors.")
+    parser.add_argument('--force', action='store_true', help="If the input is a directory or a glob pattern, convert again the files whose output is newer than them.")
+
+    parser.add_argument('--batch', '-b', help="If in execute mode, file with one line of input numbers per execution: the program is executed for each of them at once, and one line of printed numbers is written per execution.")
+
+    parser.add_argument('--pipeline', '-p', nargs='+', metavar='PROGRAM', help="If in execute mode, programs of the input type executed together with the input one, each reading as integers the values printed by the previous one. The first reads the program input and the last writes the program output.")
+    parser.add_argument('--pipeline-processes', action='store_true', help="Execute each program of '--pipeline' in its own process, so they run in parallel.")
+
+    parser.add_argument('--memory', '-m', action='store_true', help="If in execute mode, record the memory used by the program and print a summary at the end.")
+    parser.add_argument('--memory-json', help="If in execute mode, file where the memory used by the program is written as JSON, even if the execution fails.")
+
+    parser.add_argument('--cache', help="If in execute mode, directory where the results of the executions are stored, so executing the same program on the same input again replays its result.")
+    parser.add_argument('--cache-size', type=float, default=256, help="Maximum size of the cache directory in megabytes. The least recently used results are removed beyond it. Default 256.")
+
+    parser.add_argument('--timing', '-t', action='store_true', help="Print the time and the number of items of each stage (reading, encoding, decoding, parsing, execution, writing) at the end.")
+    parser.add_argument('--timing-json', help="File where the time and the number of items of each stage are written as JSON lines, as soon as each stage ends.")
+
+    parser.add_argument('--max-instructions', type=int, help="If in execute mode, stop the program after this number of executed instructions.")
+    parser.add_argument('--max-time', type=float, help="If in execute mode, stop the program after this number of seconds.")
+    parser.add_argument('--max-stack', type=int, help="If in execute mode, stop the program if its stack has more elements than this.")
+    parser.add_argument('--max-int-bits', type=int, help="If in execute mode, stop the program if one of its integers has more bits than this.")
+
     return parser.parse_args()
 
 
 
-def get_program_input(program_input: str) -> IO:
+def get_program_input(program_input: str, binary: bool = False) -> IO:
     try:
         if program_input is None:
-            return sys.stdin
-        return open(program_input, 'r')
+            return sys.stdin.buffer if binary else sys.stdin
+        return open(program_input, 'rb' if binary else 'r')
     except IOError:
         print(f"main.py: error: could not read program input : '{program_input}'.")
         exit()
 
-def get_program_output(program_output: str) -> IO:
+def get_program_output(program_output: str, resume: bool = False, binary: bool = False) -> IO:
     try:
         if program_output is None:
-            return sys.stdout
-        return open(program_output, 'w')
+            return sys.stdout.buffer if binary else sys.stdout
+        # When resuming, the output is kept so the interpreter can go back to its state at the time of the snapshot
+        if resume and os.path.exists(program_output):
+            return open(program_output, 'r+b' if binary else 'r+')
+        return open(program_output, 'wb' if binary else 'w')
     except IOError:
         print(f"main.py: error: could not read program output : '{program_output}'.")
         exit()
 
+def locate(manager: InterpreterManager, input_path: str, instruction_pointer: int) -> str:
+    """Describe the instruction with the line of the input file which made it (see 'sourcemap.SourceMap')."""
+    try:
+        return f"{manager.source_map(input_path).locate(instruction_pointer)} of '{input_path}'"
+    except (InterpreterManagerError, PythonCodeError):
+        return f'instruction {instruction_pointer}'
+
 
 
 if __name__ == '__main__':
     arguments = read_arguments()
 
-    reader = get_program_input(arguments.program_input)
-    writer = get_program_output(arguments.program_output)
-
-    interpreter = Interpreter(file_out=writer, file_in=reader, output_format=arguments.format)
-    manager = InterpreterManager(interpreter, arguments.input_type, arguments.output_type, arguments.stack)
+    binary = arguments.format in BINARY_FORMATS
+    reader = get_program_input(arguments.program_input, binary)
+    resume = arguments.resume and arguments.snapshot is not None and os.path.exists(arguments.snapshot)
+    if arguments.resume and not resume:
+        print("main.py: warning: no snapshot to resume from, starting from the beginning.")
+    if resume and arguments.program_output is None:
+        print("main.py: warning: the program output is not a file, so the values printed after the snapshot will be printed again.")
+    writer = get_program_output(arguments.program_output, resume, binary)
+
+    memory = MemoryProfile() if arguments.memory or arguments.memory_json is not None else None
+    interpreter = Interpreter(file_out=writer, file_in=reader, output_format=arguments.format, compact_deltas=arguments.compact_deltas,
+                              jit=arguments.jit, jit_threshold=arguments.jit_threshold,
+                              snapshot_path=arguments.snapshot, snapshot_interval=arguments.snapshot_interval, resume=resume,
+                              max_instructions=arguments.max_instructions, max_time=arguments.max_time,
+                              max_stack=arguments.max_stack, max_int_bits=arguments.max_int_bits, memory=memory,
+                              spill_stack=arguments.spill_stack, spill_directory=arguments.spill_directory)
+
+    instrumentation = None
+    timing_json = None
+    if arguments.timing or arguments.timing_json is not None:
+        instrumentation = Instrumentation()
+        if arguments.timing_json is not None:
+            try:
+                timing_json = open(arguments.timing_json, 'w')
+            except IOError:
+                print(f"main.py: error: could not write timing : '{arguments.timing_json}'.")
+                exit()
+            instrumentation.add_callback(json_lines_callback(timing_json))
+    cache = None
+    if arguments.cache is not None:
+        try:
+            cache = ResultCache(arguments.cache, int(arguments.cache_size * 1024 * 1024))
+        except CacheError as e:
+            print(f"main.py: error: {e}")
+            exit()
+    manager = InterpreterManager(interpreter, arguments.input_type, arguments.output_type, arguments.stack, arguments.engine, instrumentation,
+                                  arguments.jobs, cache)
 
     try:
-        manager.execute(arguments.input_path, arguments.output_path)
-    except (InterpreterManagerError, PythonCodeError, FythonAssemblyError, FythonDivisionByZero) as e:
-        print(f"main.py: error: {e}")
+        if is_bulk_input(arguments.input_path):
+            print(convert_many(arguments.input_path, arguments.output_path, arguments.input_type, arguments.output_type, arguments.jobs, arguments.force).summary())
+        elif arguments.pipeline is not None:
+            manager.execute_pipeline([arguments.input_path] + arguments.pipeline, arguments.pipeline_processes)
+        elif arguments.batch is not None:
+            manager.execute_batch(arguments.input_path, arguments.batch)
+        elif arguments.watch:
+            manager.watch(arguments.input_path, arguments.output_path)
+        else:
+            manager.execute(arguments.input_path, arguments.output_path)
+    except (FythonAssemblyError, FythonDivisionByZero) as e:
+        print(f"main.py: error: {e}", file=manager.messages)
+        if e.instruction_pointer is not None and not is_bulk_input(arguments.input_path):
+            print(f"Raised by {locate(manager, arguments.input_path, e.instruction_pointer)}.", file=manager.messages)
+    except (InterpreterManagerError, PythonCodeError, SnapshotError, CarrierError, StackSpillError, PipelineError) as e:
+        print(f"main.py: error: {e}", file=manager.messages)
+    except FythonLimitExceeded as e:
+        print(f"main.py: error: limit exceeded, {e} Stopped at {locate(manager, arguments.input_path, e.instruction_pointer)} after {e.steps} instructions, with {len(e.stack)} elements on the stack.", file=manager.messages)
+        if arguments.stack:
+            print(f"Stack: {e.stack}", file=manager.messages)
     # Catch everything so we can close the file at the end
     except Exception as e:     
-        print(f"main.py: unknown error: {e}")
+        print(f"main.py: unknown error: {e}", file=manager.messages)
     except KeyboardInterrupt:
         pass
 
-    if reader is not sys.stdin:
+    if memory is not None and arguments.output_type == 'e':
+        if arguments.memory:
+            try:
+                print(memory.summary(manager.source_map(arguments.input_path)), file=manager.messages)
+            except (InterpreterManagerError, PythonCodeError):
+                print(memory.summary(), file=manager.messages)
+        if arguments.memory_json is not None:
+            try:
+                memory.write_json(arguments.memory_json)
+            except IOError:
+                print(f"main.py: error: could not write memory usage : '{arguments.memory_json}'.", file=manager.messages)
+
+    if arguments.timing:
+        print(instrumentation.summary(), file=manager.messages)
+    if timing_json is not None:
+        timing_json.close()
+
+    if reader not in (sys.stdin, sys.stdin.buffer):
         reader.close()
-    if writer is not sys.stdout:
+    if writer not in (sys.stdout, sys.stdout.buffer):
         writer.close()
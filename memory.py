@@ -0,0 +1,96 @@
+import json
+import sys
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Only for the annotations, as the source maps depend on the interpreter, which depends on this module
+    from sourcemap import SourceMap
+
+
+# Maximum number of samples kept in the timeline. When it is reached, every other sample is dropped and the interval is doubled.
+MAX_SAMPLES = 1000
+
+# Size of a reference to an element in the list of the stack
+POINTER_SIZE = 8 if sys.maxsize > 2**32 else 4
+
+
+def stack_bytes(stack: list[int]) -> int:
+    """Return the approximate number of bytes held by the stack: the list and every integer.
+    Small integers are shared by Python, but they are counted anyway, so this is an upper bound."""
+    return sys.getsizeof(stack) + sum(map(sys.getsizeof, stack))
+
+
+class MemoryProfile:
+    """Memory usage of an execution, measured by the interpreter at its checkpoints (see 'Interpreter._checkpoint').
+    The length of the stack is measured at every taken jump, and the integers every 'sample_interval' executed instructions,
+    so the peaks are attributed to the instruction reached by the jump (or executed last) when they were measured. The instructions
+    which can grow the stack or the integers a lot at once ('copy', 'dupn', 'read', 'mul' and 'pow') are also measured when executed."""
+
+    def __init__(self, sample_interval: int = 100_000) -> None:
+        self.sample_interval = sample_interval
+
+        self.peak_stack_length = 0
+        self.peak_stack_length_instruction: int = None
+        self.peak_bytes = 0
+        self.peak_bytes_instruction: int = None
+        self.largest_int_bits = 0
+        self.largest_int_instruction: int = None
+
+        # Timeline of the samples: (executed instructions, instruction pointer, stack length, bytes held by the stack)
+        self.samples: list[tuple[int, int, int, int]] = []
+        self.next_sample = 0
+
+    def record_length(self, instruction_pointer: int, stack: list[int]) -> None:
+        if len(stack) > self.peak_stack_length:
+            self.peak_stack_length = len(stack)
+            self.peak_stack_length_instruction = instruction_pointer
+
+    def record_int_bits(self, instruction_pointer: int, int_bits: int) -> None:
+        if int_bits > self.largest_int_bits:
+            self.largest_int_bits = int_bits
+            self.largest_int_instruction = instruction_pointer
+
+    def sample(self, steps: int, instruction_pointer: int, stack: list[int]) -> None:
+        """Measure the whole stack. This is linear in its length, so it is only done from time to time."""
+
+        self.record_length(instruction_pointer, stack)
+
+        size = stack_bytes(stack)
+        if size > self.peak_bytes:
+            self.peak_bytes = size
+            self.peak_bytes_instruction = instruction_pointer
+
+        self.record_int_bits(instruction_pointer, max(map(int.bit_length, stack), default=0))
+
+        self.samples.append((steps, instruction_pointer, len(stack), size))
+        if len(self.samples) > MAX_SAMPLES:
+            self.samples = self.samples[::2]
+            self.sample_interval *= 2
+        self.next_sample = steps + self.sample_interval
+
+    def summary(self, source_map: 'SourceMap' = None) -> str:
+        """Return the peaks as text. With the source map of the program, their instructions are given with the input line which made them."""
+
+        locate = source_map.locate if source_map is not None else lambda instruction_pointer: f'instruction {instruction_pointer}'
+        return '\n'.join([
+            'Memory usage :',
+            f'Peak stack length : {self.peak_stack_length} ({locate(self.peak_stack_length_instruction)})',
+            f'Peak stack size : {self.peak_bytes} bytes ({locate(self.peak_bytes_instruction)})',
+            f'Largest integer : {self.largest_int_bits} bits ({locate(self.largest_int_instruction)})'
+        ])
+
+    def to_dict(self) -> dict:
+        return {
+            'peak_stack_length': {'value': self.peak_stack_length, 'instruction': self.peak_stack_length_instruction},
+            'peak_bytes': {'value': self.peak_bytes, 'instruction': self.peak_bytes_instruction},
+            'largest_int_bits': {'value': self.largest_int_bits, 'instruction': self.largest_int_instruction},
+            'sample_interval': self.sample_interval,
+            'samples': [
+                {'steps': steps, 'instruction': instruction_pointer, 'stack_length': length, 'bytes': size}
+                for steps, instruction_pointer, length, size in self.samples
+            ]
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, 'w') as fo:
+            json.dump(self.to_dict(), fo, indent=2)
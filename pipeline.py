@@ -0,0 +1,262 @@
+import multiprocessing
+import queue
+import threading
+from typing import IO, Iterator, Sequence
+
+from compiler import compile_program
+from interpreter import Interpreter
+
+
+# Number of values sent at once between two programs, and number of chunks a channel holds before the program printing waits
+CHUNK_SIZE = 1024
+CHANNEL_CAPACITY = 64
+# Interval in seconds at which a program waiting for a full channel checks whether the next program stopped reading it
+POLL_INTERVAL = 0.05
+
+# Options of the interpreter which can be given to the programs of a pipeline. The snapshots and the memory recording are not
+# supported, as they depend on the position in the streams and on the process of the execution.
+PIPELINE_OPTIONS = ('output_format', 'jit', 'jit_threshold', 'max_instructions', 'max_time', 'max_stack', 'max_int_bits',
+                    'spill_stack', 'spill_segment', 'spill_directory')
+
+
+class PipelineError(Exception):
+    pass
+
+
+class ValueChannel:
+    """Stream of integers from a program printing them to the next program reading them. The values are sent by chunks of 'chunk_size'
+    through a queue of at most 'capacity' chunks, so a program printing faster than the next one reads waits for it. Between threads the
+    integers are passed as they are, and between processes they are only pickled by chunks, instead of being formatted and parsed again.
+
+    The program printing closes the channel when it stops, after which the program reading gets 0 for each value past the last one,
+    as when reading past the end of a file. The program reading abandons the channel when it stops, after which the values printed are
+    dropped, so the programs before it stop waiting and run to their end."""
+
+    def __init__(self, capacity: int = CHANNEL_CAPACITY, chunk_size: int = CHUNK_SIZE, context: multiprocessing.context.BaseContext = None) -> None:
+        # Between threads without a context, between processes of the context otherwise
+        if context is None:
+            self.queue = queue.Queue(capacity)
+            self.abandoned = threading.Event()
+        else:
+            self.queue = context.Queue(capacity)
+            self.abandoned = context.Event()
+        self.chunk_size = chunk_size
+
+        # On the side of the program printing: the values not sent yet, and whether the next program stopped reading
+        self.pending: list[int] = []
+        self.dropping = False
+        # On the side of the program reading: the last chunk received, the position of the next value in it, and whether it was the last one
+        self.chunk: list[int] = []
+        self.position = 0
+        self.ended = False
+
+    def put(self, value: int) -> None:
+        self.pending.append(value)
+        if len(self.pending) >= self.chunk_size:
+            self._send(self.pending)
+            self.pending = []
+
+    def _send(self, chunk: list[int]) -> None:
+        """Put the chunk in the queue, waiting while it is full, unless the program reading abandoned the channel. None ends the stream."""
+
+        if not self.dropping:
+            self.dropping = self.abandoned.is_set()
+        while not self.dropping:
+            try:
+                self.queue.put(chunk, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                self.dropping = self.abandoned.is_set()
+
+    def close(self) -> None:
+        """Send the values not sent yet, then the end of the stream."""
+
+        if self.pending:
+            self._send(self.pending)
+            self.pending = []
+        self._send(None)
+        # The chunks waiting in the pipe of a process queue are never read, so the process must not wait for them at its end
+        if self.dropping and hasattr(self.queue, 'cancel_join_thread'):
+            self.queue.cancel_join_thread()
+
+    def get(self) -> int:
+        """Return the next value, waiting for it if it was not printed yet, or 0 if the stream ended."""
+
+        if self.position < len(self.chunk):
+            value = self.chunk[self.position]
+            self.position += 1
+            return value
+        if self.ended:
+            return 0
+        chunk = self.queue.get()
+        if chunk is None:
+            self.ended = True
+            self.chunk = []
+            return 0
+        self.chunk, self.position = chunk, 1
+        return chunk[0]
+
+    def chunks(self) -> Iterator[list[int]]:
+        """Iterate over the chunks not read yet, until the end of the stream."""
+
+        if self.position < len(self.chunk):
+            yield self.chunk[self.position:]
+        self.chunk, self.position = [], 0
+        while not self.ended:
+            chunk = self.queue.get()
+            if chunk is None:
+                self.ended = True
+            else:
+                yield chunk
+
+    def abandon(self) -> None:
+        self.abandoned.set()
+
+
+def pipeline_options(interpreter: Interpreter) -> dict:
+    """Return the options of the interpreter which apply to the programs of a pipeline (see 'PIPELINE_OPTIONS')."""
+    return {name: getattr(interpreter, name) for name in PIPELINE_OPTIONS}
+
+
+def _execute_stage(instructions: Sequence[tuple[str, int]], engine: str, options: dict, file_out: IO = None, file_in: IO = None,
+                   channel_out: ValueChannel = None, channel_in: ValueChannel = None) -> tuple[list[int], bool]:
+    """Execute one program of a pipeline. Its channels are closed and abandoned when it stops, even by an error, so the other
+    programs never wait for it."""
+
+    interpreter = Interpreter(file_out, file_in, channel_out=channel_out, channel_in=channel_in, **options)
+    try:
+        if engine == 'compiled':
+            return compile_program(instructions).run(interpreter)
+        return interpreter.execute_instructions(instructions)
+    finally:
+        if channel_in is not None:
+            channel_in.abandon()
+        if channel_out is not None:
+            channel_out.close()
+
+
+def _stage_process(index: int, instructions: Sequence[tuple[str, int]], engine: str, options: dict, channel_out: ValueChannel,
+                   channel_in: ValueChannel, results: multiprocessing.Queue) -> None:
+    try:
+        stack, zero_flag = _execute_stage(instructions, engine, options, channel_out=channel_out, channel_in=channel_in)
+        results.put((index, stack, zero_flag, None))
+    except Exception as e:
+        # The exceptions of the interpreter are not all rebuilt by pickle, so only their message is sent
+        results.put((index, None, None, f'{type(e).__name__}: {e}'))
+
+
+def _pump_input(options: dict, file_in: IO, channel: ValueChannel) -> None:
+    """Send the values of the input stream to the channel of the first program, until the end of the stream or of the program."""
+
+    reader = Interpreter(file_in=file_in, output_format=options['output_format'])
+    try:
+        while not channel.dropping and (value := reader._read_value()) is not None:
+            channel.put(value)
+    finally:
+        channel.close()
+
+def _pump_output(options: dict, file_out: IO, channel: ValueChannel) -> None:
+    """Write the values of the channel of the last program to the output stream, until the end of the stream."""
+
+    writer = Interpreter(file_out, output_format=options['output_format'])
+    for chunk in channel.chunks():
+        for value in chunk:
+            writer._print(value)
+
+
+def execute_pipeline(programs: Sequence[Sequence[tuple[str, int]]], file_out: IO = None, file_in: IO = None, engine: str = 'interpreter',
+                     processes: bool = False, capacity: int = CHANNEL_CAPACITY, chunk_size: int = CHUNK_SIZE, **options) -> list[tuple[list[int], bool]]:
+    """Execute the programs (lists of parsed instructions) together, each one reading the values printed by the previous one: the first
+    reads from file_in and the last prints to file_out, in the format of 'output_format'. Return the final stack and zero flag of each.
+
+    The programs run in threads of this process, or in processes of their own if 'processes' is True, which executes them in parallel
+    but sends the values between processes. The values are then read from file_in and written to file_out by threads of this process.
+    If programs fail, the error of the first one is raised once they all stopped. 'options' are the ones of 'Interpreter' listed in
+    'PIPELINE_OPTIONS'."""
+
+    if not programs:
+        raise PipelineError("a pipeline needs at least one program.")
+    if unsupported := sorted(set(options) - set(PIPELINE_OPTIONS)):
+        raise PipelineError(f"the option{'s' if len(unsupported) > 1 else ''} {', '.join(unsupported)} can not be used in a pipeline.")
+    if engine not in ('interpreter', 'compiled'):
+        raise PipelineError(f"unknown engine '{engine}'.")
+    options.setdefault('output_format', 'char')
+
+    if processes:
+        return _execute_in_processes(programs, file_out, file_in, engine, capacity, chunk_size, options)
+
+    channels = [ValueChannel(capacity, chunk_size) for _ in range(len(programs) - 1)]
+    results: list = [None] * len(programs)
+    errors: list[Exception] = [None] * len(programs)
+
+    def run(index: int) -> None:
+        try:
+            results[index] = _execute_stage(programs[index], engine, options,
+                                            file_out if index == len(programs) - 1 else None, file_in if index == 0 else None,
+                                            channels[index] if index < len(channels) else None, channels[index - 1] if index > 0 else None)
+        except Exception as e:
+            errors[index] = e
+
+    # The programs waiting for each other in an infinite loop do not keep the process alive once it is interrupted
+    threads = [threading.Thread(target=run, args=(index,), daemon=True) for index in range(len(programs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for index, error in enumerate(errors):
+        if error is not None:
+            raise PipelineError(f"program {index + 1} of the pipeline failed, {type(error).__name__}: {error}") from error
+    return results
+
+
+def _execute_in_processes(programs: Sequence[Sequence[tuple[str, int]]], file_out: IO, file_in: IO, engine: str, capacity: int,
+                          chunk_size: int, options: dict) -> list[tuple[list[int], bool]]:
+    context = multiprocessing.get_context()
+    # The first channel brings the input to the first program, and the last one takes the output of the last program
+    channels = [ValueChannel(capacity, chunk_size, context) for _ in range(len(programs) + 1)]
+    results_queue = context.Queue()
+
+    workers = [context.Process(target=_stage_process, args=(index, programs[index], engine, options, channels[index + 1], channels[index], results_queue),
+                               daemon=True) for index in range(len(programs))]
+    for worker in workers:
+        worker.start()
+    # The input pump may wait forever for an interactive input which is not needed anymore, so it does not keep the process alive
+    input_pump = threading.Thread(target=_pump_input, args=(options, file_in, channels[0]), daemon=True)
+    output_pump = threading.Thread(target=_pump_output, args=(options, file_out, channels[-1]), daemon=True)
+    if file_in is not None:
+        input_pump.start()
+    else:
+        channels[0].close()
+    output_pump.start()
+
+    results: list = [None] * len(programs)
+    errors: list[str] = [None] * len(programs)
+    received = 0
+    try:
+        while received < len(programs):
+            try:
+                index, stack, zero_flag, error = results_queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                # A process killed before sending its result would never send it, and the programs after it would wait forever
+                stopped = [index for index, worker in enumerate(workers) if worker.exitcode not in (None, 0) and results[index] is None and errors[index] is None]
+                if stopped:
+                    raise PipelineError(f"program {stopped[0] + 1} of the pipeline stopped unexpectedly (exit code {workers[stopped[0]].exitcode}).")
+                continue
+            results[index] = (stack, zero_flag)
+            errors[index] = error
+            received += 1
+        output_pump.join()
+    finally:
+        for worker in workers:
+            worker.join(POLL_INTERVAL)
+            # Once every program stopped, a process only waits for chunks nobody reads
+            if worker.is_alive():
+                worker.terminate()
+        channels[0].abandon()
+        channels[0].queue.cancel_join_thread()
+
+    for index, error in enumerate(errors):
+        if error is not None:
+            raise PipelineError(f"program {index + 1} of the pipeline failed, {error}")
+    return results
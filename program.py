@@ -0,0 +1,75 @@
+import threading
+from typing import IO
+
+from compiler import CompiledProgram, compile_program
+from decoding import deltas_to_assembly_vectorized
+from interpreter import Interpreter
+
+
+class FythonProgram:
+    """A decoded program, which can be executed many times without converting or parsing it again.
+    It is immutable and does not hold any I/O stream or execution option: each execution creates its own interpreter,
+    so a program can be executed by several threads at the same time."""
+
+    __slots__ = ('_instructions', '_compiled', '_lock')
+
+    def __init__(self, instructions: list[tuple[str, int]]) -> None:
+        object.__setattr__(self, '_instructions', tuple(instructions))
+        # Translated into Python functions the first time the compiled engine is used
+        object.__setattr__(self, '_compiled', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("a FythonProgram can not be modified.")
+
+    @classmethod
+    def from_python(cls, code: str) -> 'FythonProgram':
+        return cls.from_assembly(deltas_to_assembly_vectorized(Interpreter().python_code_to_deltas(code)))
+
+    @classmethod
+    def from_deltas(cls, deltas: list[tuple[int, int]]) -> 'FythonProgram':
+        return cls.from_assembly(deltas_to_assembly_vectorized(deltas))
+
+    @classmethod
+    def from_assembly(cls, lines: list[str]) -> 'FythonProgram':
+        return cls(Interpreter()._parse_lines_to_instructions(lines))
+
+
+    @property
+    def instructions(self) -> tuple[tuple[str, int], ...]:
+        return self._instructions
+
+    @property
+    def assembly(self) -> list[str]:
+        return [instruction if argument is None else f'{instruction} {argument}' for instruction, argument in self._instructions]
+
+    def __len__(self) -> int:
+        return len(self._instructions)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, FythonProgram) and self._instructions == other._instructions
+
+    def __hash__(self) -> int:
+        return hash(self._instructions)
+
+
+    def compiled(self) -> CompiledProgram:
+        """Return the program translated into Python functions (see 'compiler.CompiledProgram'), compiling it only once."""
+
+        if self._compiled is None:
+            with self._lock:
+                if self._compiled is None:
+                    object.__setattr__(self, '_compiled', compile_program(self._instructions))
+        return self._compiled
+
+    def execute(self, file_out: IO = None, file_in: IO = None, engine: str = 'interpreter', **options) -> tuple[list[int], bool]:
+        """Execute the program with the given I/O streams, and return the final stack and zero flag.
+        The options are the ones of 'Interpreter' (output_format, limits, memory, snapshots...). 'engine' is either
+        'interpreter' or 'compiled'."""
+
+        interpreter = Interpreter(file_out, file_in, **options)
+        if engine == 'compiled':
+            return self.compiled().run(interpreter)
+        elif engine != 'interpreter':
+            raise ValueError(f"unknown engine '{engine}'.")
+        return interpreter.execute_instructions(self._instructions)
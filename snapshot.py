@@ -0,0 +1,134 @@
+import os
+import struct
+import sys
+from array import array
+
+
+# Binary layout of a snapshot file (every field is little-endian):
+#   - header: magic, format version, flags, program hash (32 bytes), instruction pointer, executed steps,
+#     values read, values printed, input stream position, output stream position, stack length
+#   - stack: if every element fits in a signed 64 bits integer, a raw array of int64 (bottom to top)
+#            otherwise, for each element, its length in bytes (uint32) followed by its two's complement bytes
+SNAPSHOT_MAGIC = b'FYSN'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sHH32sqQQQqqQ')
+BIG_INT_LENGTH = struct.Struct('<I')
+
+FLAG_ZERO_FLAG = 1
+FLAG_BIG_INTS = 2
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class Snapshot:
+    def __init__(self, program_hash: bytes, instruction_pointer: int, stack: list[int], zero_flag: bool, steps: int = 0,
+                 input_count: int = 0, output_count: int = 0, input_position: int = -1, output_position: int = -1) -> None:
+        self.program_hash = program_hash
+        self.instruction_pointer = instruction_pointer
+        self.stack = stack
+        self.zero_flag = zero_flag
+        self.steps = steps
+        # Number of values read and printed by the program, used to skip already consumed input
+        self.input_count = input_count
+        self.output_count = output_count
+        # Position of the I/O streams (from their 'tell' method), -1 if they are not seekable
+        self.input_position = input_position
+        self.output_position = output_position
+
+
+def _int_to_bytes(value: int) -> bytes:
+    # One more bit than needed for the sign, rounded up to the byte
+    return value.to_bytes(value.bit_length() // 8 + 1, 'little', signed=True)
+
+def _stack_fits_int64(stack: list[int]) -> bool:
+    return len(stack) == 0 or (min(stack) >= INT64_MIN and max(stack) <= INT64_MAX)
+
+
+def encode_stack(stack: list[int]) -> tuple[bytes, bool]:
+    """Return the binary representation of the stack, and whether it uses the big ints layout."""
+
+    if _stack_fits_int64(stack):
+        values = array('q', stack)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return (values.tobytes(), False)
+
+    chunks = []
+    for value in stack:
+        value_bytes = _int_to_bytes(value)
+        chunks.append(BIG_INT_LENGTH.pack(len(value_bytes)))
+        chunks.append(value_bytes)
+    return (b''.join(chunks), True)
+
+def decode_stack(data: bytes, length: int, big_ints: bool) -> list[int]:
+    """Rebuild a stack of the given length from its binary representation."""
+
+    if not big_ints:
+        values = array('q')
+        values.frombytes(data[:length * 8])
+        if len(values) != length:
+            raise SnapshotError("truncated stack.")
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values.tolist()
+
+    stack: list[int] = []
+    offset = 0
+    from_bytes = int.from_bytes
+    for _ in range(length):
+        if offset + BIG_INT_LENGTH.size > len(data):
+            raise SnapshotError("truncated stack.")
+        (size,) = BIG_INT_LENGTH.unpack_from(data, offset)
+        offset += BIG_INT_LENGTH.size
+        if offset + size > len(data):
+            raise SnapshotError("truncated stack.")
+        stack.append(from_bytes(data[offset:offset + size], 'little', signed=True))
+        offset += size
+    return stack
+
+
+def write_snapshot(path: str, snapshot: Snapshot) -> None:
+    """Write the snapshot to the file. The previous snapshot is only replaced once the new one is completely written."""
+
+    stack_bytes, big_ints = encode_stack(snapshot.stack)
+    flags = (FLAG_ZERO_FLAG if snapshot.zero_flag else 0) | (FLAG_BIG_INTS if big_ints else 0)
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags, snapshot.program_hash, snapshot.instruction_pointer,
+                                  snapshot.steps, snapshot.input_count, snapshot.output_count,
+                                  snapshot.input_position, snapshot.output_position, len(snapshot.stack))
+
+    temporary_path = f'{path}.tmp'
+    try:
+        with open(temporary_path, 'wb') as fo:
+            fo.write(header)
+            fo.write(stack_bytes)
+        os.replace(temporary_path, path)
+    except OSError:
+        raise SnapshotError(f"can't write snapshot file '{path}'.")
+
+def read_snapshot(path: str) -> Snapshot:
+    try:
+        with open(path, 'rb') as fi:
+            data = fi.read()
+    except OSError:
+        raise SnapshotError(f"can't open snapshot file '{path}'.")
+
+    if len(data) < SNAPSHOT_HEADER.size:
+        raise SnapshotError(f"invalid snapshot file '{path}'.")
+
+    (magic, version, flags, program_hash, instruction_pointer, steps, input_count, output_count,
+     input_position, output_position, stack_length) = SNAPSHOT_HEADER.unpack_from(data)
+
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError(f"invalid snapshot file '{path}'.")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"unsupported snapshot version {version} in '{path}'.")
+
+    stack = decode_stack(memoryview(data)[SNAPSHOT_HEADER.size:], stack_length, bool(flags & FLAG_BIG_INTS))
+
+    return Snapshot(program_hash, instruction_pointer, stack, bool(flags & FLAG_ZERO_FLAG), steps,
+                    input_count, output_count, input_position, output_position)
@@ -0,0 +1,75 @@
+from interpreter import Interpreter, REGEX_INSTRUCTION_ARG, REGEX_INSTRUCTION_NO_ARG
+
+
+class SourceMap:
+    """Link from each instruction of a program back to where it comes from: the index of the delta holding its opcode, and the number
+    of the line of the input file which made it (the Fython line whose values give the opcode delta, the line of the deltas file, or
+    the assembly line). 'deltas' or 'lines' is None when the input has no such information, e.g. an assembly input has no deltas."""
+
+    def __init__(self, deltas: list[int] = None, lines: list[int] = None) -> None:
+        self.deltas = deltas
+        self.lines = lines
+
+    def __len__(self) -> int:
+        return len(self.deltas if self.deltas is not None else self.lines or [])
+
+    def delta_index(self, instruction_pointer: int) -> int:
+        """Return the index of the opcode delta of the instruction, or None if it is unknown."""
+        if self.deltas is None or not 0 <= instruction_pointer < len(self.deltas):
+            return None
+        return self.deltas[instruction_pointer]
+
+    def source_line(self, instruction_pointer: int) -> int:
+        """Return the number (starting at 1) of the input line which made the instruction, or None if it is unknown."""
+        if self.lines is None or not 0 <= instruction_pointer < len(self.lines):
+            return None
+        return self.lines[instruction_pointer]
+
+    def locate(self, instruction_pointer: int) -> str:
+        """Describe where the instruction comes from, e.g. 'instruction 12 (line 40, delta 57)'."""
+
+        if instruction_pointer is None:
+            return 'unknown instruction'
+        if instruction_pointer >= len(self):
+            return f'instruction {instruction_pointer} (end of the program)'
+        details = []
+        if (line := self.source_line(instruction_pointer)) is not None:
+            details.append(f'line {line}')
+        if (delta := self.delta_index(instruction_pointer)) is not None:
+            details.append(f'delta {delta}')
+        return f'instruction {instruction_pointer}' + (f' ({", ".join(details)})' if details else '')
+
+
+def decoded_delta_indices(deltas: list[tuple[int, int]], interpreter: Interpreter = None) -> list[int]:
+    """Return the index of the first delta of each instruction decoded by 'Interpreter.deltas_to_assembly' (its opcode)."""
+
+    interpreter = interpreter if interpreter is not None else Interpreter()
+    indices: list[int] = []
+    index = 0
+    while index < len(deltas):
+        line, next_index = interpreter._decode_delta(deltas, index)
+        if line is not None:
+            indices.append(index)
+        index = next_index
+    return indices
+
+def deltas_source_map(deltas: list[tuple[int, int]], delta_lines: list[int] = None, interpreter: Interpreter = None) -> SourceMap:
+    """Return the source map of the program decoded from the deltas. 'delta_lines' is the line of the input which made each delta, if any."""
+
+    indices = decoded_delta_indices(deltas, interpreter)
+    lines = [delta_lines[index] for index in indices] if delta_lines is not None else None
+    return SourceMap(indices, lines)
+
+def python_source_map(code: str, interpreter: Interpreter = None) -> SourceMap:
+    """Return the source map of the program encoded by the Fython code."""
+
+    interpreter = interpreter if interpreter is not None else Interpreter()
+    return deltas_source_map(interpreter.python_code_to_deltas(code), interpreter.python_code_delta_lines(code), interpreter)
+
+def assembly_source_map(lines: list[str]) -> SourceMap:
+    """Return the source map of the assembly lines, whose instructions are the lines parsed by 'Interpreter._parse_lines_to_instructions'."""
+
+    return SourceMap(lines=[
+        line_number for line_number, line in enumerate(lines, 1)
+        if REGEX_INSTRUCTION_ARG.findall(line.lower()) or REGEX_INSTRUCTION_NO_ARG.findall(line.lower())
+    ])
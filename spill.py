@@ -0,0 +1,130 @@
+import math
+import mmap
+import os
+import tempfile
+
+from analysis import INSTRUCTIONS_WITH_ARGUMENT, depth_after, stack_reach
+from snapshot import decode_stack, encode_stack
+
+
+# Number of elements written to the file or loaded back at once
+SPILL_SEGMENT_SIZE = 65_536
+# The file is mapped by chunks of at least this size, and grows by doubling
+INITIAL_MAPPING_SIZE = 1 << 20
+
+# Stack length larger than any real one, to compute the exact effect of an instruction on a stack long enough
+LARGE_DEPTH = 1 << 62
+
+
+class StackSpillError(Exception):
+    pass
+
+
+def window_depths(instructions: list[tuple[str, int]]) -> list[float]:
+    """Return, for each instruction, how many elements from the top of the stack can be reached by the instructions executed from it
+    without taking a jump (which are the following ones, up to the end of the program), or math.inf if one of them indexes the stack
+    from its bottom. When the execution reaches an instruction by a jump, that many elements in memory are enough until the next jump."""
+
+    depths: list[float] = [0] * len(instructions)
+    following = 0
+    for index in range(len(instructions) - 1, -1, -1):
+        instruction, argument = instructions[index]
+        # The execution fails at an instruction missing its argument
+        if argument is None and instruction in INSTRUCTIONS_WITH_ARGUMENT:
+            following = 0
+        elif (reach := stack_reach(instruction, argument)) is None:
+            following = math.inf
+        else:
+            effect = depth_after(instruction, argument, LARGE_DEPTH) - LARGE_DEPTH
+            following = max(reach, following - effect, 0)
+        depths[index] = following
+    return depths
+
+
+class StackSpill:
+    """Bottom part of the stack of an execution, written by segments to a memory-mapped temporary file, so the stack can be larger than
+    the memory. The segments are used as a stack themselves: the deepest elements are in the first one, and the last one is the first
+    loaded back. The interpreter keeps the top of the stack in its list, which is balanced at each jump (see 'balance')."""
+
+    def __init__(self, instructions: list[tuple[str, int]], memory_length: int, segment_size: int = SPILL_SEGMENT_SIZE, directory: str = None) -> None:
+        self.window_depths = window_depths(instructions)
+        # Number of elements kept in memory, unless the following instructions reach deeper
+        self.memory_length = memory_length
+        self.segment_size = max(min(segment_size, memory_length), 1)
+        # Offset in the file, size in bytes, number of elements and layout (see 'snapshot.encode_stack') of each segment
+        self.segments: list[tuple[int, int, int, bool]] = []
+        # Number of elements in the file
+        self.length = 0
+
+        try:
+            self.file = tempfile.TemporaryFile(dir=directory)
+        except OSError:
+            raise StackSpillError(f"can't create a temporary file in '{directory or tempfile.gettempdir()}'.")
+        self.mapping: mmap.mmap = None
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _reserve(self, size: int) -> None:
+        """Grow the file and its mapping so they hold at least 'size' bytes."""
+
+        capacity = len(self.mapping) if self.mapping is not None else 0
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, INITIAL_MAPPING_SIZE)
+        try:
+            # The space is allocated now, as writing to a mapping past the free space of the disk kills the process
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(self.file.fileno(), 0, capacity)
+            else:
+                self.file.truncate(capacity)
+            if self.mapping is not None:
+                self.mapping.close()
+            self.mapping = mmap.mmap(self.file.fileno(), capacity)
+        except OSError as e:
+            raise StackSpillError(f"can't write the stack to the temporary file ({e.strerror}).")
+
+    def _write_segment(self, elements: list[int]) -> None:
+        data, big_ints = encode_stack(elements)
+        offset = self.segments[-1][0] + self.segments[-1][1] if self.segments else 0
+        self._reserve(offset + len(data))
+        self.mapping[offset:offset + len(data)] = data
+        self.segments.append((offset, len(data), len(elements), big_ints))
+        self.length += len(elements)
+
+    def _read_segment(self) -> list[int]:
+        offset, size, count, big_ints = self.segments.pop()
+        self.length -= count
+        return decode_stack(self.mapping[offset:offset + size], count, big_ints)
+
+    def balance(self, instruction_pointer: int, stack: list[int]) -> None:
+        """Load back the segments needed by the instructions executed from the instruction pointer until the next jump, then write the
+        bottom of the list to the file while it has more elements than needed. The list is modified in place."""
+
+        needed = self.window_depths[instruction_pointer] if instruction_pointer < len(self.window_depths) else 0
+        if len(stack) < needed and self.segments:
+            segments = []
+            length = len(stack)
+            while length < needed and self.segments:
+                segments.append(self._read_segment())
+                length += len(segments[-1])
+            stack[0:0] = [element for segment in reversed(segments) for element in segment]
+
+        # The list is only shifted once, whatever the number of written segments
+        spilled = (len(stack) - max(self.memory_length, needed)) // self.segment_size * self.segment_size
+        if spilled > 0:
+            for start in range(0, spilled, self.segment_size):
+                self._write_segment(stack[start:start + self.segment_size])
+            del stack[:spilled]
+
+    def load_all(self, stack: list[int]) -> None:
+        """Load back every segment below the elements of the list, which is modified in place."""
+        segments = []
+        while self.segments:
+            segments.append(self._read_segment())
+        stack[0:0] = [element for segment in reversed(segments) for element in segment]
+
+    def close(self) -> None:
+        if self.mapping is not None:
+            self.mapping.close()
+        self.file.close()
@@ -0,0 +1,89 @@
+import unittest
+
+from analysis import is_underflow_free, stack_depths, zero_flag_liveness
+from interpreter import Interpreter
+
+class TestStackDepths(unittest.TestCase):
+
+    def parse(self, lines: list[str]) -> list[tuple[str, int]]:
+        return Interpreter()._parse_lines_to_instructions(lines)
+
+    def test_straight_line(self):
+        instructions = self.parse(['push 1', 'push 2', 'add', 'copy 3', 'pop 2', 'print 1', 'add'])
+
+        self.assertListEqual(stack_depths(instructions), [0, 1, 2, 1, 3, 1, 0])
+
+    def test_defaults_push_a_value(self):
+        instructions = self.parse(['add', 'abs', 'pick 3', 'place 2', 'copy 0', 'sub'])
+
+        self.assertListEqual(stack_depths(instructions), [0, 1, 1, 1, 1, 0])
+
+    def test_loop_takes_minimum(self):
+        # The loop body keeps the stack length, so the depth at its start comes from the entry
+        instructions = self.parse(['push 1', 'push 1', 'push 1', 'pop 1', 'push 1', 'jmpnz -3', 'push 0'])
+
+        self.assertListEqual(stack_depths(instructions), [0, 1, 2, 3, 2, 3, 3])
+
+        # The loop body removes elements, so nothing is known at its start
+
+        instructions = self.parse(['push 1', 'push 1', 'pop 2', 'jmpnz -1'])
+        self.assertListEqual(stack_depths(instructions), [0, 1, 0, 0])
+
+    def test_unreachable(self):
+        # Unknown instructions stop the execution
+        instructions = self.parse(['push 0', 'lol', 'push 1', 'push 2'])
+
+        self.assertListEqual(stack_depths(instructions), [0, 1, None, None])
+
+    def test_zero_flag_not_tracked(self):
+        # The value of the zero flag is not known by the analysis, so both branches of a jump are reachable
+        instructions = self.parse(['push 0', 'jmpz 2', 'push 1', 'push 2'])
+
+        self.assertListEqual(stack_depths(instructions), [0, 1, 1, 1])
+
+    def test_negative_jump_not_analysed(self):
+        instructions = self.parse(['push 1', 'push 1', 'jmpnz -5'])
+
+        self.assertListEqual(stack_depths(instructions), [0, 0, 0])
+
+    def test_underflow_free(self):
+        self.assertTrue(is_underflow_free('add', None, 2))
+        self.assertFalse(is_underflow_free('add', None, 1))
+        self.assertTrue(is_underflow_free('pick', 2, 3))
+        self.assertFalse(is_underflow_free('pick', 2, 2))
+        self.assertTrue(is_underflow_free('pick', -2, 2))
+        self.assertFalse(is_underflow_free('pop', 2, 2))
+        self.assertTrue(is_underflow_free('pop', 0, 0))
+        self.assertFalse(is_underflow_free('abs', None, None))
+
+
+class TestZeroFlagLiveness(unittest.TestCase):
+
+    def parse(self, lines: list[str]) -> list[tuple[str, int]]:
+        return Interpreter()._parse_lines_to_instructions(lines)
+
+    def test_straight_line(self):
+        # Only the last assignment is returned at the end of the program
+        instructions = self.parse(['push 1', 'push 2', 'add', 'print 1'])
+
+        self.assertListEqual(zero_flag_liveness(instructions), [False, False, True, True])
+
+    def test_jumps_read_the_flag(self):
+        instructions = self.parse(['push 3', 'push 1', 'sub', 'copy 2', 'pop 1', 'jmpnz -4', 'push 0'])
+
+        self.assertListEqual(zero_flag_liveness(instructions), [False, False, False, False, True, False, True])
+
+    def test_conditional_assignments(self):
+        # 'pick' does not assign the flag when the stack is empty, so the one of 'push' can still be read
+        instructions = self.parse(['push 1', 'pick 2', 'jmpz 1'])
+
+        self.assertListEqual(zero_flag_liveness(instructions), [True, True, True])
+
+    def test_error_ends_the_program(self):
+        instructions = self.parse(['push 1', 'lol', 'push 2'])
+
+        self.assertListEqual(zero_flag_liveness(instructions), [False, False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
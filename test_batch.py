@@ -0,0 +1,99 @@
+import random
+import time
+import unittest
+
+import batch
+from batch import _run_scalar, execute_batch
+from interpreter import FythonDivisionByZero, FythonLimitExceeded, Interpreter
+
+class TestBatch(unittest.TestCase):
+
+    def parse(self, lines: list[str]) -> list[tuple[str, int]]:
+        return Interpreter()._parse_lines_to_instructions(lines)
+
+    def assertSameResults(self, lines: list[str], inputs: list[list[int]], max_instructions: int = None) -> None:
+        """Check the batch execution gives the same results as executing each input with the interpreter."""
+
+        instructions = self.parse(lines)
+        for values, result in zip(inputs, execute_batch(instructions, inputs, max_instructions)):
+            expected = _run_scalar(instructions, values, max_instructions)
+            self.assertEqual((result.stack, result.zero_flag, result.output), (expected.stack, expected.zero_flag, expected.output), (lines, values))
+            self.assertEqual((type(result.error), str(result.error)), (type(expected.error), str(expected.error)), (lines, values))
+
+    @unittest.skipIf(batch.np is None, "NumPy is not installed")
+    def test_examples(self):
+        with open('examples/is_prime_assembly.txt') as fi:
+            is_prime = fi.read().splitlines()
+        self.assertSameResults(is_prime, [[n] for n in range(2, 60)])
+
+        with open('examples/primes_assembly.txt') as fi:
+            primes = fi.read().splitlines()
+        results = execute_batch(self.parse(primes), [[10], [20]])
+        self.assertEqual([result.output for result in results], [[2, 3, 5, 7], [2, 3, 5, 7, 11, 13, 17, 19]])
+
+    def test_not_enough_elements(self):
+        for lines in (['copy 4'], ['place 2'], ['pick 3'], ['push 1', 'pop 2'], ['push 2', 'add'], ['add'], ['push 2', 'div'], ['div'],
+                      ['push 2', 'pow'], ['pow'], ['abs'], ['print 3'], ['pick -3'], ['push 1', 'pick -3'], ['push 1', 'push 2', 'place 5'],
+                      ['push 1', 'push 2', 'push 3', 'place -5'], ['push 1', 'copy 0'], ['push 3', 'copy -1'], ['dup 2'], ['push 1', 'dup 2'],
+                      ['push 1', 'dup -3'], ['dupn 2'], ['push 1', 'dupn 3'], ['push 1', 'push 2', 'push 3', 'dupn 2'], ['inc 2'], ['swap'], ['push 1', 'swap'],
+                      ['cmp'], ['push 2', 'cmp']):
+            self.assertSameResults(lines, [[]])
+
+    def test_errors(self):
+        results = execute_batch(self.parse(['read 2', 'div', 'print 1']), [[6, 3], [6, 0], [-7, 2]])
+        self.assertEqual([result.output for result in results], [[2], [], [-4]])
+        self.assertIsInstance(results[1].error, FythonDivisionByZero)
+        self.assertIsNone(results[1].stack)
+
+        results = execute_batch(self.parse(['read 1', 'jmpz 2', 'jmpnz -1']), [[0], [1]], max_instructions=100)
+        self.assertIsNone(results[0].error)
+        self.assertIsInstance(results[1].error, FythonLimitExceeded)
+
+    def test_limits(self):
+        # The stack grows by the value read
+        results = execute_batch(self.parse(['read 1', 'push 1', 'swap', 'inc -1', 'jmpnz -3']), [[3], [50], [10000]], max_stack=20)
+        self.assertEqual([result.error.limit if result.error is not None else None for result in results], [None, 'stack', 'stack'])
+
+        # Never ends for a nonzero value
+        start = time.monotonic()
+        results = execute_batch(self.parse(['read 1', 'jmpz 2', 'jmpnz -1']), [[0], [1], [2]], max_time=0.2)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual([result.error.limit if result.error is not None else None for result in results], [None, 'time', 'time'])
+
+        # Squares the value read until it is over 64 bits, then goes on with the interpreter
+        lines = ['read 1', 'copy 2', 'mul', 'jmpnz -2']
+        for max_int_bits in (10, 1000):
+            results = execute_batch(self.parse(lines), [[0], [3]], max_int_bits=max_int_bits)
+            self.assertIsNone(results[0].error)
+            self.assertEqual(results[1].error.limit, 'int_bits')
+
+    def test_overflow(self):
+        # The executions whose values do not fit in 64 bits continue with the interpreter, from the same state
+        # Square the value read 5 times, printing each square
+        lines = ['read 1', 'push 5', 'pick 1', 'copy 2', 'mul', 'copy 2', 'print 1', 'pick 1', 'push 1', 'sub', 'jmpnz -8']
+        self.assertSameResults(lines, [[3], [2**40], [-2**31], [2**70], [0]])
+        self.assertSameResults(['read 2', 'pow', 'print 1'], [[2, 62], [2, 63], [-2, 63], [3, 39], [3, 40], [0, -1], [-1, 2**40], [5, -2]])
+        self.assertSameResults(['push -9223372036854775808', 'read 1', 'div', 'abs', 'print 1'], [[1], [-1], [2]])
+        self.assertSameResults(['read 1', 'inc 4611686018427387904', 'inc 4611686018427387904', 'print 1'], [[0], [-1], [1], [-2**62]])
+
+    def test_random_programs(self):
+        generator = random.Random(42)
+        templates = ['print {}', 'read {}', 'copy {}', 'dup {}', 'dupn {}', 'place {}', 'pick {}', 'push {}', 'pop {}', 'inc {}', 'add', 'sub', 'mul', 'div', 'mod', 'abs',
+                     'swap', 'cmp', 'jmpz {}', 'jmpnz {}']
+
+        for _ in range(100):
+            lines = []
+            for _ in range(generator.randint(1, 20)):
+                template = generator.choice(templates)
+                if template.startswith('jmp'):
+                    lines.append(template.format(generator.randint(-len(lines), 4)))
+                elif template.startswith('push'):
+                    lines.append(template.format(generator.choice([generator.randint(-3, 4), 2**40, -2**62])))
+                else:
+                    lines.append(template.format(generator.randint(-3, 4)))
+            inputs = [[generator.randint(-5, 5) for _ in range(generator.randint(0, 6))] for _ in range(10)]
+            self.assertSameResults(lines, inputs, max_instructions=1_000)
+
+
+if __name__ == '__main__':
+    unittest.main()
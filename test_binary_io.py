@@ -0,0 +1,81 @@
+import contextlib
+import io
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from compiler import compile_program
+from interpreter import Interpreter
+from interpreter_manager import InterpreterManager
+
+class TestBinaryIO(unittest.TestCase):
+
+    def execute(self, lines: list[str], data: bytes, output_format: str, compiled: bool = False) -> bytes:
+        writer = io.BytesIO()
+        interpreter = Interpreter(writer, io.BytesIO(data), output_format=output_format)
+        if compiled:
+            compile_program(interpreter._parse_lines_to_instructions(lines)).run(interpreter)
+        else:
+            interpreter.execute_assembly(lines)
+        return writer.getvalue()
+
+    def test_fixed_size(self):
+        # Read 3 values and print them back in the reverse order
+        for output_format, code in (('int32', '<i'), ('int64', '<q')):
+            values = [5, -7, 2**(struct.calcsize(code) * 8 - 1) - 1]
+            for compiled in (False, True):
+                output = self.execute(['read 3', 'print 3'], struct.pack(f'{code}{code[1]}{code[1]}', *values), output_format, compiled)
+                self.assertEqual(list(struct.unpack(f'{code}{code[1]}{code[1]}', output)), values[::-1])
+
+    def test_fixed_size_wraps(self):
+        # Values out of the range keep their lowest bits
+        output = self.execute(['push 2147483648', 'print 1', 'push -2147483649', 'print 1', 'push 4294967301', 'print 1'], b'', 'int32')
+        self.assertEqual(list(struct.unpack('<iii', output)), [-2**31, 2**31 - 1, 5])
+
+    def test_bigint(self):
+        values = [0, 1, -1, 127, 128, -128, -129, 2**1000 + 3, -3**500]
+        data = b''.join(struct.pack('<I', (value.bit_length() // 8 + 1)) + value.to_bytes(value.bit_length() // 8 + 1, 'little', signed=True) for value in values)
+        output = self.execute([f'read {len(values)}', f'print {len(values)}'], data, 'bigint')
+
+        printed = []
+        position = 0
+        while position < len(output):
+            length, = struct.unpack_from('<I', output, position)
+            printed.append(int.from_bytes(output[position + 4:position + 4 + length], 'little', signed=True))
+            position += 4 + length
+        self.assertEqual(printed, values[::-1])
+
+    def test_incomplete_input(self):
+        # Values which can not be read completely are read as 0, like in the text formats
+        self.assertEqual(self.execute(['read 2', 'print 2'], struct.pack('<i', 9) + b'\x01', 'int32'), struct.pack('<ii', 0, 9))
+        self.assertEqual(self.execute(['read 1', 'print 1'], struct.pack('<I', 8) + b'\x01', 'bigint'), struct.pack('<Ib', 1, 0))
+
+    def test_messages(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'program.txt')
+            with open(path, 'w') as fo:
+                fo.write('push 7\nprint 1\npush 0\ndiv')
+            with open(path + '.ok', 'w') as fo:
+                fo.write('push 7\nprint 1')
+
+            # The standard output replaced by a text stream has no buffer
+            messages = io.StringIO()
+            with contextlib.redirect_stdout(messages):
+                writer = io.StringIO()
+                InterpreterManager(Interpreter(writer, output_format='number'), 'a', 'e').execute(path + '.ok')
+            self.assertEqual(writer.getvalue(), '7\n')
+            self.assertIn('Execution complete', messages.getvalue())
+
+            # The error and the memory summary are not mixed with the binary output
+            result = subprocess.run([sys.executable, 'main.py', path, '-i', 'a', '-f', 'int32', '-m'], capture_output=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)))
+            self.assertEqual(result.stdout, struct.pack('<i', 7))
+            self.assertIn(b'division by zero', result.stderr)
+            self.assertIn(b'Memory usage', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
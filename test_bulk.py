@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from bulk import convert_many, find_inputs, is_bulk_input, output_file_path
+from interpreter_manager import InputType, InterpreterManagerError, OutputType
+
+class TestBulk(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.sources = os.path.join(self.directory, 'sources')
+        self.output = os.path.join(self.directory, 'out')
+        os.makedirs(os.path.join(self.sources, 'sub'))
+        shutil.copy('test_files/python.py', os.path.join(self.sources, 'first.py'))
+        shutil.copy('test_files/python.py', os.path.join(self.sources, 'sub', 'second.py'))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def test_paths(self):
+        self.assertTrue(is_bulk_input(self.sources))
+        self.assertTrue(is_bulk_input(os.path.join(self.sources, '*.py')))
+        self.assertFalse(is_bulk_input('test_files/python.py'))
+
+        inputs = find_inputs(self.sources, InputType.PYTHON)
+        self.assertEqual([relative_path for _, relative_path in inputs], ['first.py', os.path.join('sub', 'second.py')])
+        self.assertEqual(output_file_path('sub/fibonacci_assembly.txt', 'out', OutputType.DELTAS), os.path.join('out', 'sub', 'fibonacci_deltas.txt'))
+
+    def test_conversion(self):
+        result = convert_many(self.sources, self.output, 'p', 'd', jobs=2)
+        self.assertEqual((result.converted, result.skipped, result.failed), (2, 0, []))
+
+        with open('test_files/python_to_deltas.txt') as fi:
+            expected = fi.read()
+        for path in ('first_deltas.txt', os.path.join('sub', 'second_deltas.txt')):
+            with open(os.path.join(self.output, path)) as fi:
+                self.assertEqual(fi.read(), expected)
+
+    def test_skip_up_to_date(self):
+        convert_many(self.sources, self.output, 'p', 'a', jobs=1)
+        result = convert_many(self.sources, self.output, 'p', 'a', jobs=1)
+        self.assertEqual((result.converted, result.skipped), (0, 2))
+
+        # A modified input is converted again
+        modified = os.path.join(self.sources, 'first.py')
+        os.utime(modified, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        result = convert_many(self.sources, self.output, 'p', 'a', jobs=1)
+        self.assertEqual((result.converted, result.skipped), (1, 1))
+
+        result = convert_many(self.sources, self.output, 'p', 'a', jobs=1, force=True)
+        self.assertEqual((result.converted, result.skipped), (2, 0))
+
+    def test_glob_and_errors(self):
+        with open(os.path.join(self.sources, 'invalid.py'), 'w') as fo:
+            fo.write('if (:\n')
+
+        result = convert_many(os.path.join(self.sources, '*.py'), self.output, 'p', 'a', jobs=1)
+        self.assertEqual(result.converted, 1)
+        self.assertEqual([os.path.basename(path) for path, _ in result.failed], ['invalid.py'])
+        self.assertEqual(sorted(os.listdir(self.output)), ['first_assembly.txt'])
+        self.assertIn('1 failed', result.summary())
+
+        with self.assertRaises(InterpreterManagerError):
+            convert_many(self.sources, self.output, 'p', 'e')
+
+
+if __name__ == '__main__':
+    unittest.main()
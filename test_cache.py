@@ -0,0 +1,128 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from cache import CACHE_SUFFIX, CachedResult, ResultCache, decode_result, encode_result
+from interpreter import FythonDivisionByZero, Interpreter
+from interpreter_manager import InterpreterManager
+
+
+# Reads two values, prints their sum and leaves it on the stack
+SUM_PROGRAM = ['read 2', 'add', 'dup 0', 'print 1']
+
+
+def _put_entries(arguments: tuple[str, int]) -> None:
+    directory, worker = arguments
+    cache = ResultCache(directory, 4000)
+    for index in range(20):
+        cache.put(f'{worker}-{index % 5}', CachedResult(bytes(100), [worker, index], True, index))
+        cache.get(f'{(worker + 1) % 4}-{index % 5}')
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.program_path = os.path.join(self.directory.name, 'sum_assembly.txt')
+        with open(self.program_path, 'w') as fo:
+            fo.write('\n'.join(SUM_PROGRAM))
+        self.cache = ResultCache(os.path.join(self.directory.name, 'cache'))
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def run_program(self, program_input, output_format: str = 'number', engine: str = 'interpreter', **kwargs):
+        binary = isinstance(program_input, bytes)
+        writer = io.BytesIO() if binary else io.StringIO()
+        reader = io.BytesIO(program_input) if binary else io.StringIO(program_input)
+        interpreter = Interpreter(writer, reader, output_format=output_format, **kwargs)
+        manager = InterpreterManager(interpreter, 'a', 'e', engine=engine, cache=self.cache)
+        stack, zero_flag = manager.execute_cached(self.program_path) if manager.can_use_cache() else manager.execute_assembly(SUM_PROGRAM)
+        return (writer.getvalue(), stack, zero_flag, interpreter.executed_steps)
+
+    def test_result_round_trip(self):
+        for result in (CachedResult(b'abc\x00', [1, -2, 3], True, 12), CachedResult(b'', [3**200, -1], False, None)):
+            restored = decode_result(encode_result(result))
+            self.assertEqual(restored.output, result.output)
+            self.assertListEqual(restored.stack, result.stack)
+            self.assertEqual((restored.zero_flag, restored.steps), (result.zero_flag, result.steps))
+        self.assertIsNone(decode_result(encode_result(CachedResult(b'abc', [], True))[:-1]))
+
+    def test_replay(self):
+        first = self.run_program('2\n40\n')
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+        self.assertEqual(first, ('42\n', [42], False, 4))
+
+        self.assertEqual(self.run_program('2\n40\n'), first)
+        self.assertEqual(self.run_program('2\n40\n', engine='compiled'), first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+        # Another input or format is another key
+        self.assertEqual(self.run_program('3\n40\n')[0], '43\n')
+        self.assertEqual(self.run_program('2\n40\n', 'char')[0], '<')
+        self.assertEqual(self.cache.misses, 3)
+
+    def test_binary_replay(self):
+        program_input = (2**40).to_bytes(8, 'little') + (7).to_bytes(8, 'little')
+        first = self.run_program(program_input, 'int64')
+        self.assertEqual(first[0], (2**40 + 7).to_bytes(8, 'little'))
+        self.assertEqual(self.run_program(program_input, 'int64'), first)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_not_cached(self):
+        # Failed executions are not stored
+        with open(self.program_path, 'w') as fo:
+            fo.write('push 1\npush 0\ndiv')
+        for _ in range(2):
+            with self.assertRaises(FythonDivisionByZero):
+                self.run_program('')
+        self.assertEqual(self.cache.hits, 0)
+        self.assertListEqual(os.listdir(self.cache.directory), [])
+
+        # Neither are the executions with limits
+        self.run_program('1\n1\n', max_instructions=100)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_least_recently_used(self):
+        size = len(encode_result(CachedResult(bytes(100), [], True)))
+        cache = ResultCache(self.cache.directory, 2 * size)
+        cache.put('a', CachedResult(bytes(100), [], True))
+        cache.put('b', CachedResult(bytes(100), [], True))
+        os.utime(os.path.join(cache.directory, 'b' + CACHE_SUFFIX), ns=(1, 1))
+        os.utime(os.path.join(cache.directory, 'a' + CACHE_SUFFIX), ns=(2, 2))
+        self.assertIsNotNone(cache.get('b'))
+        cache.put('c', CachedResult(bytes(100), [], True))
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+        # A result larger than the cache is not stored
+        cache.put('d', CachedResult(bytes(2 * size), [], True))
+        self.assertIsNone(cache.get('d'))
+
+    def test_invalid_entry(self):
+        path = os.path.join(self.cache.directory, 'a' + CACHE_SUFFIX)
+        with open(path, 'wb') as fo:
+            fo.write(b'not a result')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertFalse(os.path.exists(path))
+
+    def test_concurrent_processes(self):
+        with multiprocessing.Pool(4) as pool:
+            pool.map(_put_entries, [(self.cache.directory, worker) for worker in range(4)])
+
+        names = os.listdir(self.cache.directory)
+        self.assertTrue(all(name.endswith(CACHE_SUFFIX) for name in names))
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.cache.directory, name)) for name in names), 4000)
+        for name in names:
+            result = self.cache.get(name[:-len(CACHE_SUFFIX)])
+            self.assertEqual(result.output, bytes(100))
+            self.assertEqual(len(result.stack), 2)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import ast
+import random
+import unittest
+
+from carrier import CarrierError, assembly_to_python_code, deltas_to_python_code
+from interpreter import INVERSE_OPCODES, OPCODES, Interpreter
+
+def normalize(interpreter: Interpreter, assembly: list[str]) -> list[tuple[str, int]]:
+    """Parse the assembly, dropping the arguments of the instructions without parameter (the execution ignores them)."""
+    return [
+        (instruction, argument if OPCODES[INVERSE_OPCODES[instruction]][1] else None)
+        for instruction, argument in interpreter._parse_lines_to_instructions(assembly)
+    ]
+
+class TestCarrier(unittest.TestCase):
+
+    def assertSameProgram(self, assembly: list[str]) -> str:
+        interpreter = Interpreter()
+        code = assembly_to_python_code(assembly)
+        ast.parse(code)
+
+        decoded = interpreter.deltas_to_assembly(interpreter.python_code_to_deltas(code))
+        self.assertListEqual(normalize(interpreter, decoded), normalize(interpreter, assembly))
+        return code
+
+    def test_omit_defaults(self):
+        interpreter = Interpreter()
+        assembly = ['print 1', 'read 1', 'copy 2', 'jmpz 1', 'jmpnz 1', 'place 1', 'pick 1', 'push 0', 'pop 1', 'add']
+        deltas = interpreter.assembly_to_deltas(assembly, omit_defaults=True)
+
+        self.assertListEqual(deltas, [(-1, 1), (-1, -1), (-1, 2), (-1, 3), (-1, -3), (-1, 4), (-1, -4), (1, 1), (1, -1), (1, 2)])
+        self.assertListEqual(interpreter.deltas_to_assembly(deltas), assembly)
+        self.assertListEqual(interpreter.assembly_to_deltas(['push 1', 'pop 2'], omit_defaults=True), [(1, 1), (0, 1), (1, -1), (0, 2)])
+
+    def test_example(self):
+        with open('examples/primes_assembly.txt') as fi:
+            assembly = fi.read().splitlines()
+        code = self.assertSameProgram(assembly)
+        self.assertLess(len(code.splitlines()), len(Interpreter().assembly_to_deltas(assembly)))
+
+    def test_starts_below_first_depth(self):
+        # Every instruction of this program goes one level down
+        self.assertSameProgram(['read 2', 'print 1', 'copy 3'])
+
+    def test_drifts(self):
+        for assembly in (['push 5'] * 300, ['print 3'] * 300, ['add'] * 300, ['read 2'] * 100 + ['push 99999'] * 100):
+            code = self.assertSameProgram(assembly)
+            lines = code.splitlines()
+            self.assertLess(max(len(line) - len(line.lstrip()) for line in lines), 100 * 4)
+            self.assertLess(max(len(line.split()) for line in lines), 60)
+
+    def test_random_programs(self):
+        generator = random.Random(42)
+        names = ['print', 'read', 'copy', 'jmpz', 'jmpnz', 'place', 'pick', 'push', 'pop', 'add', 'sub', 'mul', 'div', 'mod', 'pow', 'abs']
+        for _ in range(200):
+            assembly = []
+            for _ in range(generator.randint(0, 50)):
+                name = generator.choice(names)
+                if name in ('add', 'sub', 'mul', 'div', 'mod', 'pow', 'abs'):
+                    assembly.append(name)
+                else:
+                    assembly.append(f'{name} {generator.choice([0, 1, 2, generator.randint(-5000, 5000)])}')
+            self.assertSameProgram(assembly)
+
+    def test_invalid_deltas(self):
+        with self.assertRaises(CarrierError):
+            deltas_to_python_code([(2, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
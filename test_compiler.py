@@ -0,0 +1,120 @@
+import random
+import threading
+import unittest
+
+from compiler import compile_program
+from interpreter import FythonAssemblyError, FythonDivisionByZero, FythonLimitExceeded, Interpreter
+
+class Writer:
+    def __init__(self) -> None:
+        self.values = []
+    def write(self, value: str):
+        self.values.append(value)
+
+class Reader:
+    def __init__(self, values: list[int]) -> None:
+        self.values = values
+    def readline(self) -> str:
+        return f'{self.values.pop(0) if self.values else 0}\n'
+
+
+# Maximum time allowed for a compiled execution, in seconds
+COMPILED_TIMEOUT = 5
+
+
+class TestCompiler(unittest.TestCase):
+
+    def execute(self, lines: list[str], inputs: list[int], compiled: bool, max_steps: int) -> tuple:
+        writer = Writer()
+        reader = Reader(list(inputs or []))
+        try:
+            if compiled:
+                interpreter = Interpreter(writer, reader, output_format='number')
+                instructions = interpreter._parse_lines_to_instructions(lines)
+                result = compile_program(instructions).run(interpreter)
+            else:
+                interpreter = Interpreter(writer, reader, output_format='number', max_instructions=max_steps)
+                result = interpreter.execute_assembly(lines)
+        except (FythonDivisionByZero, FythonAssemblyError) as e:
+            result = (type(e), str(e))
+        return (result, writer.values)
+
+    def assertSameExecution(self, lines: list[str], inputs: list[int] = None, max_steps: int = 10_000_000) -> bool:
+        """Check the compiled program behaves like the interpreted one. Programs not ending within 'max_steps' instructions
+        when interpreted are ignored, and False is returned."""
+
+        try:
+            expected = self.execute(lines, inputs, False, max_steps)
+        except FythonLimitExceeded:
+            return False
+
+        # The compiled execution runs in a thread, so a program looping forever fails the test instead of blocking it
+        results = []
+        thread = threading.Thread(target=lambda: results.append(self.execute(lines, inputs, True, max_steps)), daemon=True)
+        thread.start()
+        thread.join(COMPILED_TIMEOUT)
+        if thread.is_alive():
+            self.fail(f'compiled execution did not end: {lines}')
+
+        self.assertEqual(results[0], expected, lines)
+        return True
+
+    def test_not_enough_elements(self):
+        for lines in (['copy 4'], ['place 2'], ['pick 3'], ['push 1', 'pop 2'], ['push 2', 'add'], ['add'], ['push 2', 'sub'], ['sub'],
+                      ['push 2', 'mul'], ['push 2', 'div'], ['div'], ['push 2', 'mod'], ['mod'], ['push 2', 'pow'], ['pow'], ['abs'], ['print 3'],
+                      ['pick -3'], ['push 1', 'pick -3'], ['push 1', 'push 2', 'place 5'], ['push 1', 'copy 0'], ['push 3', 'copy -1'],
+                      ['dup 2'], ['push 1', 'dup 2'], ['push 1', 'dup -3'], ['dupn 2'], ['push 1', 'dupn 3'], ['inc 2'], ['swap'], ['push 1', 'swap'],
+                      ['cmp'], ['push 2', 'cmp']):
+            self.assertSameExecution(lines)
+
+    def test_errors(self):
+        self.assertSameExecution(['push 1', 'push 0', 'div'])
+        self.assertSameExecution(['push 1', 'push 0', 'mod'])
+        self.assertSameExecution(['push 0', 'push -1', 'pow'])
+        self.assertSameExecution(['push 1', 'lol 2', 'push 3'])
+
+    def test_examples(self):
+        fibonacci = ['read 1', 'push 1', 'add', 'push 0', 'push 1', 'pick -1', 'push 1', 'sub', 'jmpz 7', 'place -1', 'copy 3', 'print 1', 'pick -2', 'add', 'jmpnz -9']
+        for n in (0, 1, 30):
+            self.assertTrue(self.assertSameExecution(fibonacci, [n]))
+
+        with open('examples/primes_assembly.txt') as fi:
+            primes = fi.read().splitlines()
+        self.assertTrue(self.assertSameExecution(primes, [200]))
+
+    def test_self_loop(self):
+        self.assertTrue(self.assertSameExecution(['push 10', 'push 1', 'sub', 'copy 2', 'print 1', 'jmpnz -4', 'push 7']))
+        self.assertTrue(self.assertSameExecution(['push 0', 'push 3', 'push 1', 'sub', 'copy 2', 'jmpz -3', 'push 7']))
+
+    def test_dead_zero_flag_assignments(self):
+        lines = ['push 3', 'push 1', 'sub', 'copy 2', 'pop 1', 'jmpnz -4', 'push 0']
+        program = compile_program(Interpreter()._parse_lines_to_instructions(lines))
+
+        # Only 'pop 1' (read by the jump) and the last 'push 0' (returned) assign the flag
+        self.assertEqual(program.source.count('zero_flag ='), 2)
+        self.assertTrue(self.assertSameExecution(lines))
+
+    def test_random_programs(self):
+        generator = random.Random(1234)
+        templates = ['print {}', 'read {}', 'copy {}', 'dup {}', 'dupn {}', 'place {}', 'pick {}', 'push {}', 'pop {}', 'inc {}', 'add', 'sub', 'div', 'mod', 'abs',
+                     'swap', 'cmp', 'jmpz {}', 'jmpnz {}']
+
+        ended = 0
+        for _ in range(500):
+            lines = []
+            for _ in range(generator.randint(1, 25)):
+                template = generator.choice(templates)
+                if template.startswith('jmp'):
+                    # Backward jumps stay inside the program
+                    lines.append(template.format(generator.randint(-len(lines), 4)))
+                else:
+                    lines.append(template.format(generator.randint(-3, 4)))
+            if self.assertSameExecution(lines, [generator.randint(-5, 5) for _ in range(10)], max_steps=2_000):
+                ended += 1
+
+        # Most of the programs should end, otherwise the test does not check much
+        self.assertGreater(ended, 250)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import random
+import threading
+import unittest
+
+from conformance import ENGINES, Outcome, interpreter_engine, random_program, register_engine, run_conformance, shrink
+from interpreter import Interpreter
+
+def faulty_engine(instructions: list[tuple[str, int]], inputs: list[list[int]]) -> list[Outcome]:
+    """The interpreter, except that a subtraction of 3 gives the wrong result."""
+    instructions = [('add', None) if (instruction, argument) == ('sub', None) and index > 0 and instructions[index - 1] == ('push', 3) else (instruction, argument)
+                    for index, (instruction, argument) in enumerate(instructions)]
+    return interpreter_engine(instructions, inputs)
+
+class TestConformance(unittest.TestCase):
+
+    def parse(self, lines: list[str]) -> list[tuple[str, int]]:
+        return Interpreter()._parse_lines_to_instructions(lines)
+
+    def test_engines_agree(self):
+        generator = random.Random(7)
+        programs = [random_program(generator, generator.randint(1, 20)) for _ in range(60)]
+        inputs = [[generator.randint(-5, 5) for _ in range(5)] for _ in range(3)]
+
+        report = run_conformance(programs, inputs, max_instructions=2_000)
+        self.assertEqual(report.divergences, [])
+        self.assertEqual(report.programs + report.skipped, 60)
+        self.assertIn('speedup', report.summary())
+
+    def test_divergence_is_shrunk(self):
+        register_engine('faulty', faulty_engine)
+        try:
+            lines = ['read 1', 'push 7', 'copy 2', 'print 1', 'push 2', 'mul', 'push 3', 'sub', 'print 1', 'push 5', 'pop 1']
+            report = run_conformance([self.parse(lines)], [[4], [9]], ['interpreter', 'faulty'])
+
+            divergence, = report.divergences
+            self.assertEqual((divergence.engine, divergence.values), ('faulty', [4]))
+            instructions, values = divergence.reproducer
+            # Only the subtraction of 3 is needed to show the divergence
+            self.assertEqual(instructions, self.parse(['push 3', 'sub']))
+            self.assertEqual(values, [])
+            self.assertIn('reproducer', report.summary())
+        finally:
+            del ENGINES['faulty']
+
+    def test_hanging_engine(self):
+        def hanging_engine(instructions, inputs):
+            threading.Event().wait()
+        register_engine('hanging', hanging_engine)
+        try:
+            report = run_conformance([self.parse(['push 1'])], [[]], ['interpreter', 'hanging'], timeout=0.2, shrink_divergences=False)
+            self.assertEqual(report.divergences[0].got.error[0], 'TimeoutError')
+        finally:
+            del ENGINES['hanging']
+
+
+if __name__ == '__main__':
+    unittest.main()
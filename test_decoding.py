@@ -0,0 +1,97 @@
+import random
+import unittest
+
+import decoding
+from decoding import OVERLAP, _decode_chunk, deltas_to_assembly_parallel, deltas_to_assembly_vectorized, iter_assembly
+from deltas import Deltas
+from generator import ProgramGenerator
+from interpreter import Interpreter
+
+class TestDecoding(unittest.TestCase):
+
+    def random_deltas(self, generator: random.Random, length: int) -> list[tuple[int, int]]:
+        """Deltas full of numbers and comments of every kind, so the chunks often start inside one of them."""
+
+        deltas = []
+        while len(deltas) < length:
+            kind = generator.random()
+            if kind < 0.05:
+                deltas.append((0, -generator.randint(1, 5)))
+            elif kind < 0.1:
+                deltas.append((0, generator.randint(1, 50)))
+            elif kind < 0.3:
+                deltas.extend((0, generator.randint(-9, 9)) for _ in range(generator.randint(1, 30)))
+            else:
+                deltas.append((generator.choice((-1, 1, 2)), generator.randint(-6, 6)))
+        return deltas
+
+    def test_same_as_sequential(self):
+        generator = random.Random(0)
+        interpreter = Interpreter()
+        for _ in range(10):
+            deltas = self.random_deltas(generator, generator.randint(0, 1000))
+            expected = interpreter.deltas_to_assembly(deltas)
+            for chunk_size in (3, 40, 300):
+                self.assertEqual(deltas_to_assembly_parallel(deltas, jobs=2, chunk_size=chunk_size), expected)
+
+    def test_vectorized_same_as_sequential(self):
+        generator = random.Random(1)
+        interpreter = Interpreter()
+        original = decoding.MIN_VECTORIZED_DELTAS
+        decoding.MIN_VECTORIZED_DELTAS = 0
+        try:
+            for _ in range(30):
+                deltas = self.random_deltas(generator, generator.randint(0, 1000))
+                # Digits which are not single ones, long numbers and huge line comments
+                for _ in range(5):
+                    deltas.insert(generator.randint(0, len(deltas)), (0, generator.choice((-10, 12, 2**62))))
+                deltas[generator.randint(0, len(deltas)):0] = [(1, 1)] + [(0, generator.randint(-9, 9)) for _ in range(40)]
+                expected = interpreter.deltas_to_assembly(deltas)
+                self.assertEqual(deltas_to_assembly_vectorized(deltas), expected)
+                self.assertEqual(deltas_to_assembly_vectorized(Deltas(deltas)), expected)
+
+            # Comments which are not integers are decoded sequentially, and the errors are the same
+            deltas = interpreter.assembly_to_deltas(['push -12', 'add', 'print 3'], add_comment=True)
+            self.assertEqual(deltas_to_assembly_vectorized(deltas), ['push -12', 'add', 'print 3'])
+            with self.assertRaises(ValueError):
+                deltas_to_assembly_vectorized([(1, 1), (0, 1), (0, -13)])
+        finally:
+            decoding.MIN_VECTORIZED_DELTAS = original
+
+    def test_program(self):
+        lines = ProgramGenerator(2, argument_digits=20).instructions(2000)
+        deltas = Interpreter().assembly_to_deltas(lines)
+        self.assertEqual(deltas_to_assembly_parallel(deltas, jobs=2, chunk_size=500), Interpreter().deltas_to_assembly(deltas))
+
+    def test_comment_across_chunks(self):
+        # A block comment opened in the first chunk hides the instructions of the next ones
+        deltas = [(1, 1), (0, 5), (1, 2), (0, -1)] + [(1, 2)] * 50 + [(0, -2), (-1, 1), (0, 3)]
+        self.assertEqual(deltas_to_assembly_parallel(deltas, jobs=2, chunk_size=10), ['push 5', 'add', 'print 3'])
+
+        # The second chunk starts inside the comment, where its speculative decoding fails
+        deltas = [(1, 1), (0, 1), (2, 0), (0, 3), (1, 1), (0, 1), (0, -20), (1, 1), (0, 7)]
+        self.assertEqual(deltas_to_assembly_parallel(deltas, jobs=2, chunk_size=4), Interpreter().deltas_to_assembly(deltas))
+
+    def test_chunk_needing_more_deltas(self):
+        # The number starting at the end of the chunk goes on after the deltas sent, so it is left to the stitching
+        deltas = [(1, 2), (1, 1)] + [(0, 1)] * (OVERLAP + 10)
+        positions, lines, stop = _decode_chunk(deltas[:2 + OVERLAP], 0, 2, False)
+        self.assertEqual((positions, lines, stop), ([0], ['add'], 1))
+        self.assertEqual(deltas_to_assembly_parallel(deltas, jobs=2, chunk_size=2), Interpreter().deltas_to_assembly(deltas))
+
+    def test_streaming(self):
+        generator = random.Random(1)
+        interpreter = Interpreter()
+        batch_size, trim_size = decoding.STREAM_BATCH_SIZE, decoding.STREAM_TRIM_SIZE
+        # Small batches, so the numbers and the comments are often cut
+        decoding.STREAM_BATCH_SIZE, decoding.STREAM_TRIM_SIZE = 5, 20
+        try:
+            for _ in range(50):
+                deltas = self.random_deltas(generator, generator.randint(0, 500))
+                self.assertEqual(list(iter_assembly(iter(deltas))), interpreter.deltas_to_assembly(deltas))
+        finally:
+            decoding.STREAM_BATCH_SIZE, decoding.STREAM_TRIM_SIZE = batch_size, trim_size
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from deltas import Deltas
+from interpreter import Interpreter
+from interpreter_manager import InterpreterManager
+
+class TestDeltas(unittest.TestCase):
+
+    def test_sequence(self):
+        values = [(0, 1), (1, 0), (-1, 5), (0, -3)]
+        deltas = Deltas(values)
+
+        self.assertEqual(len(deltas), 4)
+        self.assertEqual(deltas[2], (-1, 5))
+        self.assertEqual(deltas[-1], (0, -3))
+        self.assertEqual(list(deltas), values)
+        self.assertEqual(deltas, values)
+        self.assertEqual(deltas[1:3], values[1:3])
+        self.assertIsInstance(deltas[1:3], Deltas)
+        self.assertEqual(deltas + [(1, 1)], values + [(1, 1)])
+        self.assertNotEqual(deltas, values[:3])
+        self.assertIn((1, 0), deltas)
+        self.assertEqual(pickle.loads(pickle.dumps(deltas)), deltas)
+        with self.assertRaises(IndexError):
+            deltas[4]
+
+    def test_widening(self):
+        deltas = Deltas([(1, 1)])
+        self.assertEqual(deltas.nbytes, 5)
+
+        deltas.append((300, 2**40))
+        deltas.append((-2**40, -1))
+        self.assertEqual(deltas, [(1, 1), (300, 2**40), (-2**40, -1)])
+        with self.assertRaises(OverflowError):
+            deltas.append((0, 2**70))
+        # A delta which does not fit is not partially added
+        self.assertEqual(len(deltas.di), len(deltas.dw))
+
+    def test_interpreter(self):
+        code = "if a:\n    b = 1\n    c = a , b\nd = 3 # comment\n"
+        lines = ['push 12', 'print 1', 'add', 'jmpz -2']
+        compact = Interpreter(compact_deltas=True)
+
+        self.assertIsInstance(compact.python_code_to_deltas(code), Deltas)
+        self.assertEqual(compact.python_code_to_deltas(code), Interpreter().python_code_to_deltas(code))
+        deltas = compact.assembly_to_deltas(lines)
+        self.assertIsInstance(deltas, Deltas)
+        self.assertEqual(compact.deltas_to_assembly(deltas), Interpreter().deltas_to_assembly(Interpreter().assembly_to_deltas(lines)))
+        # The comments are not integers, so they are kept in a list
+        self.assertIsInstance(compact.assembly_to_deltas(lines, add_comment=True), list)
+
+    def test_read_deltas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'program_deltas.txt')
+            with open(path, 'w') as fo:
+                fo.write("di\tdw\n1\t1\n0\t4\n-1\t1\n")
+            deltas = InterpreterManager(Interpreter(compact_deltas=True), 'd', 'a').read_deltas(path)
+
+        self.assertIsInstance(deltas, Deltas)
+        self.assertEqual(deltas, [(1, 1), (0, 4), (-1, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
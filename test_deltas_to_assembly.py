@@ -60,6 +60,15 @@ class TestDeltasToAssembly(unittest.TestCase):
 
         self.assertListEqual(interpreter.deltas_to_assembly(deltas), expected)
 
+    def test_bulk_stack_and_comparison_opcodes(self):
+        interpreter = Interpreter()
+
+        deltas = [(-1, -2), (-1, 5), (-1, -5), (1, -5), (1, 6), (-1, -12), (0, 3), (-1, 15), (0, 0), (0, 4), (1, 16)]
+        expected = ['dup 0', 'dupn 2', 'inc 1', 'swap', 'cmp', 'dup 3', 'dupn -4', 'cmp']
+
+        self.assertListEqual(interpreter.deltas_to_assembly(deltas), expected)
+        self.assertListEqual(interpreter.deltas_to_assembly(interpreter.assembly_to_deltas(expected)), expected)
+
     def test_comments(self):
         interpreter = Interpreter()
 
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from interpreter import FythonAssemblyError, FythonDivisionByZero, Interpreter
@@ -53,6 +54,33 @@ class TestExecuteFromAssembly(unittest.TestCase):
 
         self.assertListEqual(stack, [6, 4, 6, 5, 6, 5, 4])
 
+    def test_execute_bulk_stack_and_comparison(self):
+        interpreter = Interpreter()
+
+        lines = ['push 1', 'push 2', 'push 3', 'dup 2', 'dup -2', 'dupn 3', 'swap', 'inc -4', 'push 5', 'push 7', 'cmp', 'push 7', 'push 5', 'cmp']
+        stack, zero_flag = interpreter.execute_assembly(lines)
+
+        self.assertListEqual(stack, [1, 2, 3, 1, 2, 3, 2, -3, -1, 1])
+        self.assertFalse(zero_flag)
+
+        stack, zero_flag = interpreter.execute_assembly(['push 5', 'push 1', 'inc -1', 'push 5', 'push 5', 'cmp'])
+        self.assertListEqual(stack, [5, 0, 0])
+        self.assertTrue(zero_flag)
+
+    def test_execute_rewritten_examples(self):
+        # The examples rewritten with the bulk stack and comparison instructions print the same values with fewer instructions
+        for name, value in (('fibonacci', 30), ('is_prime', 997), ('primes', 200)):
+            results = []
+            for suffix in ('', '_opcodes'):
+                with open(f'examples/{name}{suffix}_assembly.txt') as fi:
+                    lines = fi.read().splitlines()
+                writer = io.StringIO()
+                interpreter = Interpreter(writer, io.StringIO(f'{value}\n'), output_format='number')
+                interpreter.execute_assembly(lines)
+                results.append((writer.getvalue(), interpreter.executed_steps))
+            self.assertEqual(results[0][0], results[1][0])
+            self.assertLess(results[1][1], results[0][1])
+
     def test_execute_jumps(self):
         interpreter = Interpreter()
 
@@ -139,6 +167,16 @@ class TestExecuteFromAssembly(unittest.TestCase):
         assertOK(interpreter, ['push 2', 'pow'], [1])
         assertOK(interpreter, ['pow'], [1])
         assertOK(interpreter, ['abs'], [0])
+        assertOK(interpreter, ['dup 2'], [0], True)
+        assertOK(interpreter, ['push 4', 'dup 2'], [4, 4], False)
+        assertOK(interpreter, ['push 4', 'dup -3'], [4, 4], False)
+        assertOK(interpreter, ['dupn 2'], [], True)
+        assertOK(interpreter, ['push 4', 'dupn 3'], [4, 4], False)
+        assertOK(interpreter, ['inc 3'], [3], False)
+        assertOK(interpreter, ['swap'], [0, 0], True)
+        assertOK(interpreter, ['push 4', 'swap'], [4, 0], True)
+        assertOK(interpreter, ['cmp'], [0], True)
+        assertOK(interpreter, ['push 2', 'cmp'], [-1], False)
 
     def test_division_by_zero(self):
         interpreter = Interpreter()
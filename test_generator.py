@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from generator import ProgramGenerator, generate_corpus
+from interpreter import Interpreter
+from interpreter_manager import InterpreterManager
+
+class TestGenerator(unittest.TestCase):
+
+    def test_programs_end(self):
+        for seed in range(20):
+            generator = ProgramGenerator(seed, loop_depth=3, loop_iterations=4)
+            lines = generator.instructions(200)
+            self.assertGreaterEqual(len(lines), 200)
+
+            interpreter = Interpreter(max_instructions=1_000_000)
+            interpreter.execute_assembly(lines)
+            # The loops are executed, so more instructions are executed than there are in the program
+            self.assertGreater(interpreter.executed_steps, 0)
+
+    def test_formats(self):
+        directory = tempfile.mkdtemp()
+        try:
+            options = {'comment_density': 0.5, 'line_length': 100, 'argument_digits': 12}
+            path, = generate_corpus(directory, 1, 300, seed=3, **options)
+            interpreter = Interpreter()
+            parse = interpreter._parse_lines_to_instructions
+
+            manager = InterpreterManager(interpreter, 'a', 'e')
+            assembly = manager.read_assembly(f'{path}_assembly.txt')
+            expected = parse(ProgramGenerator(3, **options).instructions(300))
+            self.assertEqual(parse(assembly), expected)
+            self.assertEqual(parse(interpreter.deltas_to_assembly(manager.read_deltas(f'{path}_deltas.txt'))), expected)
+            code = manager.read_python(f'{path}.py')
+            self.assertEqual(parse(interpreter.deltas_to_assembly(interpreter.python_code_to_deltas(code))), expected)
+
+            # The options are visible in the files
+            self.assertTrue(any(line.strip().startswith('#') for line in assembly))
+            self.assertTrue(all(len(line) >= 100 for line in code.splitlines() if not line.strip().startswith('#')))
+            self.assertTrue(any(len(str(abs(argument))) == 12 for instruction, argument in expected if instruction == 'push'))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_mix(self):
+        lines = ProgramGenerator(0, mix={'loop': 0, 'branch': 0, 'print': 0, 'move': 0}).instructions(100)
+        self.assertFalse(any(line.split()[0] in ('jmpz', 'jmpnz', 'print', 'place', 'pick', 'copy') for line in lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
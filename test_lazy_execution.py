@@ -0,0 +1,80 @@
+import io
+import os
+import tempfile
+import unittest
+
+from decoding import iter_assembly
+from interpreter import Interpreter, PythonCodeError
+from interpreter_manager import InterpreterManager
+
+class TestLazyExecution(unittest.TestCase):
+
+    def execute(self, lines: list[str], lazily: bool, batch_size: int = 2) -> tuple[str, list[int], bool, int]:
+        writer = io.StringIO()
+        interpreter = Interpreter(writer, io.StringIO('3 4 5'), output_format='number')
+        if lazily:
+            stack, zero_flag = interpreter.execute_lazily(lines, batch_size)
+        else:
+            stack, zero_flag = interpreter.execute_assembly(lines)
+        return (writer.getvalue(), stack, zero_flag, interpreter.executed_steps)
+
+    def test_same_results(self):
+        programs = [
+            [],
+            ['push 5', 'copy 2', 'print 1', 'push 1', 'sub', 'jmpnz -4', 'push 9'],
+            # Forward jumps past the parsed instructions
+            ['push 1', 'jmpnz 6', 'push 2', 'push 3', 'push 4', 'push 5', 'push 6', 'push 7', 'print 1'],
+            ['read 3', 'jmpz 100', 'push 7'],
+            # A jump before the start, which indexes the instructions from the end
+            ['push 1', 'print 1', 'jmpz -2', 'push 0', 'push 2', 'push 3', 'print 3'],
+        ]
+        for lines in programs:
+            self.assertEqual(self.execute(lines, True), self.execute(lines, False))
+
+    def test_lines_requested_on_demand(self):
+        requested = []
+        def lines():
+            for line in ['push 65', 'print 1', 'push 0', 'jmpz 2000'] + ['push 1'] * 1000:
+                requested.append(line)
+                yield line
+
+        output, stack, zero_flag, steps = self.execute(lines(), True, batch_size=4)
+        self.assertEqual((output, stack, steps), ('65\n', [0], 4))
+        # The jump goes past the end, so every line is needed to know the length of the program
+        self.assertEqual(len(requested), 1004)
+
+        requested.clear()
+        writer = io.StringIO()
+        def printing_lines():
+            for line in ['push 65', 'print 1'] + ['push 1'] * 1000:
+                # The first value is printed before the next lines are requested
+                requested.append(writer.getvalue())
+                yield line
+        Interpreter(writer, output_format='number').execute_lazily(printing_lines(), batch_size=2)
+        self.assertEqual(requested[:3], ['', '', '65\n'])
+
+    def test_manager(self):
+        code = "a = 1\nif a:\n    b = 2\n    c = 3 , 4\nd = 1\n"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'program.py')
+            with open(path, 'w') as fo:
+                fo.write(code)
+            deltas_path = os.path.join(directory, 'program_deltas.txt')
+            InterpreterManager(Interpreter(), 'p', 'd').execute(path, deltas_path)
+
+            for input_type, input_path in (('p', path), ('d', deltas_path)):
+                results = []
+                for engine in ('interpreter', 'compiled'):
+                    manager = InterpreterManager(Interpreter(io.StringIO(), output_format='number'), input_type, 'e', engine=engine)
+                    self.assertEqual(manager.can_execute_lazily(), engine == 'interpreter')
+                    results.append(manager.conversion_function()(input_path))
+                self.assertEqual(results[0], results[1])
+
+    def test_invalid_code(self):
+        manager = InterpreterManager(Interpreter(io.StringIO()), 'p', 'e')
+        with self.assertRaises(PythonCodeError):
+            manager.execute_lazily(iter_assembly(manager.interpreter.iter_python_code_deltas('if:')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import io
+import unittest
+
+from compiler import compile_program
+from interpreter import FythonLimitExceeded, Interpreter
+
+class TestLimits(unittest.TestCase):
+
+    def execute(self, lines: list[str], inputs: str = '', **kwargs) -> tuple[list[int], bool]:
+        interpreter = Interpreter(io.StringIO(), io.StringIO(inputs), output_format='number', **kwargs)
+        return interpreter.execute_assembly(lines)
+
+    def test_no_limit_reached(self):
+        lines = ['push 100', 'push 1', 'sub', 'jmpnz -2']
+        expected = self.execute(lines)
+        self.assertEqual(self.execute(lines, max_instructions=1000, max_time=60, max_stack=10, max_int_bits=10), expected)
+
+    def test_max_instructions(self):
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(['push 1', 'jmpnz 0', 'jmpnz -1'], max_instructions=1000)
+
+        self.assertEqual(context.exception.limit, 'instructions')
+        self.assertGreater(context.exception.steps, 1000)
+        self.assertLess(context.exception.steps, 1010)
+        self.assertListEqual(context.exception.stack, [1])
+        self.assertFalse(context.exception.zero_flag)
+
+    def test_max_time(self):
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(['push 1', 'jmpnz -1'], max_time=0.01)
+        self.assertEqual(context.exception.limit, 'time')
+
+    def test_max_stack(self):
+        # Growing one element at a time
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(['push 1', 'jmpnz -1'], max_stack=100)
+        self.assertEqual(context.exception.limit, 'stack')
+        self.assertLessEqual(len(context.exception.stack), 102)
+
+        # Growing at once
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(['push 1', 'copy 1000000000000'], max_stack=100)
+        self.assertEqual(context.exception.limit, 'stack')
+        self.assertEqual(context.exception.instruction_pointer, 1)
+        self.assertListEqual(context.exception.stack, [1])
+
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(['read 5'], '1\n2\n3\n4\n5\n', max_stack=3)
+        self.assertListEqual(context.exception.stack, [1, 2, 3, 4])
+
+    def test_max_int_bits(self):
+        # Doubling at each iteration
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(['push 1', 'copy 2', 'add', 'jmpnz -2'], max_int_bits=64)
+        self.assertEqual(context.exception.limit, 'int_bits')
+        self.assertLessEqual(context.exception.stack[-1].bit_length(), 66)
+
+        # Squaring at each iteration
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(['push 3', 'copy 2', 'mul', 'jmpnz -2'], max_int_bits=1000)
+        self.assertEqual(context.exception.limit, 'int_bits')
+
+        # Never computed
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(['push 10', 'push 1000000000000', 'pow'], max_int_bits=1000)
+        self.assertEqual(context.exception.instruction_pointer, 2)
+
+        with self.assertRaises(FythonLimitExceeded):
+            self.execute(['read 1'], f'{2**100}\n', max_int_bits=64)
+
+        # Pushed integers count
+        with self.assertRaises(FythonLimitExceeded):
+            self.execute(['push 1', 'push 1000000', 'jmpnz -1'], max_int_bits=8)
+
+    def test_single_long_instruction(self):
+        # A print stops with the stack, and each value read past the end of the input counts as an instruction
+        self.assertEqual(self.execute(['push 1', 'print 1000000000000'], max_time=1), ([], False))
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(['read 1000000000000'], '1\n2\n', max_instructions=1000)
+        self.assertEqual(context.exception.limit, 'instructions')
+        self.assertListEqual(context.exception.stack[:3], [1, 2, 0])
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(['read 1000000000000'], max_time=0.05)
+        self.assertEqual(context.exception.limit, 'time')
+
+    def test_compiled_engine_uses_limits(self):
+        interpreter = Interpreter(io.StringIO(), io.StringIO(), max_instructions=100)
+        program = compile_program(interpreter._parse_lines_to_instructions(['push 1', 'jmpnz -1']))
+        with self.assertRaises(FythonLimitExceeded):
+            program.run(interpreter)
+
+
+if __name__ == '__main__':
+    unittest.main()
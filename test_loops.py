@@ -0,0 +1,79 @@
+import unittest
+
+from compiler import compile_program
+from interpreter import Interpreter
+from loops import find_induction_loops
+
+class TestInductionLoops(unittest.TestCase):
+
+    def parse(self, lines: list[str]) -> list[tuple[str, int]]:
+        return Interpreter()._parse_lines_to_instructions(lines)
+
+    def assertSameExecution(self, lines: list[str]):
+        instructions = self.parse(lines)
+        self.assertEqual(compile_program(instructions).run(Interpreter()), Interpreter().execute_instructions(instructions))
+
+    def test_countdown(self):
+        instructions = self.parse(['push 7', 'push 1', 'sub', 'jmpnz -2', 'push 3'])
+        loops = find_induction_loops(instructions)
+
+        self.assertListEqual(list(loops), [1])
+        self.assertEqual((loops[1].counter, loops[1].step, loops[1].increments), (0, -1, {}))
+
+        stack = [7]
+        self.assertTrue(loops[1].apply(stack))
+        self.assertListEqual(stack, [0])
+
+    def test_constant_increment(self):
+        lines = ['push 10', 'push 5', 'pick 1', 'push 3', 'add', 'pick 1', 'push 1', 'sub', 'jmpnz -6']
+
+        self.assertListEqual(list(find_induction_loops(self.parse(lines))), [2])
+        self.assertSameExecution(lines)
+
+    def test_multiplication(self):
+        # acc += y, c times
+        lines = ['push 7', 'push 0', 'push 6', 'pick 2', 'copy 2', 'place 3', 'pick 2', 'add', 'pick 1', 'push 1', 'sub', 'jmpnz -8', 'print 3']
+        loops = find_induction_loops(self.parse(lines))
+
+        self.assertListEqual(list(loops), [3])
+        self.assertEqual(loops[3].increments, {1: ({2: 1}, 0)})
+        self.assertSameExecution(lines)
+
+    def test_counter_sum(self):
+        # acc += c, c times
+        lines = ['push 0', 'push 100', 'copy 2', 'pick 2', 'add', 'pick 1', 'push 1', 'sub', 'jmpnz -6']
+        loops = find_induction_loops(self.parse(lines))
+
+        self.assertEqual(loops[2].increments, {1: ({}, 1)})
+        self.assertSameExecution(lines)
+
+    def test_bulk_stack_instructions(self):
+        # acc += c, c times, with the counter on top
+        lines = ['push 0', 'push 100', 'swap', 'dup 1', 'add', 'swap', 'inc -1', 'jmpnz -5']
+        loops = find_induction_loops(self.parse(lines))
+
+        self.assertListEqual(list(loops), [2])
+        self.assertEqual((loops[2].counter, loops[2].step), (0, -1))
+        self.assertSameExecution(lines)
+
+    def test_never_ending_loop_not_applied(self):
+        instructions = self.parse(['push 5', 'push 2', 'sub', 'jmpnz -2'])
+        loop = find_induction_loops(instructions)[1]
+
+        stack = [5]
+        self.assertFalse(loop.apply(stack))
+        self.assertListEqual(stack, [5])
+
+    def test_unsupported_loops(self):
+        # I/O in the body
+        self.assertDictEqual(find_induction_loops(self.parse(['push 3', 'push 1', 'sub', 'copy 2', 'print 1', 'jmpnz -4'])), {})
+        # The stack grows at each iteration
+        self.assertDictEqual(find_induction_loops(self.parse(['push 3', 'copy 2', 'push 1', 'sub', 'jmpnz -3'])), {})
+        # The stack may not have enough elements
+        self.assertDictEqual(find_induction_loops(self.parse(['push 1', 'sub', 'jmpnz -2'])), {})
+        # Doubling is not an increment
+        self.assertDictEqual(find_induction_loops(self.parse(['push 1', 'push 3', 'pick 1', 'copy 2', 'add', 'pick 1', 'push 1', 'sub', 'jmpnz -6'])), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+import unittest
+
+from interpreter import FythonLimitExceeded, Interpreter
+from memory import MAX_SAMPLES, MemoryProfile, stack_bytes
+
+class TestMemory(unittest.TestCase):
+
+    def test_stack_bytes(self):
+        self.assertLess(stack_bytes([1, 2, 3]), stack_bytes([1, 2, 3, 2**1000]))
+
+    def test_peaks(self):
+        memory = MemoryProfile(sample_interval=10)
+        # Push 50 values, then pop them all
+        lines = ['push 50', 'copy 2', 'push 1', 'sub', 'jmpnz -3', 'pop 2', 'jmpnz -1', 'push 2', 'push 100', 'pow']
+        Interpreter(memory=memory).execute_assembly(lines)
+
+        # The length is measured at the jumps and at the copies, which reach 51 elements in the last iteration of the first loop
+        self.assertEqual(memory.peak_stack_length, 51)
+        self.assertEqual(memory.peak_stack_length_instruction, 1)
+        self.assertEqual(memory.largest_int_bits, 101)
+        self.assertEqual(memory.largest_int_instruction, 9)
+        self.assertGreater(memory.peak_bytes, 0)
+        self.assertGreater(len(memory.samples), 5)
+
+    def test_straight_line_growth(self):
+        # The stack grows and shrinks back without any jump
+        memory = MemoryProfile()
+        Interpreter(memory=memory).execute_assembly(['push 5', 'copy 1000', 'pop 1000', 'push 3', 'push 200', 'pow', 'pop 1'])
+        self.assertEqual((memory.peak_stack_length, memory.peak_stack_length_instruction), (1000, 1))
+        self.assertEqual((memory.largest_int_bits, memory.largest_int_instruction), (317, 5))
+
+    def test_samples_are_bounded(self):
+        memory = MemoryProfile(sample_interval=1)
+        with self.assertRaises(FythonLimitExceeded):
+            Interpreter(memory=memory, max_instructions=10 * MAX_SAMPLES).execute_assembly(['push 1', 'jmpnz -1'])
+
+        self.assertLessEqual(len(memory.samples), MAX_SAMPLES)
+        self.assertGreater(memory.sample_interval, 1)
+        self.assertEqual(memory.peak_stack_length_instruction, 0)
+
+    def test_json(self):
+        memory = MemoryProfile()
+        Interpreter(memory=memory).execute_assembly(['push 1', 'copy 5'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'memory.json')
+            memory.write_json(path)
+            with open(path) as fi:
+                data = json.load(fi)
+
+        self.assertEqual(data['peak_stack_length'], {'value': 5, 'instruction': 1})
+        self.assertEqual(data['samples'][-1]['stack_length'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
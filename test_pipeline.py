@@ -0,0 +1,79 @@
+import io
+import time
+import unittest
+
+from interpreter import Interpreter
+from pipeline import PipelineError, ValueChannel, execute_pipeline
+
+
+def parse(lines: list[str]) -> list[tuple[str, int]]:
+    return Interpreter()._parse_lines_to_instructions(lines)
+
+# Prints 3000 down to 1
+COUNT_PROGRAM = parse(['push 3000', 'dup 0', 'print 1', 'inc -1', 'jmpnz -3'])
+# Prints the double of each value read, until it reads 0
+DOUBLE_PROGRAM = parse(['read 1', 'jmpz 5', 'push 2', 'mul', 'print 1', 'jmpnz -5'])
+# Reads three values and prints the first one
+FIRST_PROGRAM = parse(['read 3', 'pop 2', 'print 1'])
+
+
+class TestPipeline(unittest.TestCase):
+
+    def execute(self, programs: list, program_input: str = None, **options) -> tuple[str, list]:
+        writer = io.StringIO()
+        reader = io.StringIO(program_input) if program_input is not None else None
+        results = execute_pipeline(programs, writer, reader, output_format='number', **options)
+        return (writer.getvalue(), results)
+
+    def test_channel(self):
+        channel = ValueChannel(capacity=3, chunk_size=2)
+        for value in (1, 2**100, -3):
+            channel.put(value)
+        channel.close()
+        self.assertListEqual([channel.get() for _ in range(5)], [1, 2**100, -3, 0, 0])
+
+    def test_same_as_sequential(self):
+        # The output of each program executed alone, given as input to the next one
+        expected = ''
+        for program in (COUNT_PROGRAM, DOUBLE_PROGRAM, DOUBLE_PROGRAM):
+            writer = io.StringIO()
+            Interpreter(writer, io.StringIO(expected), output_format='number').execute_instructions(program)
+            expected = writer.getvalue()
+
+        for processes in (False, True):
+            for capacity, chunk_size in ((64, 1024), (1, 1), (2, 7)):
+                output, results = self.execute([COUNT_PROGRAM, DOUBLE_PROGRAM, DOUBLE_PROGRAM], processes=processes, capacity=capacity, chunk_size=chunk_size)
+                self.assertEqual(output, expected)
+                self.assertListEqual(results, [([0], True), ([0], True), ([0], True)])
+
+        output, _ = self.execute([DOUBLE_PROGRAM, DOUBLE_PROGRAM], '1\n-5\n', engine='compiled')
+        self.assertEqual(output, '4\n-20\n')
+
+    def test_end_of_stream(self):
+        for processes in (False, True):
+            # The second program reads 0 past the 2 values printed by the first one
+            output, results = self.execute([FIRST_PROGRAM, FIRST_PROGRAM], '7\n8\n', processes=processes)
+            self.assertEqual(output, '7\n')
+            self.assertListEqual(results, [([], False), ([], False)])
+
+            # The first program does not wait for the last one, which stops after reading 3 values
+            start = time.perf_counter()
+            output, _ = self.execute([COUNT_PROGRAM, FIRST_PROGRAM], processes=processes, capacity=1, chunk_size=1)
+            self.assertEqual(output, '3000\n')
+            self.assertLess(time.perf_counter() - start, 10)
+
+    def test_errors(self):
+        for processes in (False, True):
+            with self.assertRaises(PipelineError) as context:
+                self.execute([COUNT_PROGRAM, parse(['read 1', 'push 0', 'div']), DOUBLE_PROGRAM], processes=processes)
+            self.assertIn('program 2', str(context.exception))
+
+        with self.assertRaises(PipelineError):
+            self.execute([COUNT_PROGRAM], memory=None)
+        with self.assertRaises(PipelineError):
+            self.execute([])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import io
+import threading
+import unittest
+
+from interpreter import FythonLimitExceeded, Interpreter
+from program import FythonProgram
+
+class TestProgram(unittest.TestCase):
+
+    def setUp(self) -> None:
+        with open('examples/fibonacci_assembly.txt') as fi:
+            self.assembly = fi.read().splitlines()
+        self.program = FythonProgram.from_assembly(self.assembly)
+
+    def run_program(self, program: FythonProgram, value: int, **options) -> str:
+        writer = io.StringIO()
+        program.execute(writer, io.StringIO(f'{value}\n'), output_format='number', **options)
+        return writer.getvalue()
+
+    def test_input_types(self):
+        with open('test_files/python.py') as fi:
+            code = fi.read()
+        interpreter = Interpreter()
+        deltas = interpreter.python_code_to_deltas(code)
+
+        from_python = FythonProgram.from_python(code)
+        self.assertEqual(from_python, FythonProgram.from_deltas(deltas))
+        self.assertEqual(from_python, FythonProgram.from_assembly(interpreter.deltas_to_assembly(deltas)))
+        self.assertEqual(FythonProgram.from_assembly(from_python.assembly), from_python)
+
+    def test_executions(self):
+        expected = self.run_program(self.program, 10)
+        self.assertTrue(expected.startswith('1\n1\n2\n3\n5\n'))
+
+        # The same program gives the same results every time, with both engines
+        self.assertEqual(self.run_program(self.program, 10), expected)
+        self.assertEqual(self.run_program(self.program, 10, engine='compiled'), expected)
+        self.assertIs(self.program.compiled(), self.program.compiled())
+
+        with self.assertRaises(FythonLimitExceeded):
+            self.run_program(self.program, 1000, max_instructions=100)
+
+    def test_concurrent_executions(self):
+        expected = {value: self.run_program(self.program, value) for value in range(20)}
+        results = {}
+
+        def execute(value: int) -> None:
+            results[value] = self.run_program(self.program, value, engine='compiled' if value % 2 else 'interpreter')
+
+        threads = [threading.Thread(target=execute, args=(value,)) for value in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, expected)
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.program.instructions = []
+        with self.assertRaises(AttributeError):
+            self.program.other = 1
+        self.assertIsInstance(self.program.instructions, tuple)
+        self.assertEqual(len({self.program, FythonProgram.from_assembly(self.assembly)}), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import io
+import os
+import tempfile
+import unittest
+
+from interpreter import Interpreter, program_hash
+from snapshot import Snapshot, SnapshotError, decode_stack, encode_stack, read_snapshot, write_snapshot
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'run.snap')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_encode_stack_int64(self):
+        stack = [0, 1, -1, 2**63 - 1, -2**63]
+        data, big_ints = encode_stack(stack)
+
+        self.assertFalse(big_ints)
+        self.assertEqual(len(data), 8 * len(stack))
+        self.assertListEqual(decode_stack(data, len(stack), big_ints), stack)
+
+    def test_encode_stack_big_ints(self):
+        stack = [0, 2**63, -2**63 - 1, 3**500, -(7**321), 255, -128]
+        data, big_ints = encode_stack(stack)
+
+        self.assertTrue(big_ints)
+        self.assertListEqual(decode_stack(data, len(stack), big_ints), stack)
+
+    def test_file_round_trip(self):
+        snapshot = Snapshot(b'h' * 32, 12, [1, 2, 3], False, 1000, 4, 5, 6, -1)
+        write_snapshot(self.path, snapshot)
+        restored = read_snapshot(self.path)
+
+        self.assertEqual(restored.program_hash, b'h' * 32)
+        self.assertEqual(restored.instruction_pointer, 12)
+        self.assertListEqual(restored.stack, [1, 2, 3])
+        self.assertFalse(restored.zero_flag)
+        self.assertEqual((restored.steps, restored.input_count, restored.output_count), (1000, 4, 5))
+        self.assertEqual((restored.input_position, restored.output_position), (6, -1))
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as fo:
+            fo.write(b'not a snapshot')
+
+        with self.assertRaises(SnapshotError):
+            read_snapshot(self.path)
+
+    def test_resume_after_interruption(self):
+        class InterruptingWriter(io.StringIO):
+            def __init__(self, limit: int) -> None:
+                super().__init__()
+                self.limit = limit
+            def write(self, value: str) -> int:
+                if self.limit == 0:
+                    raise KeyboardInterrupt
+                self.limit -= 1
+                return super().write(value)
+
+        lines = ['read 1', 'push 1', 'add', 'push 0', 'push 1', 'pick -1', 'push 1', 'sub', 'jmpz 7', 'place -1', 'copy 3', 'print 1', 'pick -2', 'add', 'jmpnz -9']
+
+        expected_output = io.StringIO()
+        expected = Interpreter(expected_output, io.StringIO('30\n'), output_format='number').execute_assembly(lines)
+
+        writer = InterruptingWriter(20)
+        interpreter = Interpreter(writer, io.StringIO('30\n'), output_format='number', snapshot_path=self.path, snapshot_interval=50)
+        with self.assertRaises(KeyboardInterrupt):
+            interpreter.execute_assembly(lines)
+
+        resumed_output = io.StringIO(writer.getvalue())
+        resumed_output.seek(0, io.SEEK_END)
+        interpreter = Interpreter(resumed_output, io.StringIO('30\n'), output_format='number', snapshot_path=self.path, snapshot_interval=50, resume=True)
+        result = interpreter.execute_assembly(lines)
+
+        self.assertEqual(result, expected)
+        self.assertEqual(resumed_output.getvalue(), expected_output.getvalue())
+
+    def test_resume_other_program(self):
+        interpreter = Interpreter(snapshot_path=self.path)
+        write_snapshot(self.path, Snapshot(program_hash([('push', 1)]), 0, [], True))
+        interpreter.resume = True
+
+        with self.assertRaises(SnapshotError):
+            interpreter.execute_assembly(['push 2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
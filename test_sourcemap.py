@@ -0,0 +1,93 @@
+import io
+import os
+import tempfile
+import unittest
+
+from carrier import assembly_to_python_code
+from interpreter import FythonDivisionByZero, Interpreter
+from interpreter_manager import InterpreterManager
+from memory import MemoryProfile
+from sourcemap import SourceMap, assembly_source_map, decoded_delta_indices, python_source_map
+
+class TestSourceMap(unittest.TestCase):
+
+    def test_python_code_delta_lines(self):
+        interpreter = Interpreter()
+        code = '# comment\na = 1\n\nb  =  2\nif a:\n    # comment\n    c = 1 + 2  # comment\n'
+        self.assertListEqual(interpreter.python_code_delta_lines(code), [4, 5, 7])
+        self.assertEqual(len(interpreter.python_code_to_deltas(code)), 3)
+
+    def test_decoded_delta_indices(self):
+        # push 12, add, a comment of 2 deltas, print (default argument)
+        deltas = [(1, 1), (0, 1), (0, 2), (1, 2), (0, 2), (5, 5), (7, 7), (-1, 1)]
+        self.assertListEqual(Interpreter().deltas_to_assembly(deltas), ['push 12', 'add', 'print 1'])
+        self.assertListEqual(decoded_delta_indices(deltas), [0, 3, 7])
+
+    def test_python_source_map(self):
+        assembly = ['push 5', 'print 1', 'push 1', 'push 0', 'div']
+        code = assembly_to_python_code(assembly)
+        source_map = python_source_map(code)
+        self.assertEqual(len(source_map), len(assembly))
+
+        # Decoding from the delta of an instruction gives it first, and the delta was made by its line
+        lines = code.splitlines()
+        interpreter = Interpreter()
+        for instruction in range(len(assembly)):
+            line = source_map.source_line(instruction)
+            delta = source_map.delta_index(instruction)
+            self.assertEqual(interpreter.python_code_delta_lines(code)[delta], line)
+            self.assertEqual(interpreter.deltas_to_assembly(interpreter.python_code_to_deltas(code)[delta:])[0], assembly[instruction])
+            self.assertLessEqual(line, len(lines))
+
+    def test_assembly_source_map(self):
+        source_map = assembly_source_map(['# start', 'push 5', '', 'print 1', '  add'])
+        self.assertListEqual(source_map.lines, [2, 4, 5])
+        self.assertIsNone(source_map.delta_index(0))
+        self.assertEqual(source_map.locate(1), 'instruction 1 (line 4)')
+        self.assertEqual(source_map.locate(3), 'instruction 3 (end of the program)')
+        self.assertEqual(SourceMap([4, 9], [2, 3]).locate(1), 'instruction 1 (line 3, delta 9)')
+
+    def test_error_instruction(self):
+        for lines in (['push 1', 'push 0', 'div'], ['push 0', 'push 0', 'mod'], ['push 0', 'push -1', 'pow']):
+            with self.assertRaises(FythonDivisionByZero) as context:
+                Interpreter().execute_assembly(lines)
+            self.assertEqual(context.exception.instruction_pointer, 2)
+
+    def test_manager(self):
+        assembly = ['push 5', 'print 1', 'push 1', 'push 0', 'div']
+        with tempfile.TemporaryDirectory() as directory:
+            paths = {'p': os.path.join(directory, 'program.py'), 'd': os.path.join(directory, 'deltas.txt'), 'a': os.path.join(directory, 'assembly.txt')}
+            with open(paths['p'], 'w') as fo:
+                fo.write(assembly_to_python_code(assembly))
+            with open(paths['a'], 'w') as fo:
+                fo.write('# program\n\n' + '\n'.join(assembly))
+            InterpreterManager(Interpreter(), 'p', 'd').execute(paths['p'], paths['d'])
+
+            for input_type, path in paths.items():
+                manager = InterpreterManager(Interpreter(io.StringIO()), input_type, 'e')
+                with self.assertRaises(FythonDivisionByZero) as context:
+                    manager.execute(path)
+                source_map = manager.source_map(path)
+                self.assertEqual(context.exception.instruction_pointer, 4)
+                self.assertEqual(len(source_map), len(assembly))
+                if input_type == 'a':
+                    self.assertEqual(source_map.source_line(4), 7)
+                else:
+                    self.assertIsNotNone(source_map.delta_index(4))
+                    self.assertIsNotNone(source_map.source_line(4))
+
+            # The deltas file has a header line, then one delta per line
+            source_map = InterpreterManager(Interpreter(), 'd', 'e').source_map(paths['d'])
+            self.assertListEqual(source_map.lines, [delta + 2 for delta in source_map.deltas])
+
+    def test_memory_summary(self):
+        memory = MemoryProfile()
+        interpreter = Interpreter(memory=memory)
+        interpreter.execute_assembly(['push 1', 'copy 3', 'push 0', 'jmpz 1', 'pop 2'])
+        summary = memory.summary(assembly_source_map(['push 1', 'copy 3', 'push 0', 'jmpz 1', '', 'pop 2']))
+        self.assertIn('Peak stack length : 4 (instruction 4 (line 6))', summary)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import io
+import math
+import os
+import tempfile
+import unittest
+
+from interpreter import FythonLimitExceeded, Interpreter
+from memory import MemoryProfile
+from snapshot import SnapshotError
+from spill import StackSpill, window_depths
+
+
+# Pushes 1000 down to 0, then moves elements from deep in the stack to its top, and sums the stack while printing the partial sums
+DEEP_PROGRAM = [
+    'push 1000', 'dup 0', 'inc -1', 'jmpnz -2',
+    'pick 700', 'place 900', 'dup 950', 'print 1',
+    'swap', 'jmpz 4', 'add', 'dup 0', 'print 1', 'jmpnz -5', 'pop 1',
+]
+# Same, with elements taken from the bottom of the stack
+BOTTOM_PROGRAM = DEEP_PROGRAM[:4] + ['pick -3', 'dup -1', 'place -10'] + DEEP_PROGRAM[4:]
+
+
+class TestSpill(unittest.TestCase):
+
+    def execute(self, lines: list[str], **options) -> tuple[str, list[int], bool]:
+        writer = io.StringIO()
+        stack, zero_flag = Interpreter(writer, output_format='number', **options).execute_assembly(lines)
+        return (writer.getvalue(), stack, zero_flag)
+
+    def test_window_depths(self):
+        instructions = Interpreter()._parse_lines_to_instructions(['push 1', 'add', 'jmpz 2', 'pick 4', 'print 3', 'pop 2', 'pick -1', 'push 1'])
+        self.assertListEqual(window_depths(instructions[:6]), [6, 7, 6, 6, 6, 3])
+        self.assertListEqual(window_depths(instructions)[:2], [math.inf, math.inf])
+        self.assertListEqual(window_depths(instructions)[-1:], [0])
+
+    def test_segments(self):
+        stack = list(range(10)) + [3**100, -(2**70)]
+        spill = StackSpill([('push', 1)], 4, 4)
+        spill.balance(0, stack)
+        self.assertListEqual(stack, [8, 9, 3**100, -(2**70)])
+        self.assertEqual((len(spill), len(spill.segments)), (8, 2))
+
+        # The instruction reaches 7 elements, so the segments above them are loaded back
+        spill.window_depths = [7]
+        spill.balance(0, stack)
+        self.assertListEqual(stack, list(range(4, 10)) + [3**100, -(2**70)])
+        spill.load_all(stack)
+        self.assertListEqual(stack, list(range(10)) + [3**100, -(2**70)])
+        self.assertEqual(len(spill), 0)
+        spill.close()
+
+    def test_same_as_in_memory(self):
+        for program in (DEEP_PROGRAM, BOTTOM_PROGRAM):
+            expected = self.execute(program)
+            for memory_length, segment_size in ((1, 1), (10, 3), (100, 64), (5000, 10)):
+                self.assertEqual(self.execute(program, spill_stack=memory_length, spill_segment=segment_size), expected)
+
+        # Only the part in memory is measured: the loops only need a few elements, but the code following the first one reaches 951
+        memory = MemoryProfile()
+        self.execute(DEEP_PROGRAM, spill_stack=10, spill_segment=10, memory=memory)
+        self.assertLessEqual(memory.peak_stack_length, 970)
+
+    def test_limits(self):
+        with self.assertRaises(FythonLimitExceeded) as context:
+            self.execute(DEEP_PROGRAM, spill_stack=10, spill_segment=10, max_stack=500)
+        self.assertGreater(len(context.exception.stack), 500)
+        self.assertEqual(context.exception.stack[0], 1000)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(SnapshotError):
+                self.execute(DEEP_PROGRAM, spill_stack=10, snapshot_path=os.path.join(directory, 'run.snap'), spill_directory=directory)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
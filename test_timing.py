@@ -0,0 +1,70 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from interpreter import FythonDivisionByZero, Interpreter
+from interpreter_manager import InterpreterManager
+from timing import Instrumentation, json_lines_callback
+
+class TestTiming(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name: str, content: str) -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as fo:
+            fo.write(content)
+        return path
+
+    def test_conversion_stages(self):
+        instrumentation = Instrumentation()
+        manager = InterpreterManager(Interpreter(), 'p', 'a', instrumentation=instrumentation)
+        manager.execute('test_files/python.py', os.path.join(self.directory.name, 'out.txt'))
+
+        self.assertEqual([record.stage for record in instrumentation.records], ['read', 'encode', 'decode', 'write'])
+        read, encode, decode, write = instrumentation.records
+        self.assertEqual(encode.unit, 'deltas')
+        self.assertEqual(decode.items, write.items)
+        self.assertTrue(all(record.seconds >= 0 and record.error is None for record in instrumentation.records))
+
+    def test_execution_stages(self):
+        path = self.write('program_assembly.txt', 'push 3\npush 1\nsub\njmpnz -2\nprint 1')
+        for engine, stages in (('interpreter', ['read', 'parse', 'execute']), ('compiled', ['read', 'parse', 'compile', 'execute'])):
+            instrumentation = Instrumentation()
+            manager = InterpreterManager(Interpreter(io.StringIO(), output_format='number'), 'a', 'e', engine=engine, instrumentation=instrumentation)
+            manager.execute(path)
+
+            self.assertEqual([record.stage for record in instrumentation.records], stages)
+            self.assertEqual(instrumentation.records[1].items, 5)
+        # The interpreter counts the executed instructions
+        manager = InterpreterManager(Interpreter(io.StringIO(), output_format='number'), 'a', 'e', instrumentation=Instrumentation())
+        manager.execute(path)
+        self.assertEqual(manager.instrumentation.records[-1].items, 11)
+
+    def test_failed_stage(self):
+        path = self.write('program_assembly.txt', 'push 1\npush 0\ndiv')
+        stream = io.StringIO()
+        instrumentation = Instrumentation([json_lines_callback(stream)])
+        manager = InterpreterManager(Interpreter(io.StringIO()), 'a', 'e', instrumentation=instrumentation)
+        with self.assertRaises(FythonDivisionByZero):
+            manager.execute(path)
+
+        # Each stage is written as soon as it ends, including the one which failed
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([record['stage'] for record in records], ['read', 'parse', 'execute'])
+        self.assertEqual(records[-1]['error'], 'FythonDivisionByZero')
+        self.assertIn('failed: FythonDivisionByZero', instrumentation.summary())
+
+    def test_without_instrumentation(self):
+        manager = InterpreterManager(Interpreter(), 'p', 'd')
+        self.assertEqual(manager.encode('1\n'), Interpreter().python_code_to_deltas('1\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import io
+import unittest
+
+from interpreter import FythonDivisionByZero, Interpreter, program_hash
+import tracing
+from tracing import TraceJIT, trace_jit
+
+# Sum of the numbers from 1 to 50
+SUM_LOOP = ['push 0', 'push 50', 'copy 2', 'pick 2', 'add', 'place 1', 'push 1', 'sub', 'jmpnz -6', 'pop 1', 'print 1']
+
+class TestTracing(unittest.TestCase):
+
+    def parse(self, lines: list[str]) -> list[tuple[str, int]]:
+        return Interpreter()._parse_lines_to_instructions(lines)
+
+    def execute(self, lines: list[str], inputs: str = '', **options) -> tuple[str, list[int], bool, int]:
+        writer = io.StringIO()
+        interpreter = Interpreter(writer, io.StringIO(inputs), output_format='number', **options)
+        stack, zero_flag = interpreter.execute_assembly(lines)
+        return (writer.getvalue(), stack, zero_flag, interpreter.executed_steps)
+
+    def test_same_results(self):
+        programs = [
+            SUM_LOOP,
+            # The branch inside the loop changes at each iteration, so the trace is left and entered again
+            ['push 40', 'copy 2', 'push 2', 'mod', 'jmpz 3', 'copy 2', 'print 1', 'push 1', 'sub', 'jmpnz -8'],
+            # The stack shrinks at each iteration, down to the 0 at its bottom
+            ['read 31', 'print 1', 'jmpnz -1'],
+            # Nested loops
+            ['push 5', 'push 7', 'push 1', 'sub', 'jmpnz -2', 'pop 1', 'push 1', 'sub', 'jmpnz -7'],
+        ]
+        inputs = ' '.join(str(value) for value in range(31))
+        for lines in programs:
+            expected = self.execute(lines, inputs)
+            for threshold in (1, 3):
+                self.assertEqual(self.execute(lines, inputs, jit=True, jit_threshold=threshold), expected)
+
+    def test_trace(self):
+        jit = TraceJIT(self.parse(SUM_LOOP), threshold=5)
+        interpreter = Interpreter(io.StringIO(), output_format='number')
+        stack, zero_flag = [0, 50], False
+        index = 2
+        executed = 0
+        while index == 2:
+            index, zero_flag, count = jit.enter(index, stack, zero_flag, interpreter)
+            executed += count
+            if count == 0:
+                # Interpreted iteration before the threshold
+                stack = [stack[0] + stack[1], stack[1] - 1]
+                zero_flag = stack[1] == 0
+                self.assertFalse(zero_flag)
+
+        trace = jit.traces[2]
+        self.assertEqual([position for position, _ in trace.path], list(range(2, 9)))
+        # The loop only needs its two values, so it runs without checks from 2 elements
+        self.assertEqual(trace.guard_depth, 2)
+        self.assertEqual((index, stack, zero_flag), (9, [1275, 0], True))
+        self.assertEqual(executed, (50 - 4) * 7)
+
+    def test_rejected(self):
+        # The loop reads a value which is 0 while recording, so it leaves the loop and is never compiled
+        lines = ['read 1', 'jmpz 2', 'jmpnz -2', 'push 9']
+        jit = TraceJIT(self.parse(lines), threshold=1)
+        interpreter = Interpreter(io.StringIO(), io.StringIO('0\n'), output_format='number')
+        self.assertEqual(jit.enter(0, [], False, interpreter), (4, False, 3))
+        self.assertEqual(jit.traces, {})
+        self.assertEqual(jit.rejected, {0})
+
+    def test_errors(self):
+        # Divides 6 by 3, 2, 1 and then 0
+        lines = ['push 4', 'push 1', 'sub', 'copy 2', 'push 6', 'pick 1', 'div', 'pop 1', 'jmpnz -7']
+        with self.assertRaises(FythonDivisionByZero):
+            self.execute(lines)
+        with self.assertRaises(FythonDivisionByZero):
+            self.execute(lines, jit=True, jit_threshold=1)
+
+    def test_cache(self):
+        instructions = self.parse(SUM_LOOP)
+        self.execute(SUM_LOOP, jit=True, jit_threshold=10)
+        jit = trace_jit(instructions, 10)
+        self.assertIn(2, jit.traces)
+        trace = jit.traces[2]
+
+        # The next execution of the same program reuses the trace
+        self.execute(SUM_LOOP, jit=True, jit_threshold=10)
+        self.assertIs(trace_jit(list(instructions), 10).traces[2], trace)
+        self.assertIsNot(trace_jit(instructions, 11), jit)
+
+    def test_limits_disable_jit(self):
+        lines = ['push 1000', 'push 1', 'sub', 'jmpnz -2']
+        output, stack, zero_flag, steps = self.execute(lines, jit=True, jit_threshold=1, max_instructions=10**6)
+        self.assertEqual((stack, steps), ([0], 3001))
+        self.assertNotIn((program_hash(self.parse(lines)), 1), tracing._cache)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from carrier import assembly_to_python_code
+from interpreter import Interpreter, PythonCodeError
+from interpreter_manager import InterpreterManager, InterpreterManagerError
+from watch import IncrementalEncoder
+
+class TestWatch(unittest.TestCase):
+
+    def assertSameAsFull(self, encoder: IncrementalEncoder, code: str):
+        interpreter = Interpreter()
+        deltas, assembly = encoder.update(code)
+        expected_deltas = interpreter.python_code_to_deltas(code)
+        self.assertListEqual(deltas, expected_deltas)
+        self.assertListEqual(assembly, interpreter.deltas_to_assembly(expected_deltas))
+
+    def test_file(self):
+        with open('test_files/python.py') as fi:
+            code = fi.read()
+        self.assertSameAsFull(IncrementalEncoder(), code)
+
+    def test_edit_one_line(self):
+        lines = ['a = 1', 'if a:', '    b = a + 2', '    c = b', 'd = c'] * 100
+        encoder = IncrementalEncoder()
+        self.assertSameAsFull(encoder, '\n'.join(lines))
+
+        lines[252] = '    b = a + 2 + 3'
+        self.assertSameAsFull(encoder, '\n'.join(lines))
+        self.assertEqual(encoder.encoded_lines, 1)
+        self.assertLess(encoder.decoded_steps, 10)
+
+    def test_indentation_change(self):
+        lines = ['if a:', '    b = 1', '    c = 2', 'd = 3', 'e = 4 + 4']
+        encoder = IncrementalEncoder()
+        self.assertSameAsFull(encoder, '\n'.join(lines))
+
+        # The depth of the following lines changes, so they are encoded again until it is the same as before
+        lines = ['if a:', '  if b:', '    b = 1', '    c = 2', '  d = 3', 'e = 4 + 4']
+        self.assertSameAsFull(encoder, '\n'.join(lines))
+
+    def test_insert_and_delete(self):
+        lines = ['x = 1', 'y = x + 1', '# comment', 'z = x + y', '', 'print(z)']
+        encoder = IncrementalEncoder()
+        self.assertSameAsFull(encoder, '\n'.join(lines))
+
+        for edited in (lines[:2] + ['w = 2 + 2 + 2'] + lines[2:], lines[:1] + lines[3:], [], lines, lines[::-1]):
+            self.assertSameAsFull(encoder, '\n'.join(edited))
+
+    def test_invalid_code(self):
+        encoder = IncrementalEncoder()
+        self.assertSameAsFull(encoder, 'a = 1\nb = 2')
+        with self.assertRaises(PythonCodeError):
+            encoder.update('a = (')
+        # The previous state is kept
+        self.assertSameAsFull(encoder, 'a = 1\nb = 2 + 3')
+
+    def test_watch_after_execution_error(self):
+        writer = io.StringIO()
+        manager = InterpreterManager(Interpreter(writer, output_format='number'), 'p', 'e')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'program.py')
+            with open(path, 'w') as fo:
+                fo.write(assembly_to_python_code(['push 1', 'push 0', 'div']))
+            # The watch only returns once the file is removed with the directory, so it runs in a thread
+            def watch() -> None:
+                with self.assertRaises(InterpreterManagerError):
+                    manager.watch(path, None, 0.01)
+            threading.Thread(target=watch, daemon=True).start()
+            time.sleep(0.5)
+
+            with open(path, 'w') as fo:
+                fo.write(assembly_to_python_code(['push 42', 'print 1']))
+            os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+            deadline = time.monotonic() + 10
+            while '42' not in writer.getvalue() and time.monotonic() < deadline:
+                time.sleep(0.05)
+        self.assertEqual(writer.getvalue(), '42\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
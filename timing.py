@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+import json
+import time
+from typing import IO, Iterator
+
+
+class StageRecord:
+    """Measure of one stage of a conversion or an execution: its wall time and the number of items it produced."""
+
+    def __init__(self, stage: str, unit: str) -> None:
+        self.stage = stage
+        self.unit = unit
+        self.items: int = None
+        self.seconds = 0.0
+        # Name of the exception which stopped the stage, if any
+        self.error: str = None
+
+    @property
+    def throughput(self) -> float:
+        """Items per second, or None if it is unknown."""
+        if self.items is None or self.seconds <= 0:
+            return None
+        return self.items / self.seconds
+
+    def to_dict(self) -> dict:
+        return {'stage': self.stage, 'seconds': self.seconds, 'items': self.items, 'unit': self.unit, 'throughput': self.throughput, 'error': self.error}
+
+    def __str__(self) -> str:
+        items = f'{self.items} {self.unit}' if self.items is not None else f'? {self.unit}'
+        throughput = f', {self.throughput:,.0f} {self.unit}/s' if self.throughput is not None else ''
+        error = f' (failed: {self.error})' if self.error is not None else ''
+        return f'{self.stage:<8} {self.seconds * 1000:10.2f} ms  {items}{throughput}{error}'
+
+
+class Instrumentation:
+    """Records of the stages of the InterpreterManager (reading, encoding, decoding, parsing, execution, writing).
+    Each callback is called with the StageRecord at the end of each stage, so the measures can be collected as they come."""
+
+    def __init__(self, callbacks: list[callable] = None) -> None:
+        self.records: list[StageRecord] = []
+        self.callbacks: list[callable] = list(callbacks or [])
+
+    def add_callback(self, callback: callable) -> None:
+        self.callbacks.append(callback)
+
+    @contextmanager
+    def stage(self, stage: str, unit: str) -> Iterator[StageRecord]:
+        """Measure the code of the 'with' block, which sets the 'items' of the yielded record. The record is kept even if the block fails."""
+
+        record = StageRecord(stage, unit)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            record.seconds = time.perf_counter() - start
+            self.records.append(record)
+            for callback in self.callbacks:
+                callback(record)
+
+    def summary(self) -> str:
+        total = sum(record.seconds for record in self.records)
+        return '\n'.join(['Stages timing :'] + list(map(str, self.records)) + [f'{"total":<8} {total * 1000:10.2f} ms'])
+
+    def write_json_lines(self, stream: IO) -> None:
+        for record in self.records:
+            stream.write(json.dumps(record.to_dict()) + '\n')
+
+
+def json_lines_callback(stream: IO) -> callable:
+    """Return a callback writing each record to the stream as a line of JSON, as soon as its stage ends."""
+
+    def callback(record: StageRecord) -> None:
+        stream.write(json.dumps(record.to_dict()) + '\n')
+        stream.flush()
+    return callback
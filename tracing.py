@@ -0,0 +1,193 @@
+from collections import OrderedDict
+import threading
+
+from analysis import INSTRUCTIONS_WITH_ARGUMENT, JUMP_INSTRUCTIONS, OPCODES_NAMES, depth_after, is_underflow_free, jump_target, writes_zero_flag
+from compiler import _fython_pow, _indent, instruction_source
+from interpreter import FythonAssemblyError, FythonDivisionByZero, Interpreter, program_hash
+
+
+# Maximum number of instructions of a trace: longer iterations are not compiled
+MAX_TRACE_LENGTH = 1000
+# The stack length checked before each iteration of a trace is at most this, so long stacks do not make the traces too specific
+MAX_GUARD_DEPTH = 64
+# Number of programs whose traces are kept
+CACHE_SIZE = 32
+
+_NAMESPACE = {
+    'FythonAssemblyError': FythonAssemblyError,
+    'FythonDivisionByZero': FythonDivisionByZero,
+    '_fython_pow': _fython_pow
+}
+
+
+class Trace:
+    """One iteration of a loop, as the list of the instructions executed from its head up to the jump back to it,
+    compiled into a Python function repeating it while the jumps go the same way as when it was recorded.
+    'path' holds the index of each instruction, and for the jumps whether they were taken."""
+
+    def __init__(self, instructions: list[tuple[str, int]], head: int, path: list[tuple[int, bool]], entry_depth: int) -> None:
+        self.head = head
+        self.path = path
+        self.guard_depth = self._guard_depth(instructions, min(entry_depth, MAX_GUARD_DEPTH))
+        self.source = '\n'.join(self._source(instructions))
+
+        namespace = dict(_NAMESPACE)
+        exec(compile(self.source, f'<trace {head}>', 'exec'), namespace)
+        self.function = namespace[f'trace_{head}']
+
+    def _unchecked(self, instructions: list[tuple[str, int]], depth: int) -> list[bool]:
+        """Return, for each instruction of the path, whether it cannot underflow when the stack has 'depth' elements at the head."""
+        unchecked = []
+        for index, _ in self.path:
+            instruction, argument = instructions[index]
+            unchecked.append(is_underflow_free(instruction, argument, depth))
+            depth = depth_after(instruction, argument, depth)
+        return unchecked
+
+    def _guard_depth(self, instructions: list[tuple[str, int]], depth: int) -> int:
+        """Return the smallest stack length at the head which lets as many instructions as 'depth' run without checks."""
+        expected = self._unchecked(instructions, depth)
+        return next(smaller for smaller in range(depth + 1) if self._unchecked(instructions, smaller) == expected)
+
+    def _source(self, instructions: list[tuple[str, int]]) -> list[str]:
+        unchecked = self._unchecked(instructions, self.guard_depth)
+
+        # The zero flag is read by every jump of the path (and when leaving it), so only the assignments overwritten before are skipped
+        liveness = [True] * len(self.path)
+        live = True
+        for position in range(len(self.path) - 1, -1, -1):
+            instruction, argument = instructions[self.path[position][0]]
+            if instruction in JUMP_INSTRUCTIONS:
+                live = True
+            else:
+                liveness[position] = live
+                if writes_zero_flag(instruction, argument):
+                    live = False
+
+        body: list[str] = []
+        for position, (index, taken) in enumerate(self.path):
+            instruction, argument = instructions[index]
+            body.append(f'# {index}: {instruction}{"" if argument is None else f" {argument}"}')
+            if instruction not in JUMP_INSTRUCTIONS:
+                body.extend(instruction_source(instruction, argument, unchecked[position], liveness[position]))
+                continue
+
+            target = jump_target(index, argument)
+            # The condition under which the jump does not go the recorded way, and where it goes then
+            jumps_when = 'zero_flag' if instruction == 'jmpz' else 'not zero_flag'
+            leaves_when = f'not ({jumps_when})' if taken else jumps_when
+            exit_index = index + 1 if taken else target
+            if position == len(self.path) - 1:
+                body.extend([f'executed += {len(self.path)}', f'if {leaves_when}:', f'    return {exit_index}, zero_flag, executed'])
+            elif target != index + 1:
+                body.extend([f'if {leaves_when}:', f'    return {exit_index}, zero_flag, executed + {position + 1}'])
+
+        return [
+            f'def trace_{self.head}(stack, zero_flag, vm):',
+            '    executed = 0',
+            f'    while len(stack) >= {self.guard_depth}:'
+        ] + _indent(body, 2) + [
+            f'    return {self.head}, zero_flag, executed'
+        ]
+
+
+class TraceJIT:
+    """Tracing compiler of the loops of a program, used by 'Interpreter.execute_instructions' when 'jit' is True.
+    The interpreter calls 'enter' at each backward jump it takes. Once a loop head was reached 'threshold' times, its next iteration
+    is executed while its path is recorded, then compiled into a 'Trace'. Afterwards the loop runs in the trace until one of its jumps
+    goes another way than when it was recorded, and the interpretation resumes from there.
+    Loops whose iteration takes another backward jump (e.g. with a nested loop) or is too long are left to the interpreter."""
+
+    def __init__(self, instructions: list[tuple[str, int]], threshold: int = 100) -> None:
+        self.instructions = instructions
+        self.threshold = threshold
+        self.counts: dict[int, int] = {}
+        self.traces: dict[int, Trace] = {}
+        # Heads whose iteration could not be recorded
+        self.rejected: set[int] = set()
+        # Functions executing one instruction, used while recording
+        self._steps: dict[int, callable] = {}
+
+    def enter(self, head: int, stack: list[int], zero_flag: bool, vm: Interpreter) -> tuple[int, bool, int]:
+        """Execute the loop starting at 'head' in its trace if there is one. Return the index of the next instruction to interpret,
+        the zero flag and the number of instructions executed."""
+
+        trace = self.traces.get(head)
+        if trace is not None:
+            return trace.function(stack, zero_flag, vm)
+        if head < 0 or head in self.rejected:
+            return (head, zero_flag, 0)
+
+        count = self.counts.get(head, 0) + 1
+        self.counts[head] = count
+        if count < self.threshold:
+            return (head, zero_flag, 0)
+
+        entry_depth = len(stack)
+        index, zero_flag, path, closed = self._record(head, stack, zero_flag, vm)
+        if not closed:
+            self.rejected.add(head)
+            return (index, zero_flag, len(path))
+
+        trace = Trace(self.instructions, head, path, entry_depth)
+        self.traces[head] = trace
+        index, zero_flag, executed = trace.function(stack, zero_flag, vm)
+        return (index, zero_flag, len(path) + executed)
+
+    def _step(self, index: int) -> callable:
+        step = self._steps.get(index)
+        if step is None:
+            instruction, argument = self.instructions[index]
+            source = '\n'.join(['def step(stack, zero_flag, vm):'] + _indent(instruction_source(instruction, argument)) + ['    return zero_flag'])
+            namespace = dict(_NAMESPACE)
+            exec(compile(source, f'<step {index}>', 'exec'), namespace)
+            step = self._steps[index] = namespace['step']
+        return step
+
+    def _record(self, head: int, stack: list[int], zero_flag: bool, vm: Interpreter) -> tuple[int, bool, list[tuple[int, bool]], bool]:
+        """Execute one iteration of the loop starting at 'head', and return the index where it stopped, the zero flag, the executed path,
+        and whether the iteration went back to the head with a path which can be compiled."""
+
+        path: list[tuple[int, bool]] = []
+        index = head
+        while 0 <= index < len(self.instructions) and len(path) < MAX_TRACE_LENGTH:
+            instruction, argument = self.instructions[index]
+            # The interpreter raises the errors of these instructions itself
+            if instruction not in OPCODES_NAMES or (argument is None and instruction in INSTRUCTIONS_WITH_ARGUMENT):
+                break
+
+            if instruction in JUMP_INSTRUCTIONS:
+                taken = zero_flag if instruction == 'jmpz' else not zero_flag
+                path.append((index, taken))
+                if not taken:
+                    index += 1
+                    continue
+                index = jump_target(index, argument)
+                if index == head:
+                    return (index, zero_flag, path, True)
+                if index < path[-1][0]:
+                    break
+            else:
+                zero_flag = self._step(index)(stack, zero_flag, vm)
+                path.append((index, None))
+                index += 1
+
+        return (index, zero_flag, path, False)
+
+
+_cache: OrderedDict[tuple[bytes, int], TraceJIT] = OrderedDict()
+_cache_lock = threading.Lock()
+
+def trace_jit(instructions: list[tuple[str, int]], threshold: int = 100) -> TraceJIT:
+    """Return the tracing compiler of the program, so its traces are reused by the next executions of the same program."""
+
+    key = (program_hash(instructions), threshold)
+    with _cache_lock:
+        jit = _cache.get(key)
+        if jit is None:
+            jit = _cache[key] = TraceJIT(list(instructions), threshold)
+            if len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+        else:
+            _cache.move_to_end(key)
+        return jit
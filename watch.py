@@ -0,0 +1,156 @@
+import ast
+from bisect import bisect_left
+from itertools import compress, count
+from operator import ne
+
+from interpreter import Interpreter, PythonCodeError
+
+
+# State of the indentation before a line: (indentation length, indentation depth, lengths of the enclosing indentations)
+LineState = tuple[int, int, tuple[int, ...]]
+
+INITIAL_STATE: LineState = (0, 0, (0,))
+
+
+def _common_affixes(old: list, new: list) -> tuple[int, int]:
+    """Return the lengths of the common prefix and of the common suffix of the two lists, which do not overlap."""
+
+    # The comparisons are made by 'map', so the lists are scanned without any Python loop
+    length = min(len(old), len(new))
+    prefix = next(compress(count(), map(ne, old, new)), length)
+    suffix = min(next(compress(count(), map(ne, reversed(old), reversed(new))), length), length - prefix)
+
+    return (prefix, suffix)
+
+
+class IncrementalEncoder:
+    """Conversion of a Fython source to deltas and assembly which can be updated after an edit of the source.
+    The indentation state before each line is kept, so only the edited lines, and the lines after them until the
+    indentation state is the same as before the edit, are encoded again. Likewise, the assembly is only decoded again
+    from the last instruction before the first changed delta, until the decoding is back in step with the previous one.
+    The results are always the same as 'Interpreter.python_code_to_deltas' and 'Interpreter.deltas_to_assembly'."""
+
+    def __init__(self, interpreter: Interpreter = None) -> None:
+        self.interpreter = interpreter if interpreter is not None else Interpreter()
+
+        self.lines: list[str] = []
+        # State before each line (and after the last one), and the (indentation depth, whitespace count) of each line,
+        # or None if it does not make an instruction
+        self.states: list[LineState] = [INITIAL_STATE]
+        self.values: list[tuple[int, int]] = []
+
+        self.deltas: list[tuple[int, int]] = []
+        # Index of the delta where each step of the decoding starts, and the assembly line it produced (None if none)
+        self.positions: list[int] = []
+        self.outputs: list[str] = []
+
+        # Number of lines and of decoding steps computed by the last update
+        self.encoded_lines = 0
+        self.decoded_steps = 0
+
+
+    def _encode_line(self, line: str, state: LineState) -> tuple[tuple[int, int], LineState]:
+        """Same as one iteration of 'Interpreter.python_code_to_deltas'. Return the value of the line and the state after it."""
+
+        # Remove empty lines and line starting with a comment
+        if line.strip() == '' or line.strip().startswith('#'):
+            return (None, state)
+
+        indentation_length, indentation_depth, previous_lengths = state
+        previous_lengths = list(previous_lengths)
+        indentation_length, indentation_depth = self.interpreter._get_line_indentation_depth(line, indentation_length, indentation_depth, previous_lengths)
+        state = (indentation_length, indentation_depth, tuple(previous_lengths))
+
+        whitespace_count = self.interpreter._get_line_whitespace_count(line)
+        # This means the line was only a comment, so remove it
+        if whitespace_count is None:
+            return (None, state)
+
+        return ((indentation_depth, whitespace_count), state)
+
+    def _update_values(self, lines: list[str]) -> None:
+        prefix, suffix = _common_affixes(self.lines, lines)
+        # Lines of the common suffix have the same index from the end in both versions
+        shift = len(lines) - len(self.lines)
+
+        states = self.states[:prefix]
+        values = self.values[:prefix]
+        state = self.states[prefix]
+
+        index = prefix
+        while index < len(lines):
+            # Past the edited lines, the previous results can be used again as soon as the state is the same as before
+            if index >= len(lines) - suffix and self.states[index - shift] == state:
+                states.extend(self.states[index - shift:])
+                values.extend(self.values[index - shift:])
+                break
+            states.append(state)
+            value, state = self._encode_line(lines[index], state)
+            values.append(value)
+            index += 1
+        else:
+            states.append(state)
+
+        self.encoded_lines = index - prefix
+        self.lines = lines
+        self.states = states
+        self.values = values
+
+    def _update_assembly(self, deltas: list[tuple[int, int]]) -> None:
+        prefix, suffix = _common_affixes(self.deltas, deltas)
+        shift = len(deltas) - len(self.deltas)
+
+        # A decoding step reads the deltas from its position up to the position of the next step (included),
+        # so only the steps whose next one starts before the first changed delta are kept
+        kept = max(bisect_left(self.positions, prefix) - 1, 0)
+        positions = self.positions[:kept]
+        outputs = self.outputs[:kept]
+        index = self.positions[kept] if kept < len(self.positions) else 0
+
+        self.decoded_steps = 0
+        while index < len(deltas):
+            # Past the changed deltas, the previous steps can be used again as soon as one starts at the same place
+            if index >= len(deltas) - suffix:
+                old_step = bisect_left(self.positions, index - shift)
+                if old_step < len(self.positions) and self.positions[old_step] == index - shift:
+                    positions.extend(self.positions[old_step:] if shift == 0 else [position + shift for position in self.positions[old_step:]])
+                    outputs.extend(self.outputs[old_step:])
+                    break
+            positions.append(index)
+            line, index = self.interpreter._decode_delta(deltas, index)
+            outputs.append(line)
+            self.decoded_steps += 1
+
+        self.deltas = deltas
+        self.positions = positions
+        self.outputs = outputs
+
+    def update(self, code: str) -> tuple[list[tuple[int, int]], list[str]]:
+        """Encode the new version of the source, reusing the results of the previous one. Return its deltas and assembly."""
+
+        try:
+            ast.parse(code)
+        except Exception:
+            raise PythonCodeError("Invalid Python code")
+
+        previous_values = [value for value in self.values if value is not None]
+        self._update_values(code.splitlines())
+        values = [value for value in self.values if value is not None]
+
+        # Only the deltas between changed values are computed again
+        prefix, suffix = _common_affixes(previous_values, values)
+        start = max(prefix - 1, 0)
+        stop = min(len(values) - suffix, len(values) - 1)
+        # This will take successive differences of each element in the tuples
+        deltas = self.deltas[:start] + [
+            (next_indent - indent, next_whitespace - whitespace) for (indent, whitespace), (next_indent, next_whitespace) in zip(values[start:stop], values[start + 1:stop + 1])
+        ]
+        if suffix > 0:
+            deltas.extend(self.deltas[len(previous_values) - suffix:])
+
+        self._update_assembly(deltas)
+        return (self.deltas, self.assembly)
+
+    @property
+    def assembly(self) -> list[str]:
+        return [line for line in self.outputs if line is not None]